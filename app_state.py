@@ -2,98 +2,175 @@ import sqlite3
 from configparser import ConfigParser
 import os
 
+from category_counts import load_category_counts
+from category_registry import CategoryRegistry
+from constants import CONFIG_FILE, DB_FILE
+from migrations import run_migrations
+from search import SORT_DEFAULT, SORT_MODES, has_full_text_index, setup_full_text_search
+from storage import Storage
+from utils import sanitize_text
+
 
 class AppState:
     """A class to hold the application's state."""
 
-    def __init__(self):
+    def __init__(self, db_path=DB_FILE):
         self.config = {}
+        self.categories = CategoryRegistry()
+        self.category_counts = {}
         self.max_items = "8"
+        self.page_size = "8"
+        self.incremental_search = False
+        self.sort_mode = SORT_DEFAULT
         self.current_tag = "text"
         self.tag_id_map = {}
 
-        # Database
-        self.conn = sqlite3.connect("data/data_notes.db")
+        # Database: reads use this thread's connection, writes go
+        # through the storage writer thread
+        self.db_path = db_path
+        self.categories_path = os.path.join(
+            os.path.dirname(db_path), "categories.json"
+        )
+        self.storage = Storage(self.db_path)
+        self.conn = self.storage.reader()
         self.cursor = self.conn.cursor()
+        self.fts_enabled = has_full_text_index(self.conn)
 
-    def load_config(self, path="data/config.ini"):
-        """Loads configuration from an INI file."""
+    @staticmethod
+    def read_config(path=CONFIG_FILE):
+        """Reads an INI file into {section: {key: value}}; "a| b" values become lists."""
         config_parser = ConfigParser()
         config_parser.read(path)
 
+        config = {}
         for section_name in config_parser.sections():
-            self.config[section_name] = {}
+            config[section_name] = {}
             for key, value in config_parser.items(section_name):
                 if "|" in value:
-                    self.config[section_name][key] = [item.strip() for item in value.split("|")]
+                    config[section_name][key] = [item.strip() for item in value.split("|")]
                 else:
-                    self.config[section_name][key] = value
+                    config[section_name][key] = value
+        return config
+
+    def load_config(self, path=CONFIG_FILE):
+        """Loads configuration from an INI file."""
+        self.config.update(self.read_config(path))
 
         self.max_items = self.config["GENERAL"]["limiteres"]
+        # Notes appended each time the list is scrolled to the bottom
+        self.page_size = self.config["GENERAL"].get("page_size", self.max_items)
+        # Search while typing instead of on Enter
+        self.incremental_search = (
+            self.config["GENERAL"].get("incremental_search", "0") == "1"
+        )
+        # Initial list order, one of search.SORT_MODES
+        sort_mode = self.config["GENERAL"].get("sort_mode", SORT_DEFAULT)
+        self.sort_mode = sort_mode if sort_mode in SORT_MODES else SORT_DEFAULT
+
+    def load_categories(self):
+        """Loads categories from JSON or creates it from the database."""
+        self.categories = CategoryRegistry(
+            self.config["CATCOLORS"].keys(), self.categories_path
+        )
+        if self.categories.load():
+            print("Categories loaded from categories.json")
+        else:
+            print("categories.json not found. Migrating from database...")
+
+            # Categories in use, from the category counts table
+            existing_categories = sorted(self.load_category_counts())
+
+            for cat_key in existing_categories:
+                if cat_key:
+                    # Create a simple label from the key (the colors cycle)
+                    label = cat_key.replace("_", " ").capitalize()
+                    self.categories.set(cat_key, label)
+
+            # Add a default "uncategorized" category if it doesn't exist
+            if "none" not in self.categories:
+                self.categories.set("none", "None", "cor_001")
+
+            self.save_categories()
+
+    def load_category_counts(self):
+        """Reads the number of notes per category key (one small query)."""
+        self.category_counts = load_category_counts(self.conn)
+        return self.category_counts
+
+    def save_categories(self):
+        """Saves the current categories map to categories.json."""
+        self.categories.save(self.categories_path)
+        print("categories.json saved.")
+
+    def find_category(self, label):
+        """Returns the key of the category with this label, or None."""
+        return self.categories.key_for(label)
+
+    def resolve_category(self, value):
+        """
+        Returns the key for a category given as key or label, adding it
+        like a label typed in a card if it doesn't exist. Returns
+        (key, created); the caller saves the categories when created.
+        """
+        if not value:
+            return "none", False
+        if value in self.categories:
+            return value, False
+        category_key = self.find_category(value)
+        if category_key:
+            return category_key, False
+        return self.add_category(value), True
+
+    def add_category(self, label):
+        """
+        Adds a category for a label typed by the user and returns its key.
+        The caller is responsible for saving the categories.
+        """
+        category_key = sanitize_text(label.lower())
+
+        # Update state (a new key gets the least used color)
+        self.categories.set(category_key, label)
+        new_color_key = self.categories[category_key]["color"]
+        print(f"New category '{label}' added with color '{new_color_key}'")
+        return category_key
 
     def close_db(self):
-        """Commits changes and closes the database connection."""
-        if self.conn:
-            self.conn.commit()
-            self.conn.close()
+        """Commits pending writes and closes the database connections."""
+        if self.storage:
+            self.storage.close()
+            self.storage = None
+            self.conn = None
 
     @staticmethod
-    def initialize_database():
+    def initialize_database(db_file=DB_FILE):
         """
         Checks for the database directory and file.
-        If the file doesn't exist, it creates the DB,
-        the 'notas' table, and populates it with initial sample notes.
+        Brings the schema up to date with the migrations (creating the
+        'notas' table for a new file) and populates a new database with
+        the initial sample notes. The full-text search index is created
+        (and backfilled) for new and existing databases.
         """
-        db_folder = 'data'
-        db_file = os.path.join(db_folder, 'data_notes.db')
+        db_folder = os.path.dirname(db_file)
 
         # Create the data directory if it doesn't exist
-        if not os.path.exists(db_folder):
+        if db_folder and not os.path.exists(db_folder):
             os.makedirs(db_folder)
 
-        # If the database file already exists, do nothing.
-        if os.path.exists(db_file):
-            return
+        db_exists = os.path.exists(db_file)
 
         try:
             # Connect to the database (this will create the file)
             conn = sqlite3.connect(db_file)
-            cursor = conn.cursor()
-
-            # 1. Create the 'notas' table
-            cursor.execute("""
-            CREATE TABLE notas (
-                codigo_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                categ     TEXT,
-                titulo    TEXT,
-                texto     TEXT,
-                imagens   TEXT,
-                data      DATE DEFAULT (DATE('now'))
-            );
-            """)
-
-            # 2. Define and insert the initial notes
-            initial_notes = [
-                (
-                    'Text',
-                    'Edit Notes',
-                    'Edit your notes, reminders, or code snippets here. The title and category can also be changed. '
-                    'Select an existing category or type a new one in the field. Notes are saved automatically.\n\n'
-                    'To find a note, use the search field above and the category buttons to filter. '
-                    'The 10 most recent notes for the filter will be displayed.'
-                ),
-                (
-                    'none',
-                    'Add New Notes',
-                    'To create a new note, click the "Add Note" button on the left. A new blank note will appear on the right. '
-                    'Just add a title, category, and your content.'
-                )
-            ]
-
-            cursor.executemany(
-                "INSERT INTO notas (categ, titulo, texto) VALUES (?, ?, ?)",
-                initial_notes
-            )
+            conn.execute("PRAGMA journal_mode = WAL")
+
+            # Tables, indexes and triggers (see migrations.py)
+            run_migrations(conn)
+
+            if not db_exists:
+                AppState.create_sample_database(conn)
+
+            # Full-text index, kept in sync by triggers
+            setup_full_text_search(conn)
 
             # Commit changes and close the connection
             conn.commit()
@@ -101,3 +178,32 @@ class AppState:
 
         except sqlite3.Error as e:
             print(f"Database error: {e}")
+
+    @staticmethod
+    def create_sample_database(conn):
+        """Inserts the initial sample notes into a new database."""
+        cursor = conn.cursor()
+
+        # Define and insert the initial notes
+        initial_notes = [
+            (
+                'Text',
+                'Edit Notes',
+                'Edit your notes, reminders, or code snippets here. The title and category can also be changed. '
+                'Select an existing category or type a new one in the field. Notes are saved automatically.\n\n'
+                'To find a note, use the search field above and the category buttons to filter. '
+                'The 10 most recent notes for the filter will be displayed.'
+            ),
+            (
+                'none',
+                'Add New Notes',
+                'To create a new note, click the "Add Note" button on the left. A new blank note will appear on the right. '
+                'Just add a title, category, and your content.'
+            )
+        ]
+
+        cursor.executemany(
+            "INSERT INTO notas (categ, titulo, texto, updated_at) "
+            "VALUES (?, ?, ?, DATETIME('now'))",
+            initial_notes
+        )
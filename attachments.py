@@ -0,0 +1,97 @@
+import os
+
+# --- Attachments ---
+
+# One row per image attached to a note, in display order. Rows are
+# removed with their note by a trigger. Width and height are unknown
+# (NULL) for images migrated from the old 'imagens' column.
+ATTACHMENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attachments (
+    id         INTEGER PRIMARY KEY,
+    codigo_id  INTEGER NOT NULL,
+    filename   TEXT NOT NULL,
+    ordinal    INTEGER NOT NULL,
+    size       INTEGER,
+    width      INTEGER,
+    height     INTEGER,
+    thumb_path TEXT
+);
+
+CREATE INDEX IF NOT EXISTS attachments_note ON attachments (codigo_id, ordinal);
+
+CREATE TRIGGER IF NOT EXISTS attachments_note_delete AFTER DELETE ON notas BEGIN
+    DELETE FROM attachments WHERE codigo_id = old.codigo_id;
+END;
+"""
+
+# Relative to the application folder, like IMAGE_DIR and THUMB_DIR
+THUMB_FOLDER = os.path.join("images", "thumbs")
+
+# SQLite's default limit of host parameters is 999 on older versions
+MAX_IDS_PER_QUERY = 500
+
+
+def thumb_path_for(filename):
+    return os.path.join(THUMB_FOLDER, filename)
+
+
+def load_attachments(conn, note_ids):
+    """Returns {codigo_id: [filename, ...]} for the given notes, in order."""
+    attachments = {}
+    note_ids = list(note_ids)
+    for start in range(0, len(note_ids), MAX_IDS_PER_QUERY):
+        chunk = note_ids[start:start + MAX_IDS_PER_QUERY]
+        placeholders = ", ".join("?" * len(chunk))
+        rows = conn.execute(
+            "SELECT codigo_id, filename FROM attachments "
+            f"WHERE codigo_id IN ({placeholders}) ORDER BY codigo_id, ordinal",
+            chunk,
+        )
+        for note_id, filename in rows:
+            attachments.setdefault(note_id, []).append(filename)
+    return attachments
+
+
+def with_attachments(conn, rows):
+    """
+    Replaces the 'imagens' column (index 4) of a page of 'notas' rows with
+    the tuple of its attachment filenames, read in one query.
+    """
+    if not rows:
+        return rows
+    attachments = load_attachments(conn, [row[0] for row in rows])
+    return [
+        row[:4] + (tuple(attachments.get(row[0], ())),) + row[5:] for row in rows
+    ]
+
+
+def add_attachment(conn, note_id, filename, image_path=None, dimensions=None):
+    """
+    Appends an attachment to a note (runs on the storage writer thread).
+    Returns the attachment id, or None if the note no longer exists.
+    """
+    if conn.execute(
+        "SELECT 1 FROM notas WHERE codigo_id = ?", (note_id,)
+    ).fetchone() is None:
+        return None
+    if conn.execute(
+        "SELECT 1 FROM attachments WHERE codigo_id = ? AND filename = ?",
+        (note_id, filename),
+    ).fetchone():
+        return None
+
+    ordinal = conn.execute(
+        "SELECT coalesce(MAX(ordinal), 0) + 1 FROM attachments WHERE codigo_id = ?",
+        (note_id,),
+    ).fetchone()[0]
+    size = None
+    if image_path and os.path.exists(image_path):
+        size = os.path.getsize(image_path)
+    width, height = dimensions or (None, None)
+
+    return conn.execute(
+        "INSERT INTO attachments "
+        "(codigo_id, filename, ordinal, size, width, height, thumb_path) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (note_id, filename, ordinal, size, width, height, thumb_path_for(filename)),
+    ).lastrowid
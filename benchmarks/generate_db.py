@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic database generator for the benchmarks.
+Builds a data_notes.db with the application schema and N notes with
+realistic text sizes, an uneven category spread and some attachments.
+
+usage: python benchmarks/generate_db.py 10000 -o /tmp/notes_10k.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_state import AppState  # noqa: E402
+
+CATEGORIES = [
+    "text", "python", "sql", "javascript", "linux", "git", "docker", "ideas",
+    "meetings", "reminders", "links", "recipes", "finance", "work", "none",
+]
+INSERT_SQL = (
+    "INSERT INTO notas (codigo_id, categ, titulo, texto, data, updated_at) "
+    "VALUES (?1, ?2, ?3, ?4, ?5, DATETIME(?5))"
+)
+INSERT_ATTACHMENT_SQL = (
+    "INSERT INTO attachments (codigo_id, filename, ordinal, size, width, height) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+WORDS = (
+    "the note code snippet query select from where import def class return "
+    "function server config docker build deploy meeting todo remember link "
+    "python table index database search window panel card category color "
+    "image paste update delete insert value list page scroll render cache"
+).split()
+
+
+def random_text(rng):
+    """Mostly short notes with a long tail of big ones (log-normal length)."""
+    length = int(min(max(rng.lognormvariate(6.0, 1.2), 20), 60000))
+    lines = []
+    size = 0
+    while size < length:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 14)))
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)[:length]
+
+
+def random_attachments(rng, note_id):
+    """About one note in five has one to four attachments."""
+    if rng.random() > 0.2:
+        return []
+    return [
+        (note_id, f"{note_id}_{i}_synthetic.jpg", i, rng.randint(20000, 900000), 1280, 720)
+        for i in range(1, rng.randint(1, 4) + 1)
+    ]
+
+
+def generate(db_path, note_count, seed=42, batch_size=2000):
+    """Creates db_path (replacing it) with note_count synthetic notes."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    # Schema, sample notes and search index, as the application creates them
+    AppState.initialize_database(db_path)
+
+    rng = random.Random(seed)
+    # Zipf-like spread: a few categories hold most notes
+    weights = [1 / (rank + 1) for rank in range(len(CATEGORIES))]
+
+    conn = sqlite3.connect(db_path)
+    next_id = conn.execute("SELECT MAX(codigo_id) FROM notas").fetchone()[0] + 1
+    batch = []
+    attachments = []
+    for note_id in range(next_id, next_id + note_count):
+        category = rng.choices(CATEGORIES, weights)[0]
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title()
+        day = f"20{rng.randint(15, 25):02d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        batch.append((note_id, category, title, random_text(rng), day))
+        attachments.extend(random_attachments(rng, note_id))
+        if len(batch) >= batch_size:
+            conn.executemany(INSERT_SQL, batch)
+            conn.executemany(INSERT_ATTACHMENT_SQL, attachments)
+            conn.commit()
+            batch = []
+            attachments = []
+    if batch:
+        conn.executemany(INSERT_SQL, batch)
+        conn.executemany(INSERT_ATTACHMENT_SQL, attachments)
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic notes database.")
+    parser.add_argument("count", type=int, help="number of notes")
+    parser.add_argument("-o", "--output", required=True, help="database file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate(args.output, args.count, args.seed)
+    print(f"{args.output}: {args.count} notes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the hot paths of VaPyNotes.
+Generates (or reuses) synthetic databases of the requested sizes, times
+each benchmark and writes the results as JSON so runs on different
+commits can be compared. Benchmarks that need wxPython are skipped when
+wx or a display is not available.
+
+usage:
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 100000
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/old.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from app_state import AppState  # noqa: E402
+from attachments import with_attachments  # noqa: E402
+from benchmarks.generate_db import generate  # noqa: E402
+from highlight import TokenCache  # noqa: E402
+from markdown_render import RenderCache, render_markdown  # noqa: E402
+from search import SORT_MODES, build_notes_query, next_page_cursor  # noqa: E402
+
+CONFIG_FILE = os.path.join(REPO_DIR, "data", "config.ini")
+DEFAULT_SIZES = (1000, 10000)
+
+
+def summarize(times):
+    """Milliseconds statistics for a list of durations in seconds."""
+    times_ms = sorted(t * 1000 for t in times)
+    return {
+        "runs": len(times_ms),
+        "min_ms": round(times_ms[0], 4),
+        "median_ms": round(statistics.median(times_ms), 4),
+        "p95_ms": round(times_ms[min(len(times_ms) - 1, int(len(times_ms) * 0.95))], 4),
+        "mean_ms": round(statistics.fmean(times_ms), 4),
+    }
+
+
+def measure(func, repeat, setup=None):
+    """Times func() repeat times; setup() runs before each call, untimed."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+
+def open_app_state(db_path):
+    with redirect_stdout(sys.stderr):
+        app_state = AppState(db_path)
+        app_state.load_config(CONFIG_FILE)
+    return app_state
+
+
+# --- Database benchmarks ---
+
+
+def bench_initialize_database(db_path, repeat):
+    results = {}
+
+    def quiet_initialize(path):
+        with redirect_stdout(sys.stderr):
+            AppState.initialize_database(path)
+
+    results["initialize_database_existing"] = measure(
+        lambda: quiet_initialize(db_path), repeat
+    )
+
+    new_db = os.path.join(os.path.dirname(db_path), "new_notes.db")
+
+    def remove_new_db():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(new_db + suffix):
+                os.remove(new_db + suffix)
+
+    results["initialize_database_new"] = measure(
+        lambda: quiet_initialize(new_db), repeat, setup=remove_new_db
+    )
+    remove_new_db()
+    return results
+
+
+def bench_load_categories(app_state, repeat):
+    """load_categories without categories.json: the migration from 'notas'."""
+    app_state.categories_path = os.path.join(
+        os.path.dirname(app_state.db_path), "bench_categories.json"
+    )
+
+    def remove_json():
+        if os.path.exists(app_state.categories_path):
+            os.remove(app_state.categories_path)
+
+    def migrate():
+        with redirect_stdout(sys.stderr):
+            app_state.load_categories()
+
+    result = measure(migrate, repeat, setup=remove_json)
+    remove_json()
+    return {"load_categories_migration": result}
+
+
+def bench_list_queries(app_state, repeat):
+    """The queries run by MainFrame.on_update, first page and next page."""
+    limit = int(app_state.max_items)
+    cases = {
+        "latest": ("", []),
+        "search_common_word": ("python", []),
+        "search_prefix": ("dat", []),
+        "search_phrase": ('"select from"', []),
+        "category": ("", ["sql"]),
+        "category_and_search": ("index", ["sql", "python"]),
+    }
+    results = {}
+    for name, (term, categories) in cases.items():
+        modes = [("like", False)]
+        if app_state.fts_enabled:
+            modes.insert(0, ("fts", True))
+        for mode, use_fts in modes:
+            if not term and mode == "like":
+                continue
+            sql, params = build_notes_query(term, categories, limit, use_fts=use_fts)
+            label = f"list_query_{name}" + (f"_{mode}" if term else "")
+            results[label] = measure(
+                lambda: app_state.conn.execute(sql, params).fetchall(), repeat
+            )
+
+            # Keyset continuation after the first page
+            rows = app_state.conn.execute(sql, params).fetchall()
+            if len(rows) == limit:
+                next_sql, next_params = build_notes_query(
+                    term,
+                    categories,
+                    limit,
+                    use_fts=use_fts,
+                    after=next_page_cursor(rows),
+                )
+                results[label + "_next_page"] = measure(
+                    lambda: app_state.conn.execute(next_sql, next_params).fetchall(),
+                    repeat,
+                )
+
+    # Sort modes, without and with a category filter
+    for sort in SORT_MODES:
+        for name, categories in (("", []), ("_categories", ["sql", "python"])):
+            sql, params = build_notes_query("", categories, limit, sort=sort)
+            results[f"list_query_sort_{sort}{name}"] = measure(
+                lambda: app_state.conn.execute(sql, params).fetchall(), repeat
+            )
+
+    # Attachments of a page, fetched in one batched query
+    rows = app_state.conn.execute(*build_notes_query("", [], limit)).fetchall()
+    results["list_page_attachments"] = measure(
+        lambda: with_attachments(app_state.conn, rows), repeat
+    )
+    return results
+
+
+def bench_save_card(app_state, repeat):
+    """The UPDATE issued by RightPanel.save_card: queueing and commit."""
+    note_id, text = app_state.conn.execute(
+        "SELECT codigo_id, texto FROM notas ORDER BY codigo_id DESC LIMIT 1"
+    ).fetchone()
+    sql = "UPDATE notas SET categ = ?, titulo = ?, texto = ? WHERE codigo_id = ?"
+    counter = iter(range(10**9))
+
+    def queue_save():
+        app_state.storage.write(
+            sql, ("text", f"Title {next(counter)}", text + " edited", note_id)
+        )
+
+    def save_and_commit():
+        queue_save()
+        app_state.storage.flush()
+
+    results = {
+        "save_card_queue": measure(queue_save, repeat),
+    }
+    app_state.storage.flush()
+    results["save_card_commit"] = measure(save_and_commit, repeat)
+    return results
+
+
+def bench_render(app_state, repeat):
+    """Markdown rendering of a page of notes: new, from disk and from memory."""
+    limit = int(app_state.max_items)
+    texts = [
+        row[3] or ""
+        for row in app_state.conn.execute(*build_notes_query("", [], limit))
+    ]
+    results = {
+        "render_markdown_page": measure(
+            lambda: [render_markdown(text) for text in texts], repeat
+        ),
+    }
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = RenderCache(cache_dir)
+        for text in texts:
+            cache.get(text)
+        results["render_cache_page_disk"] = measure(
+            lambda: [cache.get(text) for text in texts],
+            repeat,
+            setup=cache.entries.clear,
+        )
+        results["render_cache_page_memory"] = measure(
+            lambda: [cache.get(text) for text in texts], repeat
+        )
+    return results
+
+
+def bench_highlight(repeat, line_count=5000):
+    """Tokenizing a long code note, in full and after a one-line edit."""
+    snippet = [
+        "def handler(event, context=None):",
+        '    """Docstring',
+        '    spanning lines."""',
+        "    total = 0x1F + 3.5  # comment",
+        "    return {'status': total, \"ok\": True}",
+        "",
+    ]
+    lines = (snippet * (line_count // len(snippet) + 1))[:line_count]
+    text = "\n".join(lines)
+    middle = line_count // 2
+    edited = "\n".join(lines[:middle] + [lines[middle] + " x"] + lines[middle + 1:])
+
+    results = {
+        "highlight_full": measure(lambda: TokenCache("python").update(text), repeat),
+    }
+    cache = TokenCache("python")
+    versions = iter([text, edited] * repeat)
+    cache.update(next(versions))
+    results["highlight_edit_line"] = measure(
+        lambda: cache.spans(*cache.update(next(versions))), repeat
+    )
+    return results
+
+
+# --- wx benchmarks ---
+
+
+def wx_available():
+    """Returns (True, None) or (False, reason)."""
+    try:
+        import wx
+    except ImportError:
+        return False, "wxPython is not installed"
+    if not wx.App.IsDisplayAvailable():
+        return False, "no display available"
+    return True, None
+
+
+def bench_cards(app_state, repeat):
+    """create_card_item (and a painted preview) per card and a full show_rows."""
+    import wx
+
+    from ui.card_preview import CardPreview
+    from ui.right_panel import RightPanel
+    from ui.theme import theme
+
+    app = wx.App(False)
+    theme.load(app_state.config)
+    frame = wx.Frame(None, size=(1200, 900))
+    # The panels load their icons from paths relative to the repository
+    cwd = os.getcwd()
+    os.chdir(REPO_DIR)
+    try:
+        with redirect_stdout(sys.stderr):
+            app_state.load_categories()
+        panel = RightPanel(frame, app_state, lambda category_key: None)
+        frame.Show()
+
+        limit = int(app_state.max_items)
+        rows = with_attachments(
+            app_state.conn,
+            app_state.conn.execute(*build_notes_query("", [], limit)).fetchall(),
+        )
+        row_iter = iter(rows * (repeat // len(rows) + 1))
+
+        def create_one():
+            row = next(row_iter)
+            card_panel = panel.create_card_item(row[0], row[1], row[2], row[3], row[4])
+            card_panel.Destroy()
+
+        results = {"create_card_item": measure(create_one, repeat)}
+
+        def create_preview():
+            row = next(row_iter)
+            preview = CardPreview(panel, app_state, lambda item_id: None, lambda: None)
+            preview.set_note(row[0], row[1], row[2], row[3], row[4])
+            preview.Destroy()
+
+        results["create_card_preview"] = measure(create_preview, repeat)
+
+        def clear_panel():
+            panel.show_rows([])
+
+        def show_page():
+            panel.show_rows(rows)
+            wx.SafeYield()
+
+        results["right_panel_show_rows"] = measure(
+            show_page, max(repeat // 10, 3), setup=clear_panel
+        )
+    finally:
+        os.chdir(cwd)
+        frame.Destroy()
+        app.Destroy()
+    return results
+
+
+# --- Runner ---
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat, workdir, skip_wx):
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "skipped": {},
+        "results": {},
+    }
+
+    has_wx, reason = (False, "--skip-wx") if skip_wx else wx_available()
+    if not has_wx:
+        report["skipped"]["wx"] = reason
+
+    for size in sizes:
+        db_path = os.path.join(workdir, f"notes_{size}.db")
+        if not os.path.exists(db_path):
+            print(f"Generating {size} notes in {db_path}...", file=sys.stderr)
+            with redirect_stdout(sys.stderr):
+                generate(db_path, size)
+
+        print(f"Benchmarking {size} notes...", file=sys.stderr)
+        results = {}
+        results.update(bench_initialize_database(db_path, repeat))
+
+        app_state = open_app_state(db_path)
+        try:
+            results.update(bench_load_categories(app_state, repeat))
+            results.update(bench_list_queries(app_state, repeat))
+            results.update(bench_save_card(app_state, repeat))
+            results.update(bench_render(app_state, repeat))
+            results.update(bench_highlight(repeat))
+            if has_wx:
+                results.update(bench_cards(app_state, repeat))
+        finally:
+            app_state.close_db()
+
+        report["results"][str(size)] = results
+    return report
+
+
+def compare(old_report, new_report):
+    """Prints the median change for every benchmark present in both reports."""
+    print(f"{'size':>8}  {'benchmark':<48} {'old ms':>10} {'new ms':>10} {'change':>8}")
+    for size, results in new_report["results"].items():
+        old_results = old_report.get("results", {}).get(size, {})
+        for name, stats in results.items():
+            if name not in old_results:
+                continue
+            old_ms = old_results[name]["median_ms"]
+            new_ms = stats["median_ms"]
+            change = (new_ms / old_ms - 1) * 100 if old_ms else 0.0
+            print(f"{size:>8}  {name:<48} {old_ms:>10.3f} {new_ms:>10.3f} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the VaPyNotes benchmarks.")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+        help="database sizes in notes (e.g. 1000 10000 100000)",
+    )
+    parser.add_argument("--repeat", type=int, default=30, help="runs per benchmark")
+    parser.add_argument(
+        "--workdir", help="where generated databases are kept (reused between runs)"
+    )
+    parser.add_argument("-o", "--output", help="JSON results file")
+    parser.add_argument("--compare", help="previous JSON results to compare with")
+    parser.add_argument("--skip-wx", action="store_true", help="skip wx benchmarks")
+    args = parser.parse_args()
+
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), "vapynotes_bench")
+    os.makedirs(workdir, exist_ok=True)
+
+    report = run(args.sizes, args.repeat, workdir, args.skip_wx)
+
+    output = args.output or os.path.join(
+        REPO_DIR,
+        "benchmarks",
+        "results",
+        f"bench-{report['commit'] or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    else:
+        for size, results in report["results"].items():
+            for name, stats in results.items():
+                print(f"{size:>8}  {name:<48} {stats['median_ms']:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# --- Category note counts ---
+
+# 'categorias' holds one row per category key with its number of notes,
+# kept current by triggers, so the counts (and the list of categories
+# in use) are read without scanning 'notas'. Notes without a category
+# are counted under ''. Created by the migrations (see migrations.py).
+CATEGORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS categorias (
+    categ TEXT PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS categorias_insert AFTER INSERT ON notas BEGIN
+    INSERT INTO categorias (categ, total) VALUES (coalesce(new.categ, ''), 1)
+    ON CONFLICT (categ) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS categorias_delete AFTER DELETE ON notas BEGIN
+    UPDATE categorias SET total = total - 1 WHERE categ = coalesce(old.categ, '');
+END;
+
+CREATE TRIGGER IF NOT EXISTS categorias_update AFTER UPDATE OF categ ON notas
+WHEN old.categ IS NOT new.categ BEGIN
+    UPDATE categorias SET total = total - 1 WHERE categ = coalesce(old.categ, '');
+    INSERT INTO categorias (categ, total) VALUES (coalesce(new.categ, ''), 1)
+    ON CONFLICT (categ) DO UPDATE SET total = total + 1;
+END;
+"""
+
+
+def load_category_counts(conn):
+    """Returns {category key: number of notes} for the categories in use."""
+    rows = conn.execute("SELECT categ, total FROM categorias WHERE total > 0")
+    return dict(rows.fetchall())
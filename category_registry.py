@@ -0,0 +1,114 @@
+import json
+import os
+from collections.abc import Mapping
+
+# --- Categories ---
+
+# The categories map ({key: {"label", "color"}}) kept in categories.json.
+# The registry reads like the plain dict it replaces, but changes go
+# through set(), which keeps a label -> key index and the sorted labels
+# of the card combo boxes up to date.
+
+
+class CategoryRegistry(Mapping):
+    """
+    Categories by key, with O(1) lookups by label and a cached sorted list
+    of labels. version changes whenever a category is added or changed.
+    """
+
+    def __init__(self, color_keys=(), path=None):
+        # CATCOLORS keys, in config.ini order
+        self.color_keys = list(color_keys)
+        self.path = path
+        self.entries = {}
+        self.keys_by_label = {}
+        self.labels = None
+        self.version = 0
+
+    def __getitem__(self, key):
+        return self.entries[key]
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def set(self, key, label, color=None):
+        """Adds or replaces a category; a new one gets the next free color."""
+        old = self.entries.get(key)
+        if color is None:
+            color = old["color"] if old else self.next_color()
+        self.entries[key] = {"label": label, "color": color}
+        if old and self.keys_by_label.get(old["label"]) == key:
+            # The old label goes to the next category that shares it
+            del self.keys_by_label[old["label"]]
+            for other_key, data in self.entries.items():
+                if data["label"] == old["label"]:
+                    self.keys_by_label[old["label"]] = other_key
+                    break
+        # The first category with a label keeps it, like the old linear search
+        self.keys_by_label.setdefault(label, key)
+        self.labels = None
+        self.version += 1
+
+    def key_for(self, label):
+        """The key of the category with this label, or None."""
+        return self.keys_by_label.get(label)
+
+    def sorted_labels(self):
+        """All labels in alphabetical order (shared; don't modify)."""
+        if self.labels is None:
+            self.labels = sorted(data["label"] for data in self.entries.values())
+        return self.labels
+
+    def next_color(self):
+        """
+        The CATCOLORS key used by the fewest categories, the first one in
+        config.ini order on ties, so the same categories always get the
+        same colors.
+        """
+        if not self.color_keys:
+            return "cor_001"
+        uses = dict.fromkeys(self.color_keys, 0)
+        for data in self.entries.values():
+            if data.get("color") in uses:
+                uses[data["color"]] += 1
+        return min(self.color_keys, key=uses.__getitem__)
+
+    def load(self, path=None):
+        """
+        Reads categories.json. Returns False if it is missing or unreadable
+        (the caller rebuilds the categories from the database).
+        """
+        path = path or self.path
+        try:
+            with open(path, "r") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        if not isinstance(entries, dict):
+            return False
+
+        self.entries = {}
+        self.keys_by_label = {}
+        for key, data in entries.items():
+            if isinstance(data, dict) and "label" in data:
+                self.set(key, data["label"], data.get("color"))
+        return True
+
+    def save(self, path=None):
+        """
+        Writes categories.json through a temporary file renamed over it,
+        so a crash while saving never leaves a truncated file.
+        """
+        path = path or self.path
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
@@ -10,14 +10,54 @@ ID_CLEAR_TAGS = 220
 ID_EXIT = 230
 ID_INSERT = 240
 ID_ABOUT = 250
+ID_EXPORT = 260
 ID_SPLITTER = 300
 ID_SEARCH = 310
 
 # Dimensions and Paths
 LEFT_PANEL_WIDTH = 310
 WINDOW_DIMS = {"w": 1400, "h": 1000}
+DB_FILE = os.path.join("data", "data_notes.db")
+CONFIG_FILE = os.path.join("data", "config.ini")
 IMAGE_DIR = os.path.join(os.getcwd(), "images")
 THUMB_DIR = os.path.join(os.getcwd(), "images/thumbs")
 THUMB_SIZE = (250, 250)
+THUMB_CACHE_BYTES = 64 * 1024 * 1024
+THUMB_PLACEHOLDER_SIZE = (64, 64)
+IMAGE_WORKERS = 2
+# Image files younger than this are never garbage collected
+IMAGE_GC_GRACE_SECONDS = 300
+ICON_SIZE = (32, 32)
 PADDING = 10
-DEFAULT_FONT = "Verdana"
\ No newline at end of file
+DEFAULT_FONT = "Verdana"
+
+# Delay after the last keystroke or tag toggle before searching
+SEARCH_DEBOUNCE_MS = 250
+
+# Startup: cards shown before the rest of the first page is loaded
+STARTUP_FIRST_CARDS = 3
+# Load the notes after this even if the window was not painted
+STARTUP_FALLBACK_MS = 1000
+
+# Painted card previews: lines of text drawn before the "..."
+PREVIEW_MAX_LINES = 12
+
+# Virtualized card list
+ESTIMATED_CARD_HEIGHT = 180
+CARD_OVERSCAN = 2
+CARD_POOL_SIZE = 16
+
+# Markdown read mode: rendered notes cached in memory and on disk
+RENDER_CACHE_DIR = os.path.join("data", "render_cache")
+RENDER_CACHE_ENTRIES = 2000
+# Notes whose tokens are kept for syntax highlighting while editing
+HIGHLIGHT_CACHE_NOTES = 64
+# Delay after the last keystroke before looking for a ``` fence in a plain note
+FENCE_CHECK_MS = 300
+
+# Tracing (enabled with "trace = 1" in config.ini)
+TRACE_LOG_FILE = os.path.join("data", "trace.jsonl")
+TRACE_LOG_BYTES = 1024 * 1024
+TRACE_LOG_BACKUPS = 3
+# Spans per name kept in memory for percentiles
+TRACE_WINDOW = 500
\ No newline at end of file
@@ -0,0 +1,184 @@
+import csv
+import json
+import os
+import shutil
+import time
+
+from attachments import load_attachments
+from constants import IMAGE_DIR
+from utils import sanitize_text
+
+# --- Export ---
+
+# csv and jsonl write one file; txt and md write one file per note into
+# a folder. Notes are read in batches with fetchmany, so memory use does
+# not depend on the size of the database.
+EXPORT_FORMATS = ("csv", "jsonl", "txt", "md")
+FOLDER_FORMATS = ("txt", "md")
+EXPORT_BATCH_SIZE = 500
+# Seconds between progress reports (the first comes after the first note)
+EXPORT_PROGRESS_INTERVAL = 0.2
+
+EXPORT_COLUMNS = ("codigo_id", "categ", "titulo", "texto", "data", "updated_at")
+# Fields written for each note (the attachments are a list of file names)
+EXPORT_FIELDS = (
+    "codigo_id", "categ", "titulo", "texto", "attachments", "data", "updated_at"
+)
+
+ATTACHMENTS_FOLDER = "attachments"
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def iter_notes(conn, batch_size=EXPORT_BATCH_SIZE):
+    """Yields every note as a dict, in codigo_id order, one batch at a time."""
+    cursor = conn.execute(
+        f"SELECT {', '.join(EXPORT_COLUMNS)} FROM notas ORDER BY codigo_id"
+    )
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        attachments = load_attachments(conn, [row[0] for row in rows])
+        for row in rows:
+            note = dict(zip(EXPORT_COLUMNS, row))
+            note["attachments"] = attachments.get(row[0], [])
+            yield note
+
+
+def front_matter(note, categories=None):
+    """The header of a .txt/.md note file, as read back by the importer."""
+    category = note["categ"] or ""
+    if categories and category in categories:
+        category = categories[category]["label"]
+    lines = [
+        "---",
+        f"title: {note['titulo'] or ''}",
+        f"category: {category}",
+        f"created: {note['data'] or ''}",
+        f"updated: {note['updated_at'] or ''}",
+    ]
+    if note["attachments"]:
+        lines.append(f"attachments: {', '.join(note['attachments'])}")
+    lines.append("---")
+    return "\n".join(lines) + "\n"
+
+
+def note_filename(note, extension):
+    title = sanitize_text(note["titulo"] or "") or "note"
+    return f"{note['codigo_id']}_{title}.{extension}"
+
+
+def copy_attachments(note, image_dir, attachments_dir):
+    """Copies a note's images to attachments_dir (once per file name)."""
+    for filename in note["attachments"]:
+        target = os.path.join(attachments_dir, filename)
+        if os.path.exists(target):
+            continue  # Shared by several notes (content-addressed)
+        source = os.path.join(image_dir, filename)
+        try:
+            shutil.copy2(source, target)
+        except OSError as e:
+            print(f"Attachment not exported ({filename}): {e}")
+
+
+def export_notes(
+    conn,
+    destination,
+    export_format,
+    include_attachments=False,
+    categories=None,
+    image_dir=IMAGE_DIR,
+    progress=None,
+    cancel_event=None,
+):
+    """
+    Exports every note.
+    'destination' is a file path (or an open text file) for csv and jsonl,
+    and a folder for txt and md. Attachments are copied to an
+    'attachments' folder next to the notes (inside the folder, or beside
+    the file as <name>_attachments).
+    progress(done, total) is called after the first note, then at most
+    every EXPORT_PROGRESS_INTERVAL seconds and at the end; setting
+    cancel_event stops the export with ExportCancelled after the current
+    note.
+    Returns the number of notes exported.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    total = conn.execute("SELECT COUNT(*) FROM notas").fetchone()[0]
+    to_folder = export_format in FOLDER_FORMATS
+
+    if to_folder:
+        os.makedirs(destination, exist_ok=True)
+        attachments_dir = os.path.join(destination, ATTACHMENTS_FOLDER)
+    elif isinstance(destination, str):
+        attachments_dir = os.path.splitext(destination)[0] + "_" + ATTACHMENTS_FOLDER
+    else:
+        attachments_dir = ATTACHMENTS_FOLDER
+    if include_attachments:
+        os.makedirs(attachments_dir, exist_ok=True)
+
+    output = None
+    if not to_folder:
+        if isinstance(destination, str):
+            output = open(destination, "w", encoding="utf-8", newline="")
+        else:
+            output = destination
+
+    done = 0
+    last_progress = None
+    try:
+        if export_format == "csv":
+            writer = csv.writer(output)
+            writer.writerow(EXPORT_FIELDS)
+
+        for note in iter_notes(conn):
+            if export_format == "csv":
+                writer.writerow(
+                    [
+                        ";".join(note[field]) if field == "attachments" else note[field]
+                        for field in EXPORT_FIELDS
+                    ]
+                )
+            elif export_format == "jsonl":
+                output.write(
+                    json.dumps(
+                        {field: note[field] for field in EXPORT_FIELDS},
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+            else:
+                body = front_matter(note, categories) + (note["texto"] or "")
+                if export_format == "md" and include_attachments:
+                    for filename in note["attachments"]:
+                        body += f"\n\n![{filename}]({ATTACHMENTS_FOLDER}/{filename})"
+                path = os.path.join(destination, note_filename(note, export_format))
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(body + "\n")
+
+            if include_attachments:
+                copy_attachments(note, image_dir, attachments_dir)
+
+            done += 1
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            if progress:
+                now = time.monotonic()
+                if (
+                    last_progress is None
+                    or now - last_progress >= EXPORT_PROGRESS_INTERVAL
+                ):
+                    progress(done, total)
+                    last_progress = now
+    finally:
+        if output is not None and output is not destination:
+            output.close()
+
+    if progress:
+        progress(done, total)
+    return done
@@ -0,0 +1,352 @@
+import html
+import re
+
+# --- Syntax highlighting ---
+
+# A small line-based tokenizer. Each line is tokenized from the state
+# left by the previous one (inside a block comment, a multi-line string
+# or a fenced block), so after an edit only the changed lines, and the
+# lines whose starting state changed, are tokenized again (TokenCache).
+TOKEN_COLORS = {
+    "keyword": "#3375ad",
+    "string": "#355c1d",
+    "comment": "#969da2",
+    "number": "#884642",
+    "fence": "#969da2",
+}
+
+
+class Language:
+    def __init__(
+        self,
+        name,
+        keywords,
+        line_comments=(),
+        multiline=(),
+        quotes=("'", '"'),
+        ignore_case=False,
+    ):
+        self.name = name
+        self.ignore_case = ignore_case
+        self.keywords = {k.lower() for k in keywords} if ignore_case else set(keywords)
+        # (opening, closing, kind) of the tokens that can span lines
+        self.multiline = multiline
+
+        alternatives = []
+        for opening, _, _ in multiline:
+            alternatives.append(re.escape(opening))
+        for prefix in line_comments:
+            alternatives.append(re.escape(prefix) + ".*")
+        for quote in quotes:
+            q = re.escape(quote)
+            alternatives.append(f"{q}(?:[^{q}\\\\]|\\\\.)*(?:{q}|$)")
+        alternatives.append(r"\b(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)\b")
+        alternatives.append(r"[A-Za-z_][A-Za-z0-9_]*")
+        self.pattern = re.compile("|".join(alternatives))
+        self.openings = {opening: index for index, (opening, _, _) in enumerate(multiline)}
+        self.line_comments = tuple(line_comments)
+        self.quotes = tuple(quotes)
+
+    def tokenize_line(self, line, state=None):
+        """
+        Returns ([(start, end, kind), ...], end_state) for one line.
+        The state is None or the index of the open multi-line token.
+        """
+        tokens = []
+        position = 0
+
+        if state is not None:
+            _, closing, kind = self.multiline[state]
+            end = line.find(closing)
+            if end < 0:
+                return [(0, len(line), kind)] if line else [], state
+            position = end + len(closing)
+            tokens.append((0, position, kind))
+            state = None
+
+        while True:
+            match = self.pattern.search(line, position)
+            if not match:
+                break
+            start, end = match.span()
+            text = match.group()
+            position = end
+
+            opening = self.openings.get(text)
+            if opening is not None:
+                _, closing, kind = self.multiline[opening]
+                close_at = line.find(closing, end)
+                if close_at < 0:
+                    tokens.append((start, len(line), kind))
+                    return tokens, opening
+                position = close_at + len(closing)
+                tokens.append((start, position, kind))
+            elif self.line_comments and text.startswith(self.line_comments):
+                tokens.append((start, end, "comment"))
+            elif text[0] in self.quotes:
+                tokens.append((start, end, "string"))
+            elif text[0].isdigit():
+                tokens.append((start, end, "number"))
+            elif (text.lower() if self.ignore_case else text) in self.keywords:
+                tokens.append((start, end, "keyword"))
+        return tokens, None
+
+
+PYTHON = Language(
+    "python",
+    "False None True and as assert async await break class continue def del "
+    "elif else except finally for from global if import in is lambda nonlocal "
+    "not or pass raise return self try while with yield".split(),
+    line_comments=("#",),
+    multiline=(('"""', '"""', "string"), ("'''", "'''", "string")),
+)
+SQL = Language(
+    "sql",
+    "add all alter and as asc autoincrement begin between by case check "
+    "column commit constraint create cross default delete desc distinct drop "
+    "else end exists foreign from full group having if in index inner insert "
+    "integer into is join key left like limit not null offset on or order "
+    "outer primary real references replace right rollback select set table "
+    "text then transaction trigger union unique update values view when "
+    "where with without".split(),
+    line_comments=("--",),
+    multiline=(("/*", "*/", "comment"),),
+    ignore_case=True,
+)
+JAVASCRIPT = Language(
+    "javascript",
+    "async await break case catch class const continue debugger default "
+    "delete do else export extends false finally for function if import in "
+    "instanceof interface let new null of return static super switch this "
+    "throw true try type typeof undefined var void while yield".split(),
+    line_comments=("//",),
+    multiline=(("/*", "*/", "comment"), ("`", "`", "string")),
+)
+CLIKE = Language(
+    "c",
+    "abstract auto bool break case catch char class const continue default "
+    "delete do double else enum extern false final float fn for func go goto "
+    "if impl implements import include int interface let long match mut "
+    "namespace new null nullptr package private protected public return "
+    "self short signed sizeof static struct super switch this throw throws "
+    "true try typedef union unsigned use using var virtual void volatile "
+    "while".split(),
+    line_comments=("//",),
+    multiline=(("/*", "*/", "comment"),),
+)
+SHELL = Language(
+    "shell",
+    "case do done elif else esac exit export fi for function if in local "
+    "return set then until while echo cd sudo git docker apt pip".split(),
+    line_comments=("#",),
+)
+JSON = Language("json", ["true", "false", "null"], quotes=('"',))
+
+# Names accepted in a category or after a ``` fence
+LANGUAGES = {
+    alias: language
+    for language, aliases in (
+        (PYTHON, ("python", "py", "python3")),
+        (SQL, ("sql", "sqlite", "mysql", "postgres", "postgresql")),
+        (JAVASCRIPT, ("javascript", "js", "typescript", "ts", "jsx", "tsx", "node")),
+        (CLIKE, ("c", "cpp", "c++", "java", "csharp", "c#", "cs", "go", "rust",
+                 "kotlin", "swift", "php")),
+        (SHELL, ("shell", "bash", "sh", "zsh", "linux", "git", "docker")),
+        (JSON, ("json",)),
+    )
+    for alias in aliases
+}
+
+MARKDOWN = "markdown"
+_FENCE_RE = re.compile(r"^\s*(```|~~~)\s*([\w+#.-]*)\s*$")
+
+
+def get_language(name):
+    return LANGUAGES.get((name or "").strip().lower())
+
+
+def detect_language(text, category_key=None, category_label=None):
+    """
+    The language of a note: its category when that names a language (the
+    whole note is code), MARKDOWN when it has fenced blocks (highlighted
+    after their ``` hint), or None.
+    """
+    for name in (category_key, category_label):
+        language = get_language(name)
+        if language:
+            return language.name
+    if text and ("```" in text or "~~~" in text):
+        return MARKDOWN
+    return None
+
+
+def tokenize_line(language_name, line, state=None):
+    """
+    Tokenizes one line of a note in language_name. For MARKDOWN the state
+    is None outside fences and (hint, inner_state) inside them.
+    """
+    if language_name != MARKDOWN:
+        return get_language(language_name).tokenize_line(line, state)
+
+    fence = _FENCE_RE.match(line)
+    if state is None:
+        if fence:
+            return [(0, len(line), "fence")], (fence.group(2).lower(), None)
+        return [], None
+
+    hint, inner_state = state
+    if fence and not fence.group(2):
+        return [(0, len(line), "fence")], None
+    language = get_language(hint)
+    if language is None:
+        return [], state
+    tokens, inner_state = language.tokenize_line(line, inner_state)
+    return tokens, (hint, inner_state)
+
+
+class TokenCache:
+    """
+    Tokens of one note, line by line, with the state at the end of each
+    line. update() re-tokenizes only what an edit changed.
+    """
+
+    def __init__(self, language_name):
+        self.language_name = language_name
+        self.lines = []
+        self.tokens = []
+        self.end_states = []
+
+    def update(self, text):
+        """
+        Tokenizes the changed part of text. Returns (first, last): the
+        range of lines of the new text whose tokens changed.
+        """
+        new_lines = text.split("\n")
+        old_lines = self.lines
+        limit = min(len(old_lines), len(new_lines))
+
+        # Unchanged lines before and after the edit
+        prefix = 0
+        while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while (
+            suffix < limit - prefix
+            and old_lines[-1 - suffix] == new_lines[-1 - suffix]
+        ):
+            suffix += 1
+        if prefix == len(old_lines) == len(new_lines):
+            return prefix, prefix
+
+        tokens = self.tokens[:prefix]
+        end_states = self.end_states[:prefix]
+        state = end_states[-1] if end_states else None
+
+        # The edited lines
+        for line in new_lines[prefix:len(new_lines) - suffix]:
+            line_tokens, state = tokenize_line(self.language_name, line, state)
+            tokens.append(line_tokens)
+            end_states.append(state)
+
+        # Following lines, until one starts in the state it had before
+        old_index = len(old_lines) - suffix
+        while old_index < len(old_lines):
+            old_state = self.end_states[old_index - 1] if old_index else None
+            if old_state == state:
+                tokens.extend(self.tokens[old_index:])
+                end_states.extend(self.end_states[old_index:])
+                break
+            line_tokens, state = tokenize_line(
+                self.language_name, old_lines[old_index], state
+            )
+            tokens.append(line_tokens)
+            end_states.append(state)
+            old_index += 1
+
+        last = len(new_lines) - (len(old_lines) - old_index)
+        self.lines = new_lines
+        self.tokens = tokens
+        self.end_states = end_states
+        return prefix, last
+
+    def spans(self, first, last):
+        """
+        Token spans of lines first..last as (start, end, kind) text offsets,
+        with the offsets where those lines start and end.
+        """
+        offset = sum(len(line) + 1 for line in self.lines[:first])
+        range_start = offset
+        spans = []
+        for index in range(first, last):
+            for start, end, kind in self.tokens[index]:
+                spans.append((offset + start, offset + end, kind))
+            offset += len(self.lines[index]) + 1
+        return range_start, max(offset - 1, range_start), spans
+
+
+def highlight_html(text, language_name):
+    """text as escaped HTML with <font> colors for its tokens."""
+    output = []
+    state = None
+    for line in text.split("\n"):
+        tokens, state = tokenize_line(language_name, line, state)
+        position = 0
+        parts = []
+        for start, end, kind in tokens:
+            parts.append(html.escape(line[position:start]))
+            parts.append(
+                f'<font color="{TOKEN_COLORS[kind]}">'
+                f"{html.escape(line[start:end])}</font>"
+            )
+            position = end
+        parts.append(html.escape(line[position:]))
+        output.append("".join(parts))
+    return "\n".join(output)
+
+
+def common_prefix_length(a, b):
+    """Length of the common prefix of two strings (compared in slices)."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def shift_spans(old_text, new_text, range_start, range_end, spans):
+    """
+    Moves spans computed for old_text onto new_text, for results that
+    arrive after another edit. Spans touching the edited part are dropped;
+    the tokens there come with the result for the newer text.
+    """
+    prefix = common_prefix_length(old_text, new_text)
+    suffix = common_prefix_length(old_text[prefix:][::-1], new_text[prefix:][::-1])
+    old_edit_end = len(old_text) - suffix
+    delta = len(new_text) - len(old_text)
+
+    def move(start, end):
+        if end <= prefix:
+            return start, end
+        if start >= old_edit_end:
+            return start + delta, end + delta
+        return None
+
+    moved = [
+        (*position, kind)
+        for position, kind in (
+            (move(start, end), kind) for start, end, kind in spans
+        )
+        if position
+    ]
+    # The range is reset to the default style: keep it out of the edit
+    reset = move(range_start, range_end)
+    if reset is None:
+        if range_start < prefix:
+            reset = (range_start, prefix)
+        else:
+            start = old_edit_end + delta
+            reset = (start, max(start, range_end + delta))
+    return reset[0], reset[1], moved
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import time
+
+from constants import IMAGE_DIR, IMAGE_GC_GRACE_SECONDS, THUMB_DIR
+
+# --- Content-addressed image store ---
+
+# Pasted images are named after a hash of their pixels, so the same
+# image attached to several notes is stored once. 'images' counts the
+# attachments referencing each file; the triggers keep it current and
+# files whose count drops to zero are removed (see pop_unreferenced).
+IMAGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    filename TEXT PRIMARY KEY,
+    refs     INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS images_ref AFTER INSERT ON attachments BEGIN
+    INSERT INTO images (filename, refs) VALUES (new.filename, 1)
+    ON CONFLICT (filename) DO UPDATE SET refs = refs + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS images_unref AFTER DELETE ON attachments BEGIN
+    UPDATE images SET refs = refs - 1 WHERE filename = old.filename;
+END;
+"""
+
+IMAGE_EXTENSION = ".jpg"
+
+
+def content_filename(mode, size, pixels):
+    """File name for an image: the SHA-256 of its mode, size and pixel data."""
+    digest = hashlib.sha256(f"{mode}:{size[0]}x{size[1]}:".encode())
+    digest.update(pixels)
+    return digest.hexdigest() + IMAGE_EXTENSION
+
+
+def pop_unreferenced(conn):
+    """
+    Forgets the images no attachment references anymore and returns their
+    file names (runs on the storage writer thread).
+    """
+    filenames = [
+        row[0]
+        for row in conn.execute("SELECT filename FROM images WHERE refs <= 0")
+    ]
+    conn.execute("DELETE FROM images WHERE refs <= 0")
+    return filenames
+
+
+def remove_files(filenames, image_dir=IMAGE_DIR, thumb_dir=THUMB_DIR, dry_run=False):
+    """
+    Deletes the images and their thumbnails. Files modified in the last
+    IMAGE_GC_GRACE_SECONDS are kept: they may belong to a paste whose
+    attachment is not stored yet.
+    Returns (paths, bytes) removed, or that would be removed.
+    """
+    min_age = time.time() - IMAGE_GC_GRACE_SECONDS
+    removed = []
+    total_bytes = 0
+    for filename in filenames:
+        for folder in (image_dir, thumb_dir):
+            path = os.path.join(folder, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_mtime > min_age:
+                continue
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Could not remove {path}: {e}")
+                    continue
+            removed.append(path)
+            total_bytes += stat.st_size
+    return removed, total_bytes
+
+
+def find_orphans(conn, image_dir=IMAGE_DIR, thumb_dir=THUMB_DIR):
+    """Image files in image_dir or thumb_dir that no attachment references."""
+    referenced = {
+        row[0] for row in conn.execute("SELECT DISTINCT filename FROM attachments")
+    }
+    orphans = set()
+    for folder in (image_dir, thumb_dir):
+        try:
+            entries = os.scandir(folder)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if (
+                    entry.is_file()
+                    and entry.name.lower().endswith(IMAGE_EXTENSION)
+                    and entry.name not in referenced
+                ):
+                    orphans.add(entry.name)
+    return sorted(orphans)
+
+
+def collect_garbage(conn, image_dir=IMAGE_DIR, thumb_dir=THUMB_DIR, dry_run=False):
+    """
+    Removes the image files that no note references. Meant to run off
+    the GUI thread with a read connection. Returns a report dict with the
+    number of files and the bytes reclaimed (or reclaimable, on a dry run).
+    """
+    start = time.perf_counter()
+    orphans = find_orphans(conn, image_dir, thumb_dir)
+    removed, total_bytes = remove_files(orphans, image_dir, thumb_dir, dry_run)
+    return {
+        "dry_run": dry_run,
+        "removed": removed,
+        "files": len(removed),
+        "bytes": total_bytes,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
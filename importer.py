@@ -0,0 +1,298 @@
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from attachments import add_attachment
+from constants import IMAGE_DIR
+from exporter import ATTACHMENTS_FOLDER
+
+# --- Import ---
+
+# Imports a folder of .txt/.md files, one note per file. Files are read
+# and parsed on a thread pool; notes are inserted in large executemany
+# transactions on the storage writer thread. Each imported file is
+# recorded in 'imports' (see the migrations) with a hash of its content,
+# so running the import again skips unchanged files, updates the notes
+# of changed ones and never duplicates a note. Images listed in the front
+# matter (export -f md --attachments) are attached again: taken from the
+# image store, or copied into it from the export's attachments folder
+# (without a thumbnail; the CLI never loads PIL).
+IMPORT_EXTENSIONS = (".txt", ".md")
+IMPORT_BATCH_SIZE = 1000
+IMPORT_WORKERS = 4
+
+IMPORTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS imports (
+    source       TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    codigo_id    INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS imports_hash ON imports (content_hash);
+"""
+
+_FRONT_MATTER_RE = re.compile(r"\A---[ \t]*\r?\n(.*?)\r?\n---[ \t]*(?:\r?\n|\Z)", re.S)
+_HEADING_RE = re.compile(r"\A#[ \t]+(.+?)[ \t]*#*[ \t]*(?:\r?\n|\Z)")
+
+
+def find_note_files(folder):
+    """Paths of the .txt/.md files under folder, in a stable order."""
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMPORT_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def parse_front_matter(text):
+    """
+    Splits 'key: value' front matter (between '---' lines at the top of
+    the file) from the body. Returns (fields, body).
+    """
+    match = _FRONT_MATTER_RE.match(text)
+    if not match:
+        return {}, text
+    fields = {}
+    for line in match.group(1).splitlines():
+        key, separator, value = line.partition(":")
+        if separator and key.strip():
+            fields[key.strip().lower()] = value.strip().strip("\"'")
+    return fields, text[match.end():]
+
+
+def parse_created(value):
+    """
+    The date of a 'created' front matter value (ISO date or date and time)
+    as stored in notas.data, or None if it isn't a date.
+    """
+    try:
+        return datetime.fromisoformat(value).date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_note_file(path):
+    """
+    Reads a note file (runs on the worker pool). Returns a dict with
+    source, content_hash, title, category, created and text, or None if
+    the file can't be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        print(f"Could not read {path}: {e}")
+        return None
+
+    text = data.decode("utf-8", errors="replace").lstrip("\ufeff")
+    fields, body = parse_front_matter(text)
+
+    title = fields.get("title")
+    if not title:
+        # A leading markdown heading, or else the file name
+        heading = _HEADING_RE.match(body)
+        if heading:
+            title = heading.group(1)
+            body = body[heading.end():]
+        else:
+            title = os.path.splitext(os.path.basename(path))[0]
+
+    # The exporter also links each attachment at the end of an .md body
+    attachments = [
+        os.path.basename(name.strip())
+        for name in fields.get("attachments", "").split(",")
+        if name.strip()
+    ]
+    body = body.rstrip()
+    for filename in reversed(attachments):
+        link = f"![{filename}]({ATTACHMENTS_FOLDER}/{filename})"
+        if body.endswith(link):
+            body = body[: -len(link)].rstrip()
+
+    return {
+        "source": os.path.abspath(path),
+        "content_hash": hashlib.sha256(data).hexdigest(),
+        "title": title,
+        "category": fields.get("category") or fields.get("categ") or "",
+        "created": parse_created(fields.get("created")),
+        "text": body.strip("\r\n"),
+        "attachments": attachments,
+    }
+
+
+def store_attachment_files(note, image_dir=IMAGE_DIR):
+    """
+    Copies a note's exported images into the image store when missing.
+    Returns the (filename, image_path) pairs that can be attached.
+    """
+    exported_dir = os.path.join(os.path.dirname(note["source"]), ATTACHMENTS_FOLDER)
+    files = []
+    for filename in note["attachments"]:
+        image_path = os.path.join(image_dir, filename)
+        if not os.path.exists(image_path):
+            try:
+                os.makedirs(image_dir, exist_ok=True)
+                # A new mtime: garbage collection keeps it until it's attached
+                shutil.copyfile(os.path.join(exported_dir, filename), image_path)
+            except OSError as e:
+                print(f"Attachment not imported ({filename}): {e}")
+                continue
+        files.append((filename, image_path))
+    return files
+
+
+def store_batch(conn, notes):
+    """
+    Inserts or updates a batch of parsed notes (runs on the storage writer
+    thread). Returns (inserted, updated, skipped).
+    """
+    known = {}
+    for start in range(0, len(notes), 500):
+        chunk = [note["source"] for note in notes[start:start + 500]]
+        placeholders = ", ".join("?" * len(chunk))
+        for source, content_hash, note_id in conn.execute(
+            "SELECT source, content_hash, codigo_id FROM imports "
+            f"WHERE source IN ({placeholders})",
+            chunk,
+        ):
+            known[source] = (content_hash, note_id)
+
+    existing_ids = set()
+    known_ids = [note_id for _, note_id in known.values()]
+    for start in range(0, len(known_ids), 500):
+        chunk = known_ids[start:start + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        existing_ids.update(
+            row[0]
+            for row in conn.execute(
+                f"SELECT codigo_id FROM notas WHERE codigo_id IN ({placeholders})",
+                chunk,
+            )
+        )
+
+    next_id = (conn.execute("SELECT MAX(codigo_id) FROM notas").fetchone()[0] or 0) + 1
+    inserts, updates, records, attachments = [], [], [], []
+    seen_hashes = set()
+    skipped = 0
+    for note in notes:
+        previous = known.get(note["source"])
+        if previous and previous[1] in existing_ids:
+            if previous[0] == note["content_hash"]:
+                skipped += 1
+                continue
+            # The file changed since the last import
+            updates.append((note["category"], note["title"], note["text"], previous[1]))
+            attachments.extend((previous[1], *file) for file in note["files"])
+            records.append((note["source"], note["content_hash"], previous[1]))
+            continue
+
+        # Same content imported from another path (or twice in this batch)
+        if note["content_hash"] in seen_hashes or conn.execute(
+            "SELECT 1 FROM imports JOIN notas USING (codigo_id) "
+            "WHERE content_hash = ? AND source != ?",
+            (note["content_hash"], note["source"]),
+        ).fetchone():
+            skipped += 1
+            continue
+        seen_hashes.add(note["content_hash"])
+
+        inserts.append(
+            (next_id, note["category"], note["title"], note["text"], note["created"])
+        )
+        records.append((note["source"], note["content_hash"], next_id))
+        attachments.extend((next_id, *file) for file in note["files"])
+        next_id += 1
+
+    conn.executemany(
+        "INSERT INTO notas (codigo_id, categ, titulo, texto, data, updated_at) "
+        "VALUES (?, ?, ?, ?, coalesce(?, DATE('now')), DATETIME('now'))",
+        inserts,
+    )
+    conn.executemany(
+        "UPDATE notas SET categ = ?, titulo = ?, texto = ? WHERE codigo_id = ?",
+        updates,
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO imports (source, content_hash, codigo_id) "
+        "VALUES (?, ?, ?)",
+        records,
+    )
+    # Already attached images are skipped
+    for note_id, filename, image_path in attachments:
+        add_attachment(conn, note_id, filename, image_path)
+    return len(inserts), len(updates), skipped
+
+
+def import_folder(
+    app_state, folder, progress=None, workers=IMPORT_WORKERS, image_dir=IMAGE_DIR
+):
+    """
+    Imports the .txt/.md files under folder. Categories in the front
+    matter are matched by label (or key) and created when missing, as
+    when a card is saved; the caller saves the categories if needed.
+    progress(done, total) is called when each batch has been written (on
+    the storage writer thread).
+    Returns a dict with the number of files found, inserted, updated,
+    skipped and failed (unreadable, or in a batch that could not be
+    written), and whether categories were created.
+    """
+    paths = find_note_files(folder)
+    report = {
+        "files": len(paths),
+        "inserted": 0,
+        "updated": 0,
+        "skipped": 0,
+        "failed": 0,
+        "categories_created": False,
+    }
+    pending = []
+
+    def report_written(future, done):
+        progress(done, len(paths))
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="Importer"
+    ) as executor:
+        for start in range(0, len(paths), IMPORT_BATCH_SIZE):
+            batch = []
+            for note in executor.map(
+                parse_note_file, paths[start:start + IMPORT_BATCH_SIZE]
+            ):
+                if note is None:
+                    report["failed"] += 1
+                    continue
+                category_key, created = app_state.resolve_category(note["category"])
+                report["categories_created"] |= created
+                note["category"] = category_key
+                note["files"] = store_attachment_files(note, image_dir)
+                batch.append(note)
+
+            # Parse the next batch while this one is written
+            future = app_state.storage.transaction(
+                lambda conn, batch=batch: store_batch(conn, batch)
+            )
+            if progress:
+                # Batches are written in order, so this many files are done
+                done = min(start + IMPORT_BATCH_SIZE, len(paths))
+                future.add_done_callback(partial(report_written, done=done))
+            pending.append((future, len(batch)))
+
+    for future, batch_size in pending:
+        try:
+            inserted, updated, skipped = future.result()
+        except sqlite3.Error as e:
+            # Rolled back alone; the other batches are kept
+            print(f"Could not import {batch_size} notes: {e}")
+            report["failed"] += batch_size
+            continue
+        report["inserted"] += inserted
+        report["updated"] += updated
+        report["skipped"] += skipped
+    return report
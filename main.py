@@ -7,17 +7,33 @@ author: Vagner Vargas
 website: dev.aquart.com.br
 last edited: Out 2025
 """
-import wx
-from app_state import AppState
-from ui.main_frame import MainFrame
+import time
+
+# Taken before the imports, so the startup timings include them
+START = time.perf_counter()
+
+import sys  # noqa: E402
+
+import wx  # noqa: E402
+from app_state import AppState  # noqa: E402
+from tracing import StartupTimer  # noqa: E402
+from ui.main_frame import MainFrame  # noqa: E402
 
 
 def main():
     """Main function to run the application."""
+    # --measure-startup prints the startup timings and quits
+    startup = StartupTimer(START, exit_when_done="--measure-startup" in sys.argv)
+    startup.mark("imports")
     AppState.initialize_database()
+    startup.mark("initialize_database")
     app = wx.App()
-    frame = MainFrame(None)
+    # The frame only builds its widgets; the notes are loaded in stages
+    # after it is painted
+    frame = MainFrame(None, startup=startup)
+    startup.mark("frame")
     frame.Show()
+    startup.mark("show")
     app.MainLoop()
 
 if __name__ == "__main__":
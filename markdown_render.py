@@ -0,0 +1,250 @@
+import hashlib
+import html
+import os
+import re
+from collections import OrderedDict
+
+from constants import RENDER_CACHE_DIR, RENDER_CACHE_ENTRIES
+from highlight import get_language, highlight_html
+
+# --- Markdown rendering ---
+
+# Converts note text to the HTML subset wx.html understands: headings,
+# paragraphs, emphasis, code spans and fenced blocks, lists, quotes,
+# rules and links. Single line breaks are kept, since most notes were
+# written as plain text. Fenced blocks with a known language hint and
+# notes whose category is a language are syntax highlighted. Bump
+# RENDER_VERSION when the output changes, so cached renders are not
+# reused.
+RENDER_VERSION = "2"
+
+_FENCE_RE = re.compile(r"^\s*(```|~~~)\s*([\w+#.-]*)\s*$")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_BULLET_RE = re.compile(r"^\s*[-*+]\s+(.*)$")
+_NUMBERED_RE = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+_QUOTE_RE = re.compile(r"^\s*>\s?(.*)$")
+
+_CODE_SPAN_RE = re.compile(r"`([^`]+)`")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_URL_RE = re.compile(r"\bhttps?://[^\s<]+[^\s<.,;:!?)\]'\"]")
+_BOLD_RE = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_ITALIC_RE = re.compile(r"(?<![\w*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])")
+_STRIKE_RE = re.compile(r"~~(?=\S)(.+?)(?<=\S)~~")
+_PLACEHOLDER_RE = re.compile("\x00(\\d+)\x00")
+
+
+def render_inline(text):
+    """Escapes a line of text and applies the inline markup."""
+    protected = []
+
+    def protect(fragment):
+        protected.append(fragment)
+        return f"\x00{len(protected) - 1}\x00"
+
+    # Code spans and links are set aside so emphasis doesn't apply inside them
+    text = _CODE_SPAN_RE.sub(
+        lambda m: protect(f"<code>{html.escape(m.group(1))}</code>"), text
+    )
+    text = _LINK_RE.sub(
+        lambda m: protect(
+            f'<a href="{html.escape(m.group(2))}">{html.escape(m.group(1))}</a>'
+        ),
+        text,
+    )
+    text = _URL_RE.sub(
+        lambda m: protect(
+            f'<a href="{html.escape(m.group(0))}">{html.escape(m.group(0))}</a>'
+        ),
+        text,
+    )
+
+    text = html.escape(text, quote=False)
+    text = _BOLD_RE.sub(r"<b>\2</b>", text)
+    text = _ITALIC_RE.sub(r"<i>\2</i>", text)
+    text = _STRIKE_RE.sub(r"<s>\1</s>", text)
+
+    # Leading spaces would be collapsed by the HTML layout
+    stripped = text.lstrip(" \t")
+    indent = text[: len(text) - len(stripped)].replace("\t", "    ")
+    text = "&nbsp;" * len(indent) + stripped
+
+    return _PLACEHOLDER_RE.sub(lambda m: protected[int(m.group(1))], text)
+
+
+def render_code_block(code, hint=None):
+    """A <pre> block, highlighted if hint names a known language."""
+    language = get_language(hint)
+    if language:
+        return f"<pre>{highlight_html(code, language.name)}</pre>"
+    return f"<pre><code>{html.escape(code)}</code></pre>"
+
+
+def render_markdown(text):
+    """Returns the HTML for a note's text."""
+    output = []
+    paragraph = []
+    list_tag = None
+    code_lines = None
+    code_hint = None
+
+    def close_paragraph():
+        if paragraph:
+            output.append("<p>" + "<br>".join(paragraph) + "</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            output.append(f"</{list_tag}>")
+            list_tag = None
+
+    for line in (text or "").replace("\r\n", "\n").split("\n"):
+        # Fenced code blocks are shown verbatim
+        fence = _FENCE_RE.match(line)
+        if code_lines is not None:
+            if fence and not fence.group(2):
+                output.append(render_code_block("\n".join(code_lines), code_hint))
+                code_lines = None
+            else:
+                code_lines.append(line)
+            continue
+        if fence:
+            close_paragraph()
+            close_list()
+            code_lines = []
+            code_hint = fence.group(2)
+            continue
+
+        if not line.strip():
+            close_paragraph()
+            close_list()
+            continue
+
+        heading = _HEADING_RE.match(line)
+        if heading:
+            close_paragraph()
+            close_list()
+            level = len(heading.group(1))
+            output.append(f"<h{level}>{render_inline(heading.group(2))}</h{level}>")
+            continue
+
+        if _RULE_RE.match(line):
+            close_paragraph()
+            close_list()
+            output.append("<hr>")
+            continue
+
+        quote = _QUOTE_RE.match(line)
+        if quote:
+            close_paragraph()
+            close_list()
+            output.append(f"<blockquote>{render_inline(quote.group(1))}</blockquote>")
+            continue
+
+        bullet = _BULLET_RE.match(line)
+        numbered = None if bullet else _NUMBERED_RE.match(line)
+        if bullet or numbered:
+            close_paragraph()
+            tag = "ul" if bullet else "ol"
+            if list_tag != tag:
+                close_list()
+                output.append(f"<{tag}>")
+                list_tag = tag
+            output.append(f"<li>{render_inline((bullet or numbered).group(1))}</li>")
+            continue
+
+        close_list()
+        paragraph.append(render_inline(line))
+
+    if code_lines is not None:
+        # Unclosed fence: show the rest as code
+        output.append(render_code_block("\n".join(code_lines), code_hint))
+    close_paragraph()
+    close_list()
+    return "\n".join(output)
+
+
+def render_note(text, language=None):
+    """A note as HTML: all code when language is set, markdown otherwise."""
+    if language:
+        return render_code_block(text or "", language)
+    return render_markdown(text)
+
+
+class RenderCache:
+    """
+    Rendered HTML keyed by a hash of the note text, its language and
+    RENDER_VERSION.
+    Recent renders are kept in memory in LRU order; every render is also
+    written to cache_dir, so unchanged notes are not rendered again after
+    a restart.
+    """
+
+    def __init__(self, cache_dir=RENDER_CACHE_DIR, max_entries=RENDER_CACHE_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.renders = 0
+
+    @staticmethod
+    def content_key(text, language=None):
+        digest = hashlib.sha256(
+            f"{RENDER_VERSION}\x00{language or ''}\x00{text}".encode("utf-8")
+        )
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".html")
+
+    def get_cached(self, text, language=None):
+        """Returns the HTML if it is in memory, without touching the disk."""
+        key = self.content_key(text, language)
+        rendered = self.entries.get(key)
+        if rendered is not None:
+            self.entries.move_to_end(key)
+        return rendered
+
+    def get(self, text, language=None):
+        """
+        Returns the HTML for text, from memory, disk or a new render.
+        language is set for notes that are all code (see render_note).
+        """
+        key = self.content_key(text, language)
+        rendered = self.entries.get(key)
+        if rendered is not None:
+            self.entries.move_to_end(key)
+            return rendered
+
+        path = self.path_for(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                rendered = f.read()
+        except OSError:
+            rendered = render_note(text, language)
+            self.renders += 1
+            self.write(path, rendered)
+
+        self.put(key, rendered)
+        return rendered
+
+    def put(self, key, rendered):
+        self.entries[key] = rendered
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    @staticmethod
+    def write(path, rendered):
+        # Written to a temporary file first, so a reader never sees half a file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(rendered)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Render not cached ({path}): {e}")
+
+
+render_cache = RenderCache()
@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import time
+
+from attachments import ATTACHMENTS_SCHEMA, thumb_path_for
+from category_counts import CATEGORY_SCHEMA
+from constants import IMAGE_DIR
+from image_store import IMAGES_SCHEMA
+from importer import IMPORTS_SCHEMA
+
+# --- Schema migrations ---
+#
+# The schema version is stored in PRAGMA user_version. Each migration
+# runs in its own transaction together with the version bump, so a
+# failed migration leaves the database at the previous version.
+# Migrations are never edited once released; add a new one instead.
+
+
+def run_script(conn, script):
+    """Runs a multi-statement script inside the current transaction."""
+    # executescript() would commit first, so statements run one by one
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+
+def create_notes_table(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS notas (
+        codigo_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        categ     TEXT,
+        titulo    TEXT,
+        texto     TEXT,
+        imagens   TEXT,
+        data      DATE DEFAULT (DATE('now'))
+    );
+    """)
+
+
+def create_category_counts(conn):
+    run_script(conn, CATEGORY_SCHEMA)
+    # Recount in case the table already existed
+    conn.execute("DELETE FROM categorias")
+    conn.execute(
+        "INSERT INTO categorias (categ, total) "
+        "SELECT coalesce(categ, ''), COUNT(*) FROM notas GROUP BY 1"
+    )
+
+
+def create_list_indexes(conn):
+    # Filtered listing: WHERE categ IN (...) ORDER BY codigo_id DESC
+    conn.execute("DROP INDEX IF EXISTS notas_categ")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS notas_categ_id ON notas (categ, codigo_id DESC)"
+    )
+    # Date ordering
+    conn.execute("CREATE INDEX IF NOT EXISTS notas_data ON notas (data)")
+
+
+def create_attachments(conn):
+    run_script(conn, ATTACHMENTS_SCHEMA)
+
+    # Move the comma-separated 'imagens' lists into the table
+    rows = conn.execute(
+        "SELECT codigo_id, imagens FROM notas WHERE imagens IS NOT NULL AND imagens != ''"
+    ).fetchall()
+    attachments = []
+    for note_id, image_list in rows:
+        filenames = [x.strip() for x in image_list.split(",") if x.strip()]
+        for ordinal, filename in enumerate(dict.fromkeys(filenames), 1):
+            image_path = os.path.join(IMAGE_DIR, filename)
+            size = os.path.getsize(image_path) if os.path.exists(image_path) else None
+            attachments.append(
+                (note_id, filename, ordinal, size, thumb_path_for(filename))
+            )
+    conn.executemany(
+        "INSERT INTO attachments (codigo_id, filename, ordinal, size, thumb_path) "
+        "VALUES (?, ?, ?, ?, ?)",
+        attachments,
+    )
+    conn.execute("UPDATE notas SET imagens = NULL WHERE imagens IS NOT NULL")
+
+
+def create_image_refs(conn):
+    run_script(conn, IMAGES_SCHEMA)
+    conn.execute("DELETE FROM images")
+    conn.execute(
+        "INSERT INTO images (filename, refs) "
+        "SELECT filename, COUNT(*) FROM attachments GROUP BY filename"
+    )
+
+
+def add_updated_at(conn):
+    conn.execute("ALTER TABLE notas ADD COLUMN updated_at TEXT")
+    # In the format the trigger writes, so old and new notes sort together
+    conn.execute(
+        "UPDATE notas SET updated_at = coalesce(DATETIME(data), DATETIME('now'))"
+    )
+    # New notes set updated_at in their INSERT (SQLite can't add a column
+    # with a DATETIME('now') default); edits are stamped by the trigger
+    run_script(conn, """
+    CREATE TRIGGER IF NOT EXISTS notas_updated AFTER UPDATE OF categ, titulo, texto ON notas
+    WHEN old.categ IS NOT new.categ
+        OR old.titulo IS NOT new.titulo
+        OR old.texto IS NOT new.texto
+    BEGIN
+        UPDATE notas SET updated_at = DATETIME('now') WHERE codigo_id = new.codigo_id;
+    END;
+    """)
+
+    # One index per sort mode, alone and after the category filter
+    # (the rowid, codigo_id, is the implicit last column of each index)
+    conn.execute("CREATE INDEX IF NOT EXISTS notas_updated_at ON notas (updated_at)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS notas_categ_updated_at ON notas (categ, updated_at)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS notas_categ_data ON notas (categ, data)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS notas_titulo ON notas (titulo COLLATE NOCASE)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS notas_categ_titulo "
+        "ON notas (categ, titulo COLLATE NOCASE)"
+    )
+
+
+def create_imports(conn):
+    run_script(conn, IMPORTS_SCHEMA)
+
+
+# (version, description, function)
+MIGRATIONS = [
+    (1, "notes table", create_notes_table),
+    (2, "category counts", create_category_counts),
+    (3, "listing indexes", create_list_indexes),
+    (4, "attachments table", create_attachments),
+    (5, "image references", create_image_refs),
+    (6, "updated_at and sort indexes", add_updated_at),
+    (7, "import records", create_imports),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn):
+    """
+    Applies the migrations newer than the database's user_version and
+    runs ANALYZE when any was applied. Returns the applied versions.
+    Raises sqlite3.Error if a migration fails (it is rolled back).
+    """
+    current_version = get_schema_version(conn)
+    if current_version > SCHEMA_VERSION:
+        print(
+            f"Database schema version {current_version} is newer than "
+            f"this application ({SCHEMA_VERSION})."
+        )
+        return []
+
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # Transactions are managed here
+    applied = []
+    try:
+        for version, description, migrate in MIGRATIONS:
+            if version <= current_version:
+                continue
+
+            start = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                migrate(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                conn.execute("ROLLBACK")
+                print(f"Migration {version} ({description}) failed: {e}")
+                raise
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Migration {version} ({description}) applied in {elapsed:.1f} ms")
+            applied.append(version)
+
+        if applied:
+            start = time.perf_counter()
+            conn.execute("ANALYZE")
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"ANALYZE done in {elapsed:.1f} ms")
+    finally:
+        conn.isolation_level = isolation_level
+
+    return applied
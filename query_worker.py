@@ -0,0 +1,81 @@
+import queue
+import sqlite3
+import threading
+
+
+class QueryWorker:
+    """
+    Runs read-only queries on a background thread with its own
+    read connection from Storage. Each result is handed to 'deliver'
+    (e.g. wx.CallAfter) together with the request's callback, so
+    callbacks can run on the GUI thread.
+    Queries can be cancelled with cancel(): queued ones are dropped and
+    the running one is interrupted, so only newer results are delivered.
+    """
+
+    def __init__(self, storage, deliver):
+        self.storage = storage
+        self.deliver = deliver
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.conn = None
+        self.running = False
+
+        self.thread = threading.Thread(
+            target=self.run, name="QueryWorker", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, sql, params, callback, transform=None):
+        """
+        Queues a query. callback(rows) receives None if the query fails.
+        transform(conn, rows), if given, runs on the worker thread and
+        its result is passed to the callback instead of the rows.
+        """
+        with self.lock:
+            self.requests.put((self.generation, sql, params, callback, transform))
+
+    def cancel(self):
+        """Cancels the queued queries and interrupts the running one."""
+        with self.lock:
+            self.generation += 1
+            if self.running and self.conn is not None:
+                self.conn.interrupt()
+
+    def stop(self):
+        """Stops the worker after the queued queries."""
+        self.requests.put(None)
+        self.thread.join(timeout=1)
+
+    def run(self):
+        self.conn = self.storage.reader()
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+
+            generation, sql, params, callback, transform = request
+            with self.lock:
+                if generation != self.generation:
+                    continue  # Cancelled while queued
+                self.running = True
+
+            try:
+                rows = self.conn.execute(sql, params).fetchall()
+                if transform:
+                    rows = transform(self.conn, rows)
+            except sqlite3.OperationalError as e:
+                if str(e) != "interrupted":
+                    print(f"Background query failed: {e}")
+                rows = None
+            except sqlite3.Error as e:
+                print(f"Background query failed: {e}")
+                rows = None
+
+            with self.lock:
+                self.running = False
+                cancelled = generation != self.generation
+
+            if not cancelled:
+                self.deliver(callback, rows)
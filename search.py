@@ -0,0 +1,241 @@
+import re
+import sqlite3
+
+# --- Full-text search ---
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notas_fts USING fts5(
+    titulo,
+    texto,
+    content='notas',
+    content_rowid='codigo_id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS notas_fts_insert AFTER INSERT ON notas BEGIN
+    INSERT INTO notas_fts (rowid, titulo, texto)
+    VALUES (new.codigo_id, new.titulo, new.texto);
+END;
+
+CREATE TRIGGER IF NOT EXISTS notas_fts_delete AFTER DELETE ON notas BEGIN
+    INSERT INTO notas_fts (notas_fts, rowid, titulo, texto)
+    VALUES ('delete', old.codigo_id, old.titulo, old.texto);
+END;
+
+CREATE TRIGGER IF NOT EXISTS notas_fts_update AFTER UPDATE OF titulo, texto ON notas BEGIN
+    INSERT INTO notas_fts (notas_fts, rowid, titulo, texto)
+    VALUES ('delete', old.codigo_id, old.titulo, old.texto);
+    INSERT INTO notas_fts (rowid, titulo, texto)
+    VALUES (new.codigo_id, new.titulo, new.texto);
+END;
+"""
+
+# Title matches weigh more than body matches in the bm25 ranking
+BM25_WEIGHTS = (10.0, 1.0)
+
+# --- Sort modes ---
+
+SORT_DEFAULT = "default"
+# Sort mode: (sort key, descending). Each key has an index (see the
+# migrations), so listing in any of these orders never sorts the table.
+SORT_MODES = {
+    SORT_DEFAULT: ("notas.codigo_id", True),
+    "updated": ("notas.updated_at", True),
+    "created": ("notas.data", True),
+    "title": ("notas.titulo COLLATE NOCASE", False),
+}
+
+# A quoted phrase or a bare word
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+_fts5_supported = None
+
+
+def fts5_available():
+    """Returns True if the local sqlite library was compiled with FTS5."""
+    global _fts5_supported
+    if _fts5_supported is None:
+        try:
+            conn = sqlite3.connect(":memory:")
+            conn.execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+            conn.close()
+            _fts5_supported = True
+        except sqlite3.OperationalError:
+            _fts5_supported = False
+    return _fts5_supported
+
+
+def setup_full_text_search(conn):
+    """
+    Creates the FTS5 index over notas(titulo, texto) and the triggers
+    that keep it in sync. The index is backfilled the first time it is
+    created, so existing databases become searchable.
+    Returns False when FTS5 is not available.
+    """
+    if not fts5_available():
+        print("FTS5 not available. Search will use LIKE.")
+        return False
+
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notas_fts'"
+    )
+    index_exists = cursor.fetchone() is not None
+
+    try:
+        cursor.executescript(FTS_SCHEMA)
+    except sqlite3.OperationalError as e:
+        print(f"Could not create the full-text index: {e}")
+        return False
+
+    if not index_exists:
+        cursor.execute("INSERT INTO notas_fts (notas_fts) VALUES ('rebuild')")
+        conn.commit()
+        print("Full-text index built for existing notes.")
+
+    return True
+
+
+def has_full_text_index(conn):
+    """Checks whether the database has a usable FTS5 index."""
+    if not fts5_available():
+        return False
+    cursor = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notas_fts'"
+    )
+    return cursor.fetchone() is not None
+
+
+def build_match_expression(search_term):
+    """
+    Converts the text typed in the search box into an FTS5 MATCH expression.
+    Quoted text is searched as a phrase, bare words as prefixes
+    ('pyth' finds 'python'). All terms must match.
+    """
+    terms = []
+    for phrase, word in _TERM_RE.findall(search_term):
+        if phrase.strip():
+            terms.append('"' + phrase.strip().replace('"', '""') + '"')
+        elif word:
+            terms.append('"' + word.replace('"', '""') + '"*')
+    return " ".join(terms)
+
+
+def keyset_condition(sort_key, descending, after):
+    """
+    WHERE condition and params for the rows after the cursor 'after' in
+    ORDER BY sort_key, codigo_id (both descending or both ascending).
+    SQLite sorts NULL keys first, so they come last when descending.
+    """
+    key, last_id = after
+    op = "<" if descending else ">"
+    if sort_key == "notas.codigo_id":
+        return f"notas.codigo_id {op} ?", [last_id]
+    if key is None:
+        if descending:
+            return f"({sort_key} IS NULL AND notas.codigo_id < ?)", [last_id]
+        return (
+            f"(({sort_key} IS NULL AND notas.codigo_id > ?) OR {sort_key} IS NOT NULL)",
+            [last_id],
+        )
+    condition = f"{sort_key} {op} ? OR ({sort_key} = ? AND notas.codigo_id {op} ?)"
+    if descending:
+        condition += f" OR {sort_key} IS NULL"
+    return f"({condition})", [key, key, last_id]
+
+
+def build_notes_query(
+    search_term, categories, limit, use_fts=True, after=None, sort=SORT_DEFAULT
+):
+    """
+    Builds the SQL used to list notes.
+    Returns a (sql, params) tuple. Rows have the 'notas' column layout
+    followed by the sort key, which is what keyset pagination continues from.
+    'after' is the (sort key, codigo_id) pair of the last row already shown;
+    see next_page_cursor().
+    'sort' is one of SORT_MODES; the default lists the best matches first
+    when searching and the newest notes otherwise.
+    """
+    match_expression = build_match_expression(search_term) if use_fts else ""
+
+    if len(categories) > 1 and not match_expression:
+        return build_merged_query(
+            search_term, categories, limit, use_fts, after, sort
+        )
+
+    where_clauses = []
+    params = []
+
+    if match_expression:
+        source = "notas_fts JOIN notas ON notas.codigo_id = notas_fts.rowid"
+        where_clauses.append("notas_fts MATCH ?")
+        params.append(match_expression)
+    else:
+        source = "notas"
+        if search_term and not use_fts:
+            where_clauses.append("(titulo LIKE ? OR texto LIKE ?)")
+            params.extend([f"%{search_term}%", f"%{search_term}%"])
+
+    if match_expression and sort == SORT_DEFAULT:
+        # Best matches first (bm25 is lower for better matches)
+        sort_key = "bm25(notas_fts, {}, {})".format(*BM25_WEIGHTS)
+        order_by = f"{sort_key}, notas.codigo_id DESC"
+        if after:
+            where_clauses.append(
+                f"({sort_key} > ? OR ({sort_key} = ? AND notas.codigo_id < ?))"
+            )
+            params.extend([after[0], after[0], after[1]])
+    else:
+        sort_key, descending = SORT_MODES.get(sort, SORT_MODES[SORT_DEFAULT])
+        direction = "DESC" if descending else "ASC"
+        order_by = f"{sort_key} {direction}, notas.codigo_id {direction}"
+        if after:
+            condition, condition_params = keyset_condition(sort_key, descending, after)
+            where_clauses.append(condition)
+            params.extend(condition_params)
+
+    sql = f"SELECT notas.*, {sort_key} AS sort_key FROM {source} "
+
+    if categories:
+        # Create a placeholder for each category: (?, ?, ?)
+        placeholders = ", ".join("?" for _ in categories)
+        where_clauses.append(f"notas.categ IN ({placeholders})")
+        params.extend(categories)
+
+    if where_clauses:
+        sql += "WHERE " + " AND ".join(where_clauses)
+
+    sql += f" ORDER BY {order_by} LIMIT {int(limit)}"
+
+    return sql, params
+
+
+def build_merged_query(search_term, categories, limit, use_fts, after, sort):
+    """
+    Lists several categories as one query per category, each read in
+    order from its (categ, sort key) index, merged and cut to 'limit'.
+    A single 'categ IN (...)' query would sort all their notes.
+    """
+    _, descending = SORT_MODES.get(sort, SORT_MODES[SORT_DEFAULT])
+    direction = "DESC" if descending else "ASC"
+    parts = []
+    params = []
+    for category in categories:
+        part_sql, part_params = build_notes_query(
+            search_term, [category], limit, use_fts=use_fts, after=after, sort=sort
+        )
+        parts.append(f"SELECT * FROM ({part_sql})")
+        params.extend(part_params)
+    sql = (
+        f"SELECT * FROM ({' UNION ALL '.join(parts)}) "
+        f"ORDER BY sort_key {direction}, codigo_id {direction} LIMIT {int(limit)}"
+    )
+    return sql, params
+
+
+def next_page_cursor(rows):
+    """Returns the keyset cursor that continues after the given page of rows."""
+    if not rows:
+        return None
+    last_row = rows[-1]
+    return (last_row[-1], last_row[0])
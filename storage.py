@@ -0,0 +1,150 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+# Applied to every connection. In WAL mode readers never wait for the
+# writer; synchronous=NORMAL makes a commit safe against application
+# crashes, and the last commits before a power loss may be rolled back
+# (the database itself stays consistent).
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 134217728",
+)
+
+# Maximum number of queued writes grouped into one transaction
+MAX_WRITE_BATCH = 256
+
+
+class Storage:
+    """
+    Owns the database connections.
+    Reads use one connection per thread (see reader()). All writes are
+    queued to a single writer thread, which groups whatever is pending
+    into one transaction. A write is committed when the Future returned
+    for it is done; flush() waits for everything queued so far.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.readers = []
+        self.readers_lock = threading.Lock()
+        self.writes = queue.Queue()
+
+        self.writer = threading.Thread(
+            target=self.run_writer, name="StorageWriter", daemon=True
+        )
+        self.writer.start()
+
+    def connect(self, read_only=False):
+        """Opens a new connection with the storage pragmas applied."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def reader(self):
+        """Returns the read-only connection of the calling thread."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.connect(read_only=True)
+            self.local.conn = conn
+            with self.readers_lock:
+                self.readers.append(conn)
+        return conn
+
+    # --- Writes ---
+
+    def write(self, sql, params=()):
+        """Queues one statement. Returns a Future with the lastrowid."""
+        return self.transaction(lambda conn: conn.execute(sql, params).lastrowid)
+
+    def write_many(self, sql, seq_of_params):
+        """Queues an executemany. Returns a Future with the row count."""
+        seq_of_params = list(seq_of_params)
+        return self.transaction(
+            lambda conn: conn.executemany(sql, seq_of_params).rowcount
+        )
+
+    def transaction(self, func):
+        """
+        Queues func(conn) to run on the writer thread, inside the current
+        write transaction. Returns a Future with func's result; if func
+        raises, only its own changes are rolled back.
+        """
+        future = Future()
+        self.writes.put((func, future))
+        return future
+
+    def flush(self):
+        """Blocks until every write queued so far has been committed."""
+        self.transaction(lambda conn: None).result()
+
+    def run_writer(self):
+        conn = self.connect()
+        conn.isolation_level = None  # Transactions are managed here
+
+        while True:
+            batch = [self.writes.get()]
+            while len(batch) < MAX_WRITE_BATCH:
+                try:
+                    batch.append(self.writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            batch = [item for item in batch if item is not None]
+            if batch:
+                self.run_batch(conn, batch)
+            if stop:
+                break
+
+        conn.close()
+
+    def run_batch(self, conn, batch):
+        """Runs a group of writes in one transaction and resolves their futures."""
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for func, future in batch:
+                conn.execute("SAVEPOINT queued_write")
+                try:
+                    result = func(conn)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO queued_write")
+                    results.append((future, None, e))
+                else:
+                    results.append((future, result, None))
+                conn.execute("RELEASE queued_write")
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"Database write failed: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for func, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                print(f"Database write failed: {error}")
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Commits pending writes and closes all connections."""
+        self.writes.put(None)
+        self.writer.join()
+        with self.readers_lock:
+            for conn in self.readers:
+                conn.close()
+            self.readers = []
+        self.local = threading.local()
@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from category_registry import CategoryRegistry  # noqa: E402
+
+
+class CategoryRegistryTest(unittest.TestCase):
+    def test_rename_hands_shared_label_to_other_key(self):
+        categories = CategoryRegistry(["cor_001", "cor_010"])
+        categories.set("k1", "Py")
+        categories.set("k2", "Py")
+        self.assertEqual(categories.key_for("Py"), "k1")
+
+        categories.set("k1", "Python")
+        self.assertEqual(categories.key_for("Py"), "k2")
+        self.assertEqual(categories.key_for("Python"), "k1")
+
+    def test_rename_to_same_label_keeps_key(self):
+        categories = CategoryRegistry(["cor_001"])
+        categories.set("k1", "Py")
+        categories.set("k2", "Py")
+        categories.set("k1", "Py", "cor_001")
+        self.assertEqual(categories.key_for("Py"), "k1")
+
+
+if __name__ == "__main__":
+    unittest.main()
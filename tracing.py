@@ -0,0 +1,248 @@
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from constants import TRACE_LOG_BACKUPS, TRACE_LOG_BYTES, TRACE_LOG_FILE, TRACE_WINDOW
+
+# --- Tracing ---
+
+# Named spans around the slow paths (refresh phases, saving, pasting,
+# startup). Nested spans are named after their parents, e.g.
+# "on_update.query". Finished spans are written as JSON lines to a
+# rotating log and kept in memory for percentiles. When tracing is
+# disabled, span() returns a shared no-op object.
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "fields", "start", "parent", "trace_id", "children")
+
+    def __init__(self, tracer, name, fields):
+        self.tracer = tracer
+        self.name = name
+        self.fields = fields
+        self.children = []
+
+    def set(self, **fields):
+        """Adds fields (e.g. a row count) to the span's log record."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        self.parent = stack[-1] if stack else None
+        if self.parent:
+            self.name = f"{self.parent.name}.{self.name}"
+            self.trace_id = self.parent.trace_id
+        else:
+            self.trace_id = next(self.tracer.trace_ids)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        self.tracer.stack().pop()
+        self.tracer.finish(self, elapsed_ms)
+        return False
+
+
+class Tracer:
+    """
+    Records spans while enabled. Listeners added with add_listener() are
+    called with (root_name, [(name, ms), ...]) when a top-level span ends,
+    on the thread that ran it.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.logger = None
+        self.local = threading.local()
+        self.trace_ids = itertools.count(1)
+        self.durations = defaultdict(lambda: deque(maxlen=TRACE_WINDOW))
+        self.last_trace = {}
+        self.listeners = []
+
+    def enable(self, log_file=TRACE_LOG_FILE):
+        """Starts recording, to log_file (rotated) or only in memory if None."""
+        if log_file and self.logger is None:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=TRACE_LOG_BYTES,
+                backupCount=TRACE_LOG_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger = logging.getLogger("vapynotes.trace")
+            self.logger.propagate = False
+            self.logger.setLevel(logging.INFO)
+            self.logger.addHandler(handler)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def span(self, name, **fields):
+        """Context manager timing a block: with tracer.span("query"): ..."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, fields)
+
+    def record(self, name, start, end, phases=(), **fields):
+        """
+        Records a span measured elsewhere (perf_counter start and end),
+        with its phases given as (name, start, end).
+        """
+        if not self.enabled:
+            return
+        span = Span(self, name, fields)
+        span.parent = None
+        span.trace_id = next(self.trace_ids)
+        for phase, phase_start, phase_end in phases:
+            child = Span(self, f"{name}.{phase}", {})
+            child.parent = span
+            child.trace_id = span.trace_id
+            self.finish(child, (phase_end - phase_start) * 1000)
+        self.finish(span, (end - start) * 1000)
+
+    def finish(self, span, elapsed_ms):
+        self.durations[span.name].append(elapsed_ms)
+        if self.logger:
+            record = {
+                "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "span": span.name,
+                "ms": round(elapsed_ms, 3),
+                "trace": span.trace_id,
+                "thread": threading.current_thread().name,
+            }
+            record.update(span.fields)
+            self.logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+        if span.parent:
+            span.parent.children.append((span.name, elapsed_ms))
+            span.parent.children.extend(span.children)
+            return
+
+        # A top-level span: keep its breakdown for the debug overlay
+        breakdown = [(span.name, elapsed_ms)] + span.children
+        self.last_trace[span.name] = breakdown
+        for listener in self.listeners:
+            listener(span.name, breakdown)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def percentiles(self, name):
+        """{count, p50, p90, p99, max} in ms over the last spans named name."""
+        return summarize(list(self.durations.get(name, ())))
+
+
+class StartupTimer:
+    """
+    Milestones of the application startup (imports, frame shown, first
+    paint, first cards, interactive...), in ms since start.
+    With exit_when_done the app prints the report and quits once
+    interactive (--measure-startup).
+    """
+
+    def __init__(self, start, exit_when_done=False):
+        self.start = start
+        self.exit_when_done = exit_when_done
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        """{milestone: ms since start}, with the first paint and interactive times."""
+        report = {name: round((t - self.start) * 1000, 1) for name, t in self.marks}
+        report["time_to_first_paint_ms"] = report.get("first_paint")
+        report["time_to_interactive_ms"] = report.get("interactive")
+        return report
+
+    def record(self):
+        """Records the startup span, with a phase between consecutive marks."""
+        if not self.marks:
+            return
+        phases = []
+        previous = self.start
+        for name, t in self.marks:
+            phases.append((name, previous, t))
+            previous = t
+        tracer.record("startup", self.start, previous, phases=phases)
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(durations):
+    if not durations:
+        return {"count": 0}
+    values = sorted(durations)
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.50), 3),
+        "p90": round(percentile(values, 0.90), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def read_log(log_file=TRACE_LOG_FILE):
+    """Yields the span records of a trace log and its rotated backups, oldest first."""
+    paths = [f"{log_file}.{n}" for n in range(TRACE_LOG_BACKUPS, 0, -1)] + [log_file]
+    for path in paths:
+        try:
+            f = open(path, "r", encoding="utf-8")
+        except OSError:
+            continue
+        with f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def summarize_log(log_file=TRACE_LOG_FILE):
+    """Latency percentiles per span name, from the trace log."""
+    durations = defaultdict(list)
+    for record in read_log(log_file):
+        if "span" in record and "ms" in record:
+            durations[record["span"]].append(record["ms"])
+    return {name: summarize(values) for name, values in sorted(durations.items())}
+
+
+tracer = Tracer()
@@ -0,0 +1,89 @@
+import os
+from collections import OrderedDict
+
+import wx
+
+from constants import THUMB_CACHE_BYTES
+
+
+class BitmapCache:
+    """
+    Process-wide cache of decoded bitmaps.
+    Entries are keyed by (path, size) and remember the file's mtime, so a
+    changed file is decoded again. Icons are few and kept forever;
+    thumbnails are kept in LRU order within a byte budget.
+    """
+
+    def __init__(self, max_thumb_bytes=THUMB_CACHE_BYTES):
+        self.icons = {}
+        self.thumbs = OrderedDict()
+        self.thumb_bytes = 0
+        self.max_thumb_bytes = max_thumb_bytes
+
+    @staticmethod
+    def get_mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get_icon(self, path, size=(32, 32)):
+        """Returns a PNG icon scaled to size, decoding it only once."""
+        mtime = self.get_mtime(path)
+        key = (path, size)
+        entry = self.icons.get(key)
+        if entry and entry[0] == mtime:
+            return entry[1]
+
+        img = wx.Image(path, wx.BITMAP_TYPE_PNG)
+        if img.IsOk():
+            img = img.Scale(size[0], size[1], wx.IMAGE_QUALITY_HIGH)
+        bitmap = wx.Bitmap(img)
+        self.icons[key] = (mtime, bitmap)
+        return bitmap
+
+    def get_thumbnail(self, path):
+        """Returns a thumbnail JPEG as a bitmap, decoding only new files."""
+        mtime = self.get_mtime(path)
+        if mtime is None:
+            print(f"Thumbnail not found: {path}")
+            return wx.Bitmap()
+
+        entry = self.thumbs.get(path)
+        if entry and entry[0] == mtime:
+            self.thumbs.move_to_end(path)
+            return entry[1]
+
+        bitmap = wx.Bitmap(path, wx.BITMAP_TYPE_JPEG)
+        self.put_thumbnail(path, mtime, bitmap)
+        return bitmap
+
+    def get_cached_thumbnail(self, path):
+        """Returns the thumbnail if it is cached and current, without decoding."""
+        entry = self.thumbs.get(path)
+        if entry and entry[0] == self.get_mtime(path):
+            self.thumbs.move_to_end(path)
+            return entry[1]
+        return None
+
+    def put_thumbnail(self, path, mtime, bitmap):
+        """Stores a thumbnail and evicts the least recently used ones."""
+        self.discard_thumbnail(path)
+        if not bitmap.IsOk():
+            return
+        size = bitmap.GetWidth() * bitmap.GetHeight() * 4
+        self.thumbs[path] = (mtime, bitmap, size)
+        self.thumb_bytes += size
+
+        while self.thumb_bytes > self.max_thumb_bytes and len(self.thumbs) > 1:
+            _, (_, _, evicted_size) = self.thumbs.popitem(last=False)
+            self.thumb_bytes -= evicted_size
+
+    def discard_thumbnail(self, path):
+        """Drops a thumbnail from the cache (e.g. when its file is deleted)."""
+        entry = self.thumbs.pop(path, None)
+        if entry:
+            self.thumb_bytes -= entry[2]
+
+
+bitmap_cache = BitmapCache()
@@ -0,0 +1,233 @@
+import html
+import os
+from bisect import bisect_right
+from functools import partial
+
+import wx
+
+from constants import PREVIEW_MAX_LINES, THUMB_DIR
+from ui.image_pipeline import image_pipeline
+from ui.theme import theme
+
+# Sizes matching the real card (RightPanel.create_card_item)
+HEADER_HEIGHT = 40
+CONTENT_PADDING = 8
+COLOR_INDICATOR_SIZE = 20
+THUMB_GAP = 6
+# Longest part of a line measured at once; more never fits in one row
+MEASURE_CHARS = 1000
+
+
+def wrap_text(gc, text, width, max_lines):
+    """
+    Breaks text into lines that fit width with the context's current
+    font, at spaces when possible. Returns (lines, truncated).
+    """
+    lines = []
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.rstrip("\r").expandtabs(4)
+        while True:
+            if len(lines) >= max_lines:
+                return lines, True
+            head = paragraph[:MEASURE_CHARS]
+            extents = gc.GetPartialTextExtents(head) if head else []
+            fit = bisect_right(extents, width)
+            if fit >= len(paragraph):
+                lines.append(paragraph)
+                break
+            fit = max(fit, 1)
+            space = paragraph.rfind(" ", 0, fit)
+            cut = space + 1 if space > 0 else fit
+            lines.append(paragraph[:cut].rstrip())
+            paragraph = paragraph[cut:]
+    return lines, False
+
+
+class CardPreview(wx.Panel):
+    """
+    A note card drawn on one window with wx.GraphicsContext: the header
+    colour, title, category chip, the first lines of the text and the
+    thumbnails. Clicking it calls on_open(note_id), which puts a real
+    card with the editing widgets in its place (RightPanel.open_card).
+    """
+
+    # Shared text measuring context and line height
+    measure_gc = None
+    line_height = None
+
+    def __init__(self, parent, app_state, on_open, on_resized):
+        super().__init__(parent, style=wx.BORDER_NONE)
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.app_state = app_state
+        self.on_open = on_open
+        self.on_resized = on_resized
+
+        self.item_id = 0
+        # (categ, titulo, texto, attachments), as in RightPanel.card_data
+        self.note = None
+        self.text = ""
+        self.lines = []
+        self.truncated = False
+        self.wrapped_width = 0
+        self.thumbnails = []
+
+        self.SetCursor(wx.Cursor(wx.CURSOR_HAND))
+        self.Bind(wx.EVT_PAINT, self.on_paint)
+        self.Bind(wx.EVT_SIZE, self.on_size)
+        self.Bind(wx.EVT_LEFT_DOWN, self.on_click)
+
+    @classmethod
+    def get_measure_gc(cls):
+        if cls.measure_gc is None:
+            cls.measure_gc = wx.GraphicsContext.Create()
+        cls.measure_gc.SetFont(theme.font("card_text"), theme.colour("gr-0"))
+        return cls.measure_gc
+
+    @classmethod
+    def get_line_height(cls):
+        if cls.line_height is None:
+            cls.line_height = cls.get_measure_gc().GetTextExtent("Ag")[1]
+        return cls.line_height
+
+    def set_note(self, item_id, item_category, item_title, item_text, item_images):
+        """Shows a note; the text is wrapped to the current width."""
+        self.item_id = item_id
+        self.note = (item_category, item_title, item_text, item_images)
+        self.text = html.unescape(item_text or "")
+
+        self.thumbnails = []
+        for attachment_filename in item_images or ():
+            thumb_path = os.path.join(THUMB_DIR, attachment_filename)
+            bitmap = image_pipeline.load_thumbnail(
+                thumb_path, partial(self.on_thumbnail_loaded, thumb_path)
+            )
+            if bitmap is None:
+                bitmap = image_pipeline.get_placeholder()
+            self.thumbnails.append([thumb_path, bitmap])
+
+        self.wrap(self.text_width())
+        self.Refresh()
+
+    def text_width(self):
+        width = self.GetClientSize().width
+        if width <= 0:
+            # Not laid out yet: the width of the list, less the card border
+            width = self.GetParent().GetClientSize().width - 8
+        return max(width - 2 * CONTENT_PADDING, 50)
+
+    def wrap(self, width):
+        """Wraps the text to width; returns True if the height changed."""
+        self.lines, self.truncated = wrap_text(
+            self.get_measure_gc(), self.text, width, PREVIEW_MAX_LINES
+        )
+        self.wrapped_width = width
+        return self.update_height()
+
+    def update_height(self):
+        line_height = self.get_line_height()
+        height = HEADER_HEIGHT + 2 * CONTENT_PADDING + len(self.lines) * line_height
+        if self.truncated:
+            height += line_height
+        if self.thumbnails:
+            height += THUMB_GAP + max(
+                bitmap.GetHeight() for _, bitmap in self.thumbnails
+            )
+        if height != self.GetMinSize().height:
+            self.SetMinSize((-1, height))
+            return True
+        return False
+
+    def on_size(self, evt):
+        width = self.text_width()
+        if width != self.wrapped_width and self.wrap(width):
+            self.on_resized()
+        self.Refresh()
+        evt.Skip()
+
+    def on_thumbnail_loaded(self, thumb_path, bitmap):
+        if not self or bitmap is None:
+            return
+        for thumbnail in self.thumbnails:
+            if thumbnail[0] == thumb_path:
+                thumbnail[1] = bitmap
+        if self.update_height():
+            self.on_resized()
+        self.Refresh()
+
+    def on_click(self, evt):
+        self.on_open(self.item_id)
+
+    def on_paint(self, evt):
+        dc = wx.AutoBufferedPaintDC(self)
+        dc.SetBackground(theme.brush("wh-1"))
+        dc.Clear()
+        if self.note is None:
+            return
+
+        gc = wx.GraphicsContext.Create(dc)
+        gc.SetPen(wx.TRANSPARENT_PEN)
+        width = self.GetClientSize().width
+
+        categories = self.app_state.categories
+        item_category = self.note[0] if self.note[0] in categories else "none"
+        category = categories.get(item_category, {})
+        color_key = category.get("color", "cor_001")
+
+        # Header and color indicator
+        gc.SetBrush(theme.category_brush(color_key, 1))
+        gc.DrawRectangle(0, 0, width, HEADER_HEIGHT)
+        gc.SetBrush(theme.category_brush(color_key, 0))
+        gc.DrawRectangle(
+            4,
+            (HEADER_HEIGHT - COLOR_INDICATOR_SIZE) / 2,
+            COLOR_INDICATOR_SIZE,
+            COLOR_INDICATOR_SIZE,
+        )
+
+        # Category chip on the right
+        chip_left = width - CONTENT_PADDING
+        label = category.get("label", "")
+        if label:
+            gc.SetFont(theme.font("small"), theme.colour("wh-1"))
+            label_width, label_height = gc.GetTextExtent(label)
+            chip_width, chip_height = label_width + 16, label_height + 8
+            chip_left = width - CONTENT_PADDING - chip_width
+            gc.SetBrush(theme.category_brush(color_key, 2))
+            gc.DrawRoundedRectangle(
+                chip_left,
+                (HEADER_HEIGHT - chip_height) / 2,
+                chip_width,
+                chip_height,
+                chip_height / 2,
+            )
+            gc.DrawText(label, chip_left + 8, (HEADER_HEIGHT - label_height) / 2)
+
+        # Title, clipped before the chip
+        title = self.note[1] or ""
+        title_left = 4 + COLOR_INDICATOR_SIZE + 8
+        gc.SetFont(theme.font("card_title"), theme.colour("gr-0"))
+        title_height = gc.GetTextExtent(title or "Ag")[1]
+        gc.Clip(title_left, 0, max(chip_left - 8 - title_left, 0), HEADER_HEIGHT)
+        gc.DrawText(title, title_left, (HEADER_HEIGHT - title_height) / 2)
+        gc.ResetClip()
+
+        # First lines of the text
+        line_height = self.get_line_height()
+        top = HEADER_HEIGHT + CONTENT_PADDING
+        gc.SetFont(theme.font("card_text"), theme.colour("gr-0"))
+        for line in self.lines:
+            if line:
+                gc.DrawText(line, CONTENT_PADDING, top)
+            top += line_height
+        if self.truncated:
+            gc.SetFont(theme.font("card_text"), theme.colour("gr-1"))
+            gc.DrawText("…", CONTENT_PADDING, top)
+            top += line_height
+
+        # Thumbnails
+        left = CONTENT_PADDING
+        top += THUMB_GAP
+        for _, bitmap in self.thumbnails:
+            if bitmap.IsOk():
+                gc.DrawBitmap(bitmap, left, top, bitmap.GetWidth(), bitmap.GetHeight())
+                left += bitmap.GetWidth() + THUMB_GAP
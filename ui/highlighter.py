@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import wx
+
+from constants import HIGHLIGHT_CACHE_NOTES
+from highlight import TokenCache
+
+
+class Highlighter:
+    """
+    Tokenizes note text on a background thread, keeping a TokenCache per
+    note so an edit only re-tokenizes the lines it changed.
+    Requests for the same note are coalesced: while one is queued, newer
+    text replaces it. Results are handed to the callbacks on the GUI
+    thread via wx.CallAfter.
+    """
+
+    def __init__(self, max_notes=HIGHLIGHT_CACHE_NOTES):
+        # One worker, so the token caches are only touched by one thread
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="Highlighter"
+        )
+        self.caches = OrderedDict()
+        self.max_notes = max_notes
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def request(self, note_id, text, language_name, on_done, full=False):
+        """
+        Tokenizes text in the background. on_done(text, range_start,
+        range_end, spans) is called on the GUI thread with the character
+        range whose tokens changed and the (start, end, kind) spans in it;
+        with full=True the range is the whole text (for a control that
+        has just been filled).
+        """
+        with self.lock:
+            queued = note_id in self.pending
+            if queued:
+                full = full or self.pending[note_id][3]
+            self.pending[note_id] = (text, language_name, on_done, full)
+        if not queued:
+            try:
+                self.executor.submit(self._tokenize, note_id)
+            except RuntimeError:
+                pass  # Shutting down
+
+    def _tokenize(self, note_id):
+        with self.lock:
+            text, language_name, on_done, full = self.pending.pop(note_id)
+
+        cache = self.caches.get(note_id)
+        if cache is None or cache.language_name != language_name:
+            cache = TokenCache(language_name)
+        self.caches[note_id] = cache
+        self.caches.move_to_end(note_id)
+        while len(self.caches) > self.max_notes:
+            self.caches.popitem(last=False)
+
+        try:
+            first, last = cache.update(text)
+            if full:
+                first, last = 0, len(cache.lines)
+            elif first == last:
+                return
+            range_start, range_end, spans = cache.spans(first, last)
+        except Exception as e:
+            print(f"Error highlighting note {note_id}: {e}")
+            self.caches.pop(note_id, None)
+            return
+        wx.CallAfter(on_done, text, range_start, range_end, spans)
+
+    def forget(self, note_id):
+        """Drops a note's tokens (e.g. when the note is deleted)."""
+        try:
+            self.executor.submit(self.caches.pop, note_id, None)
+        except RuntimeError:
+            pass
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+highlighter = Highlighter()
@@ -0,0 +1,217 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import wx
+
+from constants import (
+    IMAGE_DIR,
+    IMAGE_GC_GRACE_SECONDS,
+    IMAGE_WORKERS,
+    THUMB_DIR,
+    THUMB_PLACEHOLDER_SIZE,
+    THUMB_SIZE,
+)
+from image_store import (
+    collect_garbage,
+    content_filename,
+    pop_unreferenced,
+    remove_files,
+)
+from tracing import tracer
+from ui.bitmap_cache import bitmap_cache
+from ui.theme import theme
+
+
+class ImagePipeline:
+    """
+    Runs image encoding and decoding on a small worker pool.
+    Workers only touch files and wx.Image objects; bitmaps are created
+    and handed to the callbacks on the GUI thread via wx.CallAfter.
+    """
+
+    def __init__(self, max_workers=IMAGE_WORKERS):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ImagePipeline"
+        )
+        self.pending_thumbs = {}
+        self.placeholder = None
+        # Garbage collection pass for the files too new to remove at once
+        self.gc_timer = None
+
+    def get_placeholder(self):
+        """A neutral bitmap shown until the real thumbnail is ready."""
+        if self.placeholder is None:
+            self.placeholder = wx.Bitmap(*THUMB_PLACEHOLDER_SIZE)
+            dc = wx.MemoryDC(self.placeholder)
+            dc.SetBackground(theme.brush("gr-2"))
+            dc.Clear()
+            dc.SelectObject(wx.NullBitmap)
+        return self.placeholder
+
+    def save_image(self, image, on_done):
+        """
+        Stores a PIL image in the content-addressed image store: it is
+        named after a hash of its pixels, encoded as JPEG with its thumbnail
+        in the background, and not written again if the same image is
+        already stored. on_done(filename, thumb_bitmap) is called on the GUI
+        thread, with (None, None) if saving failed.
+        """
+        self.executor.submit(self._save_image, image, on_done)
+
+    def _save_image(self, image, on_done):
+        try:
+            with tracer.span("paste_image.store") as store_span:
+                # Convert image to RGB if it has an alpha channel (e.g., RGBA)
+                # as JPEG format does not support transparency.
+                if image.mode in ("RGBA", "P"):
+                    image = image.convert("RGB")
+
+                with tracer.span("hash"):
+                    filename = content_filename(
+                        image.mode, image.size, image.tobytes()
+                    )
+                image_path = os.path.join(IMAGE_DIR, filename)
+                thumb_path = os.path.join(THUMB_DIR, filename)
+
+                if os.path.exists(image_path) and os.path.exists(thumb_path):
+                    # Already stored; touch it so garbage collection keeps it
+                    os.utime(image_path)
+                    os.utime(thumb_path)
+                    store_span.set(reused=True)
+                else:
+                    os.makedirs(THUMB_DIR, exist_ok=True)
+
+                    with tracer.span("encode"):
+                        # Save full image
+                        image.save(image_path, "JPEG")
+
+                        # Save thumbnail
+                        thumb_image = image.copy()
+                        thumb_image.thumbnail(THUMB_SIZE)
+                        thumb_image.save(thumb_path, "JPEG")
+
+                wx_image = wx.Image(thumb_path, wx.BITMAP_TYPE_JPEG)
+        except (OSError, ValueError) as e:
+            print(f"Error saving image: {e}")
+            wx.CallAfter(on_done, None, None)
+            return
+
+        wx.CallAfter(
+            self._deliver_thumbnail, thumb_path, wx_image, [partial(on_done, filename)]
+        )
+
+    def remove_unreferenced(self, storage):
+        """
+        Deletes the image files whose last attachment was removed. The
+        files are removed on a worker once the database change is committed.
+        """
+        future = storage.transaction(pop_unreferenced)
+        future.add_done_callback(partial(self._remove_unreferenced, storage))
+
+    def _remove_unreferenced(self, storage, future):
+        # Runs on the storage writer thread
+        if future.exception() is not None:
+            return
+        filenames = future.result()
+        if filenames:
+            wx.CallAfter(self._discard_thumbnails, filenames)
+            # Files pasted in the last IMAGE_GC_GRACE_SECONDS are kept by
+            # remove_files; a later pass removes them
+            wx.CallAfter(self._schedule_garbage_collection, storage)
+            try:
+                self.executor.submit(remove_files, filenames)
+            except RuntimeError:
+                pass  # Shutting down; the next garbage collection removes them
+
+    def _schedule_garbage_collection(self, storage):
+        # One pass after the grace period of the last removal
+        delay = (IMAGE_GC_GRACE_SECONDS + 1) * 1000
+        if self.gc_timer and self.gc_timer.IsRunning():
+            self.gc_timer.Restart(delay)
+        else:
+            self.gc_timer = wx.CallLater(delay, self.collect_garbage, storage)
+
+    def _discard_thumbnails(self, filenames):
+        for filename in filenames:
+            bitmap_cache.discard_thumbnail(os.path.join(THUMB_DIR, filename))
+
+    def load_thumbnail(self, thumb_path, on_loaded):
+        """
+        Returns the cached bitmap for thumb_path, or None after queueing a
+        background decode; on_loaded(bitmap) is then called on the GUI thread.
+        """
+        bitmap = bitmap_cache.get_cached_thumbnail(thumb_path)
+        if bitmap is not None:
+            return bitmap
+
+        # Several cards may wait on the same file; decode it once
+        if thumb_path in self.pending_thumbs:
+            self.pending_thumbs[thumb_path].append(on_loaded)
+        else:
+            self.pending_thumbs[thumb_path] = [on_loaded]
+            self.executor.submit(self._load_thumbnail, thumb_path)
+        return None
+
+    def _load_thumbnail(self, thumb_path):
+        wx_image = None
+        if os.path.exists(thumb_path):
+            wx_image = wx.Image(thumb_path, wx.BITMAP_TYPE_JPEG)
+        else:
+            print(f"Thumbnail not found: {thumb_path}")
+        wx.CallAfter(self._deliver_thumbnail, thumb_path, wx_image)
+
+    def _deliver_thumbnail(self, thumb_path, wx_image, callbacks=None):
+        """Creates the bitmap on the GUI thread, caches it and runs the callbacks."""
+        if callbacks is None:
+            callbacks = self.pending_thumbs.pop(thumb_path, [])
+
+        bitmap = None
+        if wx_image is not None and wx_image.IsOk():
+            bitmap = wx.Bitmap(wx_image)
+            bitmap_cache.put_thumbnail(
+                thumb_path, bitmap_cache.get_mtime(thumb_path), bitmap
+            )
+        for callback in callbacks:
+            callback(bitmap)
+
+    def collect_garbage(self, storage, on_done=None, dry_run=False):
+        """
+        Removes the image files no note references (only looks for them if
+        dry_run) on a worker. on_done(report) is called on the GUI thread,
+        by default print_garbage_report; see image_store.collect_garbage.
+        """
+        try:
+            self.executor.submit(
+                self._collect_garbage,
+                storage,
+                on_done or self.print_garbage_report,
+                dry_run,
+            )
+        except RuntimeError:
+            pass  # Shutting down
+
+    @staticmethod
+    def print_garbage_report(report):
+        if report["files"]:
+            action = "can be removed" if report["dry_run"] else "removed"
+            print(
+                f"{report['files']} unreferenced image files "
+                f"({report['bytes'] / 1024 / 1024:.1f} MB) {action}."
+            )
+
+    def _collect_garbage(self, storage, on_done, dry_run):
+        try:
+            report = collect_garbage(storage.reader(), dry_run=dry_run)
+        except Exception as e:
+            print(f"Image garbage collection failed: {e}")
+            return
+        wx.CallAfter(on_done, report)
+
+    def shutdown(self):
+        if self.gc_timer:
+            self.gc_timer.Stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+image_pipeline = ImagePipeline()
@@ -6,13 +6,24 @@ from constants import (
     ID_CLEAR_ALL,
     ID_CLEAR_TAGS,
     ID_EXIT,
+    ID_EXPORT,
     ID_INSERT,
     ID_SEARCH,
     ID_TAG_START,
     ID_UPDATE,
     PADDING,
-    DEFAULT_FONT,
+    ICON_SIZE,
 )
+from ui.bitmap_cache import bitmap_cache
+from ui.theme import theme
+
+# Sort modes offered in the panel (see search.SORT_MODES)
+SORT_CHOICES = [
+    ("default", "Newest / best match"),
+    ("updated", "Recently edited"),
+    ("created", "Created date"),
+    ("title", "Title A-Z"),
+]
 
 
 class LeftPanel(wx.Panel):
@@ -34,11 +45,9 @@ class LeftPanel(wx.Panel):
         self.SetSizer(self.main_sizer)
 
         # Add Note button with icon
-        img = wx.Image(
-            "assets/" + self.app_state.config["UIICONS"]["add-note"], wx.BITMAP_TYPE_PNG
+        bitmap = bitmap_cache.get_icon(
+            "assets/" + self.app_state.config["UIICONS"]["add-note"], ICON_SIZE
         )
-        img = img.Scale(32, 32, wx.IMAGE_QUALITY_HIGH)
-        bitmap = wx.Bitmap(img)
 
         self.add_button = wxbt.GenBitmapTextButton(
             self,
@@ -52,35 +61,31 @@ class LeftPanel(wx.Panel):
 
         self.add_button.SetCursor(wx.Cursor(wx.CURSOR_HAND))
         self.add_button.SetMinSize(wx.Size(-1, 60))
-        self.add_button.SetBackgroundColour(self.app_state.config["UICOLORS"]["co-0"])
-        self.add_button.SetFont(
-            wx.Font(11, wx.SWISS, wx.NORMAL, wx.BOLD, False, DEFAULT_FONT)
-        )
+        self.add_button.SetBackgroundColour(theme.colour("co-0"))
+        self.add_button.SetFont(theme.font("add_button"))
 
         self.add_button.Bind(wx.EVT_ENTER_WINDOW, self.on_add_button_hover)
         self.add_button.Bind(wx.EVT_LEAVE_WINDOW, self.on_add_button_leave)
 
-        self.add_button.SetForegroundColour(self.app_state.config["UICOLORS"]["wh-1"])
+        self.add_button.SetForegroundColour(theme.colour("wh-1"))
         self.main_sizer.Add(
             self.add_button, flag=wx.EXPAND | wx.ALL | wx.ALIGN_TOP, border=0
         )
 
         # Search field
         self.search_wrapper = wx.Panel(self)
-        self.search_wrapper.SetBackgroundColour(
-            self.app_state.config["UICOLORS"]["wh-2"]
-        )
+        self.search_wrapper.SetBackgroundColour(theme.colour("wh-2"))
         self.search_wrapper.SetMinSize(wx.Size(-1, 45))  # altura mínima opcional
 
         self.search_ctrl = wx.TextCtrl(
             self.search_wrapper, ID_SEARCH, style=wx.TE_PROCESS_ENTER | wx.BORDER_NONE
         )
-        self.search_ctrl.SetFont(
-            wx.Font(12, wx.SWISS, wx.NORMAL, wx.NORMAL, False, DEFAULT_FONT)
+        self.search_ctrl.SetFont(theme.font("search"))
+        self.search_ctrl.SetHint(
+            "Search" if self.app_state.incremental_search else "Search [Enter]"
         )
-        self.search_ctrl.SetHint("Search [Enter]")
-        self.search_ctrl.SetBackgroundColour(self.app_state.config["UICOLORS"]["wh-2"])
-        self.search_ctrl.SetForegroundColour(self.app_state.config["UICOLORS"]["gr-0"])
+        self.search_ctrl.SetBackgroundColour(theme.colour("wh-2"))
+        self.search_ctrl.SetForegroundColour(theme.colour("gr-0"))
 
         search_sizer = wx.BoxSizer(wx.VERTICAL)
         search_sizer.Add(self.search_ctrl, 1, wx.EXPAND | wx.ALL, 8)  # padding interno
@@ -91,68 +96,30 @@ class LeftPanel(wx.Panel):
             border=PADDING - 1,
         )
 
+        # List order
+        self.sort_choice = wx.Choice(
+            self, choices=[label for _, label in SORT_CHOICES]
+        )
+        self.sort_choice.SetFont(theme.font("small"))
+        sort_keys = [key for key, _ in SORT_CHOICES]
+        if self.app_state.sort_mode in sort_keys:
+            self.sort_choice.SetSelection(sort_keys.index(self.app_state.sort_mode))
+        self.sort_choice.Bind(wx.EVT_CHOICE, self.on_change_sort)
+        self.main_sizer.Add(
+            self.sort_choice,
+            flag=wx.EXPAND | wx.TOP | wx.LEFT | wx.RIGHT,
+            border=PADDING - 1,
+        )
+
         # Grid for category buttons
         self.tags_grid_sizer = wx.GridSizer(1, 3, 4, 2)  # rows, cols, vgap, hgap
 
         self.tag_buttons = {}
-        grid_row = 1
-        grid_col = 1
-        tag_id = ID_TAG_START
-
-        self.color_tag_normal_bg = self.app_state.config["UICOLORS"]["gr-3"]
-        self.color_tag_normal_fg = self.app_state.config["UICOLORS"]["co-1"]
-        self.color_tag_active_bg = self.app_state.config["UICOLORS"]["co-0"]
-        self.color_tag_active_fg = self.app_state.config["UICOLORS"]["gr-3"]
-
         self.app_state.tag_id_map = {}
 
-        custom_font = wx.Font(10, wx.SWISS, wx.NORMAL, wx.NORMAL, False, DEFAULT_FONT)
-
         # Iterate over the new categories structure
-        for key, cat_data in self.app_state.categories.items():
-            if grid_col > 3:
-                grid_col = 1
-                grid_row += 1
-                self.tags_grid_sizer.SetRows(grid_row)
-
-            self.app_state.tag_id_map[tag_id] = key
-            btn = wx.ToggleButton(self, tag_id, cat_data["label"][:10], style=wx.BORDER_NONE)
-            btn.SetBackgroundColour(self.color_tag_normal_bg)
-            btn.SetForegroundColour(self.color_tag_normal_fg)
-            btn.SetMinSize(wx.Size(-1, 40))
-            btn.SetCursor(wx.Cursor(wx.CURSOR_HAND))
-            btn.SetFont(custom_font)
-
-            # Bind para alternar as cores ao selecionar/deselecionar
-            def make_toggle_handler(b):
-                def handler(evt):
-                    if b.GetValue():
-                        b.SetBackgroundColour(self.color_tag_active_bg)
-                        b.SetForegroundColour(self.color_tag_active_fg)
-                    else:
-                        b.SetBackgroundColour(self.color_tag_normal_bg)
-                        b.SetForegroundColour(self.color_tag_normal_fg)
-                    b.Refresh()
-
-                    # Force immediate UI update for the button before the list refresh
-                    wx.Yield()
-
-                    self.on_change_tag(evt)  # Mantém a lógica de tag atual
-                    if self.on_update_callback:
-                        self.on_update_callback(None)  # Dispara a atualização da lista
-
-                return handler
-
-            btn.Bind(wx.EVT_TOGGLEBUTTON, make_toggle_handler(btn))
-
-            self.tag_buttons[key] = btn
-            self.tags_grid_sizer.Add(
-                btn,
-                flag=wx.EXPAND | wx.TOP | wx.LEFT | wx.RIGHT,
-                border=2,
-            )
-            tag_id += 1
-            grid_col += 1
+        for key in self.app_state.categories:
+            self.add_tag_button(key)
 
         # Adiciona a grid direto ao main_sizer
         self.main_sizer.Add(
@@ -163,17 +130,14 @@ class LeftPanel(wx.Panel):
         self.total_items_text = wx.StaticText(
             self, label="0", style=wx.ALIGN_CENTER | wx.ST_NO_AUTORESIZE
         )
-        self.total_items_text.SetFont(
-            wx.Font(18, wx.SWISS, wx.NORMAL, wx.BOLD, False, DEFAULT_FONT)
-        )
-        self.total_items_text.SetForegroundColour(
-            self.app_state.config["UICOLORS"]["gr-0"]
-        )
+        self.total_items_text.SetFont(theme.font("total"))
+        self.total_items_text.SetForegroundColour(theme.colour("gr-0"))
         self.main_sizer.Add(
             self.total_items_text, flag=wx.EXPAND | wx.ALL, border=PADDING
         )
 
         # Action Buttons
+        self.action_buttons = []
         action_buttons_panel = wx.Panel(self)
 
         action_sizer = wx.BoxSizer(wx.VERTICAL)
@@ -193,6 +157,11 @@ class LeftPanel(wx.Panel):
         )
         action_sizer.Add(self.clear_tags_button, 0, wx.TOP | wx.EXPAND, PADDING)
 
+        self.export_button = self.create_action_button(
+            ID_EXPORT, "Export Notes", parent=action_buttons_panel
+        )
+        action_sizer.Add(self.export_button, 0, wx.TOP | wx.EXPAND, PADDING)
+
         self.about_button = self.create_action_button(
             ID_ABOUT, "About this App", parent=action_buttons_panel
         )
@@ -209,39 +178,124 @@ class LeftPanel(wx.Panel):
             action_buttons_panel, flag=wx.EXPAND | wx.LEFT | wx.RIGHT, border=PADDING
         )
 
+    def add_tag_button(self, key):
+        """Adds the toggle button of a category at the end of the grid."""
+        tag_id = ID_TAG_START + len(self.tag_buttons)
+        self.app_state.tag_id_map[tag_id] = key
+        btn = wx.ToggleButton(self, tag_id, self.tag_label(key), style=wx.BORDER_NONE)
+        self.paint_tag_button(btn)
+        btn.SetMinSize(wx.Size(-1, 40))
+        btn.SetCursor(wx.Cursor(wx.CURSOR_HAND))
+        btn.SetFont(theme.font("small"))
+        btn.Bind(wx.EVT_TOGGLEBUTTON, self.on_tag_toggled)
+
+        self.tag_buttons[key] = btn
+        self.tags_grid_sizer.SetRows(max(1, (len(self.tag_buttons) + 2) // 3))
+        self.tags_grid_sizer.Add(
+            btn,
+            flag=wx.EXPAND | wx.TOP | wx.LEFT | wx.RIGHT,
+            border=2,
+        )
+        return btn
+
+    def add_category(self, key):
+        """
+        Shows a category added while the app runs. Only its button is
+        created; the selected categories and the search are kept.
+        """
+        self.add_tag_button(key)
+        self.Layout()
+
+    def on_tag_toggled(self, evt):
+        """Recolours a category button when toggled and refreshes the list."""
+        button = evt.GetEventObject()
+        self.paint_tag_button(button)
+        button.Refresh()
+
+        # Force immediate UI update for the button before the list refresh
+        # (incremental search refreshes later, from the event loop)
+        if not self.app_state.incremental_search:
+            wx.Yield()
+
+        self.on_change_tag(evt)  # Mantém a lógica de tag atual
+        if self.on_update_callback:
+            self.on_update_callback(None)  # Dispara a atualização da lista
+
+    def tag_label(self, key):
+        """Category button text: the label and its number of notes."""
+        label = self.app_state.categories[key]["label"][:10]
+        count = self.app_state.category_counts.get(key, 0)
+        return f"{label} ({count})"
+
+    def paint_tag_button(self, button):
+        """Colours a category button as selected or not."""
+        if button.GetValue():
+            button.SetBackgroundColour(theme.colour("co-0"))
+            button.SetForegroundColour(theme.colour("gr-3"))
+        else:
+            button.SetBackgroundColour(theme.colour("gr-3"))
+            button.SetForegroundColour(theme.colour("co-1"))
+
+    def apply_theme(self):
+        """Colours the existing widgets again after the theme was reloaded."""
+        self.add_button.SetBackgroundColour(theme.colour("co-0"))
+        self.add_button.SetForegroundColour(theme.colour("wh-1"))
+        self.search_wrapper.SetBackgroundColour(theme.colour("wh-2"))
+        self.search_ctrl.SetBackgroundColour(theme.colour("wh-2"))
+        self.search_ctrl.SetForegroundColour(theme.colour("gr-0"))
+        for button in self.tag_buttons.values():
+            self.paint_tag_button(button)
+        self.total_items_text.SetForegroundColour(theme.colour("gr-0"))
+        for button in self.action_buttons:
+            button.SetForegroundColour(theme.colour("co-0"))
+            button.SetBackgroundColour(theme.colour("gr-3"))
+        self.Refresh()
+
+    def update_category_counts(self):
+        """Refreshes the counts shown on the category buttons."""
+        for key, button in self.tag_buttons.items():
+            label = self.tag_label(key)
+            if button.GetLabel() != label:
+                button.SetLabel(label)
+
     def reset_category_buttons(self):
         """Resets all category toggle buttons to their deselected state."""
         for button in self.tag_buttons.values():
             if button.GetValue():
                 button.SetValue(False)
-                button.SetBackgroundColour(self.color_tag_normal_bg)
-                button.SetForegroundColour(self.color_tag_normal_fg)
+                self.paint_tag_button(button)
                 button.Refresh()
 
     def on_add_button_hover(self, event):
-        self.add_button.SetBackgroundColour(self.app_state.config["UICOLORS"]["dt-1"])
+        self.add_button.SetBackgroundColour(theme.colour("dt-1"))
         self.add_button.Refresh()
         event.Skip()
 
     def on_add_button_leave(self, event):
-        self.add_button.SetBackgroundColour(self.app_state.config["UICOLORS"]["co-0"])
+        self.add_button.SetBackgroundColour(theme.colour("co-0"))
         self.add_button.Refresh()
         event.Skip()
 
     def on_button_hover(self, event):
         btn = event.GetEventObject()
-        btn.SetForegroundColour(self.app_state.config["UICOLORS"]["gr-3"])
-        btn.SetBackgroundColour(self.app_state.config["UICOLORS"]["co-0"])
+        btn.SetForegroundColour(theme.colour("gr-3"))
+        btn.SetBackgroundColour(theme.colour("co-0"))
         btn.Refresh()
         event.Skip()
 
     def on_button_leave(self, event):
         btn = event.GetEventObject()
-        btn.SetForegroundColour(self.app_state.config["UICOLORS"]["co-0"])
-        btn.SetBackgroundColour(self.app_state.config["UICOLORS"]["gr-3"])
+        btn.SetForegroundColour(theme.colour("co-0"))
+        btn.SetBackgroundColour(theme.colour("gr-3"))
         btn.Refresh()
         event.Skip()
 
+    def on_change_sort(self, evt):
+        """Sets the list order and refreshes the list."""
+        self.app_state.sort_mode = SORT_CHOICES[self.sort_choice.GetSelection()][0]
+        if self.on_update_callback:
+            self.on_update_callback(None)
+
     def on_change_tag(self, evt):
         """Sets the current tag based on the button pressed."""
         tag_id = evt.GetEventObject().GetId()
@@ -258,12 +312,13 @@ class LeftPanel(wx.Panel):
             wx.DefaultSize,
             0 | wx.BORDER_NONE,
         )
-        button.SetFont(wx.Font(12, wx.SWISS, wx.NORMAL, wx.NORMAL, False, DEFAULT_FONT))
-        button.SetForegroundColour(self.app_state.config["UICOLORS"]["co-0"])
-        button.SetBackgroundColour(self.app_state.config["UICOLORS"]["gr-3"])
+        button.SetFont(theme.font("button"))
+        button.SetForegroundColour(theme.colour("co-0"))
+        button.SetBackgroundColour(theme.colour("gr-3"))
         button.SetMinSize(wx.Size(-1, 40))
         button.SetToolTip(btn_label)
         button.SetCursor(wx.Cursor(wx.CURSOR_HAND))
         button.Bind(wx.EVT_ENTER_WINDOW, self.on_button_hover)
         button.Bind(wx.EVT_LEAVE_WINDOW, self.on_button_leave)
+        self.action_buttons.append(button)
         return button
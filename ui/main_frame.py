@@ -1,86 +1,159 @@
 import wx
-import wx.adv
 import json
+import sqlite3
+import threading
+from functools import partial
 
 from app_state import AppState
+from attachments import with_attachments
 from constants import (
+    CONFIG_FILE,
     ID_ABOUT,
     ID_CLEAR_ALL,
     ID_CLEAR_TAGS,
     ID_EXIT,
+    ID_EXPORT,
     ID_INSERT,
     ID_SEARCH,
     ID_SPLITTER,
     ID_UPDATE,
     LEFT_PANEL_WIDTH,
+    SEARCH_DEBOUNCE_MS,
+    STARTUP_FALLBACK_MS,
+    STARTUP_FIRST_CARDS,
     WINDOW_DIMS,
 )
+from exporter import EXPORT_FORMATS, FOLDER_FORMATS, ExportCancelled, export_notes
+from query_worker import QueryWorker
+from search import build_notes_query, next_page_cursor
+from tracing import tracer
+from ui.highlighter import highlighter
+from ui.image_pipeline import image_pipeline
 from ui.left_panel import LeftPanel
 from ui.right_panel import RightPanel
+from ui.theme import theme
+from ui.trace_overlay import TraceOverlay
 
 
 class MainFrame(wx.Frame):
     """The main application frame."""
 
-    def __init__(self, *args, **kw):
+    def __init__(self, *args, startup=None, **kw):
         super().__init__(*args, **kw)
+        # StartupTimer from main(), marked as the stages complete
+        self.startup = startup
 
         self.app_state = AppState()
         self.app_state.load_config()
-        self.load_categories()
+        theme.load(self.app_state.config, CONFIG_FILE)
+        if self.app_state.config["GENERAL"].get("trace", "0") == "1":
+            tracer.enable()
+        self.app_state.load_categories()
+        self.app_state.load_category_counts()
+
+        # Debounced search as you type
+        self.search_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_search_timer, self.search_timer)
+
+        # Keyset pagination state
+        self.query_worker = QueryWorker(self.app_state.storage, wx.CallAfter)
+        self.list_filter = None
+        self.list_generation = 0
+        self.page_cursor = None
+        self.has_more_pages = False
+        self.prefetched_page = None
+        self.waiting_for_page = False
+        self.prefetch_failed = False
 
         self.SetIcon(wx.Icon("assets/PyNotes-Ico.png"))
         self.init_ui()
         self.bind_events()
 
-        # Initial data load
-        self.on_update(None)
+        # Debug overlay with the phases of the last refresh (F12 toggles it)
+        self.trace_overlay = None
+        if tracer.enabled:
+            self.trace_overlay = TraceOverlay(self)
+            self.trace_overlay.visible = (
+                self.app_state.config["GENERAL"].get("trace_overlay", "0") == "1"
+            )
 
-    def load_categories(self):
-        """Loads categories from JSON or creates it from config."""
-        try:
-            with open("data/categories.json", "r") as f:
-                self.app_state.categories = json.load(f)
-            print("Categories loaded from categories.json")
-        except (FileNotFoundError, json.JSONDecodeError):
-            print("categories.json not found. Migrating from database...")
-            self.app_state.categories = {}
-
-            # Fetch existing distinct categories from the database
-            self.app_state.cursor.execute(
-                "SELECT DISTINCT categ FROM notas WHERE categ IS NOT NULL AND categ != ''"
+        # The frame is shown empty; the notes are loaded in stages once it
+        # has been painted (see load_first_cards)
+        self.startup_stage = 0
+        self.left_panel.Bind(wx.EVT_PAINT, self.on_first_paint)
+        # In case no paint event comes (e.g. started minimized)
+        wx.CallLater(STARTUP_FALLBACK_MS, self.load_first_cards)
+
+    # --- Staged startup ---
+
+    def on_first_paint(self, evt):
+        """Starts loading the notes after the window shell is on screen."""
+        self.left_panel.Unbind(wx.EVT_PAINT, handler=self.on_first_paint)
+        if self.startup:
+            self.startup.mark("first_paint")
+        wx.CallAfter(self.load_first_cards)
+        evt.Skip()
+
+    def load_first_cards(self):
+        """Startup stage 1: the first few cards, so the list shows quickly."""
+        if self.startup_stage != 0 or not self:
+            return
+        self.startup_stage = 1
+        self.refresh_list(limit=STARTUP_FIRST_CARDS)
+        if self.startup:
+            self.startup.mark("first_cards")
+        wx.CallAfter(self.load_first_page)
+
+    def load_first_page(self):
+        """Startup stage 2: the rest of the first page."""
+        self.startup_stage = 2
+        remaining = int(self.app_state.max_items) - len(self.right_panel.rows)
+        if self.has_more_pages and remaining > 0:
+            search_term, selected_categories, use_fts, sort = self.list_filter
+            sql, params = build_notes_query(
+                search_term,
+                selected_categories,
+                remaining,
+                use_fts=use_fts,
+                after=self.page_cursor,
+                sort=sort,
+            )
+            rows = with_attachments(
+                self.app_state.conn, self.app_state.conn.execute(sql, params).fetchall()
             )
-            existing_categories = self.app_state.cursor.fetchall()
-
-            all_colors = list(self.app_state.config["CATCOLORS"].keys())
-            color_count = len(all_colors)
-
-            for i, row in enumerate(existing_categories):
-                cat_key = row[0]
-                if cat_key:
-                    # Assign color cyclically
-                    color_key = all_colors[i % color_count]
-                    # Create a simple label from the key
-                    label = cat_key.replace("_", " ").capitalize()
-                    self.app_state.categories[cat_key] = {
-                        "label": label,
-                        "color": color_key,
-                    }
-
-            # Add a default "uncategorized" category if it doesn't exist
-            if "none" not in self.app_state.categories:
-                self.app_state.categories["none"] = {
-                    "label": "None",
-                    "color": "cor_001",
-                }
-
-            self.save_categories()
-
-    def save_categories(self):
-        """Saves the current categories map to categories.json."""
-        with open("data/categories.json", "w") as f:
-            json.dump(self.app_state.categories, f, indent=2)
-        print("categories.json saved.")
+            self.page_cursor = next_page_cursor(rows) or self.page_cursor
+            self.has_more_pages = len(rows) >= remaining
+            self.right_panel.append_rows(rows)
+            self.left_panel.total_items_text.SetLabel(str(len(self.right_panel.rows)))
+        self.prefetch_next_page()
+        if self.startup:
+            self.startup.mark("first_page")
+        wx.CallAfter(self.finish_startup)
+
+    def finish_startup(self):
+        """Startup stage 3: background work, then the app is interactive."""
+        self.startup_stage = 3
+
+        # Remove the image files no note references anymore: left behind
+        # by older versions, or deleted too soon after being pasted
+        image_pipeline.collect_garbage(self.app_state.storage)
+
+        if self.startup:
+            self.startup.mark("interactive")
+            self.startup.record()
+            if self.startup.exit_when_done:
+                # Measurement mode: print the timings and quit
+                print(json.dumps(self.startup.report()))
+                wx.CallAfter(self.Close, True)
+
+    def on_category_added(self, category_key):
+        """
+        Saves a category typed in a card and adds its button to the left
+        panel, keeping the filters and the scroll position (the cards
+        already offer it, see RightPanel.add_category_label).
+        """
+        self.app_state.save_categories()
+        self.left_panel.add_category(category_key)
 
     def init_ui(self):
         """Initializes the main user interface components."""
@@ -90,10 +163,13 @@ class MainFrame(wx.Frame):
 
         # Panels
         self.left_panel = LeftPanel(
-            self.splitter, self.app_state, on_update_callback=self.on_update
+            self.splitter, self.app_state, on_update_callback=self.on_tags_changed
         )
         self.right_panel = RightPanel(
-            self.splitter, self.app_state, self.save_categories
+            self.splitter,
+            self.app_state,
+            self.on_category_added,
+            on_scroll_end_callback=self.on_load_next_page,
         )
         self.splitter.SplitVertically(self.left_panel, self.right_panel)
         self.splitter.SetSashPosition(LEFT_PANEL_WIDTH)
@@ -102,7 +178,7 @@ class MainFrame(wx.Frame):
         self.sizer.Add(self.splitter, 1, wx.EXPAND)
         self.SetSizer(self.sizer)
 
-        self.SetBackgroundColour(self.app_state.config["UICOLORS"]["gr-2"])
+        self.SetBackgroundColour(theme.colour("gr-2"))
 
         # Set window size, ensuring it fits on the screen
         screen_size_x, screen_size_y = wx.GetDisplaySize()
@@ -116,6 +192,7 @@ class MainFrame(wx.Frame):
     def bind_events(self):
         """Binds all application-level events."""
         self.Bind(wx.EVT_CLOSE, self.on_close)
+        self.Bind(wx.EVT_ACTIVATE, self.on_activate)
         self.Bind(wx.EVT_SPLITTER_DCLICK, self.on_double_click, id=ID_SPLITTER)
         self.Bind(wx.EVT_BUTTON, self.on_add_item, id=ID_INSERT)
         self.Bind(wx.EVT_BUTTON, self.on_exit, id=ID_EXIT)
@@ -123,23 +200,90 @@ class MainFrame(wx.Frame):
         self.Bind(wx.EVT_BUTTON, self.on_clear_and_update, id=ID_CLEAR_ALL)
         self.Bind(wx.EVT_BUTTON, self.on_clear_tags, id=ID_CLEAR_TAGS)
         self.Bind(wx.EVT_BUTTON, self.on_about_app, id=ID_ABOUT)
+        self.Bind(wx.EVT_BUTTON, self.on_export, id=ID_EXPORT)
         self.Bind(wx.EVT_TEXT_ENTER, self.on_update, id=ID_SEARCH)
+        self.Bind(wx.EVT_TEXT, self.on_search_text, id=ID_SEARCH)
 
     def on_update(self, evt):
         """Refreshes the list of notes based on current filters."""
-        self.Freeze()
-        print("Freezing UI and updating list...")
+        self.refresh_list()
+
+    def refresh_list(self, limit=None):
+        """
+        Queries and shows the first page of notes (or only 'limit' notes,
+        during startup) and waits for pending saves first.
+        """
+        limit = limit or self.app_state.max_items
+
+        # A synchronous refresh replaces any search still running
+        self.search_timer.Stop()
+        self.query_worker.cancel()
+
+        with tracer.span("on_update") as update_span:
+            self.Freeze()
+            print("Freezing UI and updating list...")
+
+            with tracer.span("save_pending_card"):
+                self.save_pending_card()
+
+            search_term, selected_categories = self.get_list_filter()
+
+            # Build the main SQL query (full-text search when available)
+            use_fts = self.app_state.fts_enabled
+            sql, params = build_notes_query(
+                search_term,
+                selected_categories,
+                limit,
+                use_fts=use_fts,
+                sort=self.app_state.sort_mode,
+            )
+
+            with tracer.span("query"):
+                try:
+                    self.app_state.cursor.execute(sql, params)
+                except sqlite3.OperationalError as e:
+                    # Fall back to a plain LIKE search if the FTS query fails
+                    print(f"Full-text search failed ({e}). Using LIKE.")
+                    use_fts = False
+                    sql, params = build_notes_query(
+                        search_term,
+                        selected_categories,
+                        limit,
+                        use_fts=False,
+                        sort=self.app_state.sort_mode,
+                    )
+                    self.app_state.cursor.execute(sql, params)
+
+            # Rebuild the right panel
+            self.list_generation += 1
+            with tracer.span("fetch"):
+                rows = with_attachments(
+                    self.app_state.conn, self.app_state.cursor.fetchall()
+                )
+            update_span.set(rows=len(rows), fts=use_fts)
+            self.show_list(
+                rows,
+                (search_term, selected_categories, use_fts, self.app_state.sort_mode),
+                limit,
+                prefetch=limit == self.app_state.max_items,
+            )
 
-        # Save any pending changes from the focused card
-        needs_reload = self.right_panel.save_card(self.right_panel.focused_card_id)
+            with tracer.span("thaw"):
+                self.Thaw()
+            self.right_panel.SetFocus()
+        print("List updated.")
 
-        if needs_reload:
-            # A new category was added, we need to reload the UI completely
-            self.reload_ui()
+    def save_pending_card(self):
+        """Saves the focused card and waits until queued saves are committed."""
+        # Save any pending changes from the focused card (a new category
+        # is added to the panels in place, see on_category_added)
+        self.right_panel.save_card(self.right_panel.focused_card_id)
 
-        # Clear the right panel
-        self.right_panel.main_sizer.Clear(True)
+        # The list is read back from the database, so queued saves must land first
+        self.app_state.storage.flush()
 
+    def get_list_filter(self):
+        """Returns the search term and the selected category keys."""
         # Get search term
         search_term = self.left_panel.search_ctrl.GetValue()
 
@@ -152,71 +296,173 @@ class MainFrame(wx.Frame):
                 tag_id = widget.GetId()
                 selected_categories.append(self.app_state.tag_id_map[tag_id])
 
-        # Build the main SQL query
-        sql = "SELECT * FROM notas "
-        where_clauses = []
-        params = []
-
-        if search_term:
-            where_clauses.append("(titulo LIKE ? OR texto LIKE ?)")
-            params.extend([f"%{search_term}%", f"%{search_term}%"])
-
-        if selected_categories:
-            # Create a placeholder for each category: (?, ?, ?)
-            placeholders = ", ".join("?" for _ in selected_categories)
-            where_clauses.append(f"categ IN ({placeholders})")
-            params.extend(selected_categories)
-
-        if where_clauses:
-            sql += "WHERE " + " AND ".join(where_clauses)
-
-        sql += f" ORDER BY codigo_id DESC LIMIT {self.app_state.max_items}"
-
-        self.app_state.cursor.execute(sql, params)
-
-        # Rebuild the right panel
-        self.right_panel.card = {}
-        total_items = 0
-        for row in self.app_state.cursor.fetchall():
-            if row[0]:  # Ensure there's an ID
-                total_items += 1
-                self.right_panel.card[row[0]] = self.right_panel.create_card_item(
-                    row[0], row[1], row[2], row[3], row[4]
-                )
-                self.right_panel.main_sizer.Add(
-                    self.right_panel.card[row[0]],
-                    flag=wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP,
-                    border=4,
-                )
+        return search_term, selected_categories
+
+    def show_list(self, rows, list_filter, limit=None, prefetch=True):
+        """Shows the first page of a list and starts prefetching the next one."""
+        self.right_panel.show_rows(rows)
+
+        # Start fetching the next page in the background
+        self.list_filter = list_filter
+        self.page_cursor = next_page_cursor(rows)
+        self.has_more_pages = len(rows) >= int(limit or self.app_state.max_items)
+        self.prefetched_page = None
+        self.waiting_for_page = False
+        self.prefetch_failed = False
+        if prefetch:
+            self.prefetch_next_page()
+
+        # Update item counter and the per-category counts
+        with tracer.span("counts"):
+            self.left_panel.total_items_text.SetLabel(str(len(self.right_panel.rows)))
+            self.app_state.load_category_counts()
+            self.left_panel.update_category_counts()
+
+    # --- Search as you type ---
+
+    def on_search_text(self, evt):
+        """Starts a debounced search while typing (incremental search mode)."""
+        if self.app_state.incremental_search:
+            # Restart the countdown, only the last change runs a query
+            self.search_timer.StartOnce(SEARCH_DEBOUNCE_MS)
+        evt.Skip()
+
+    def on_tags_changed(self, evt):
+        """Refreshes the list after a category toggle."""
+        if self.app_state.incremental_search:
+            self.search_timer.StartOnce(SEARCH_DEBOUNCE_MS)
+        else:
+            self.on_update(evt)
+
+    def on_search_timer(self, evt):
+        """Runs the debounced search on the background query worker."""
+        self.save_pending_card()
+
+        search_term, selected_categories = self.get_list_filter()
+        use_fts = self.app_state.fts_enabled
+        sql, params = build_notes_query(
+            search_term,
+            selected_categories,
+            self.app_state.max_items,
+            use_fts=use_fts,
+            sort=self.app_state.sort_mode,
+        )
 
-        # Adjust layout and scrolling
-        self.right_panel.main_sizer.Layout()
-        self.right_panel.FitInside()
-        self.right_panel.SetupScrolling()
+        # Only the latest search may update the list
+        self.query_worker.cancel()
+        self.list_generation += 1
+        self.query_worker.submit(
+            sql,
+            params,
+            partial(
+                self.on_search_result,
+                self.list_generation,
+                (search_term, selected_categories, use_fts, self.app_state.sort_mode),
+            ),
+            transform=with_attachments,
+        )
 
-        self.Thaw()
-        self.right_panel.SetFocus()
-        print("List updated.")
+    def on_search_result(self, generation, list_filter, rows):
+        """Applies the result of a background search if it is still current."""
+        if not self or generation != self.list_generation:
+            return
+        if rows is None:
+            # The query failed (e.g. FTS syntax), run it the regular way
+            self.on_update(None)
+            return
+
+        with tracer.span("search") as search_span:
+            search_span.set(rows=len(rows))
+            self.Freeze()
+            self.show_list(rows, list_filter)
+            with tracer.span("thaw"):
+                self.Thaw()
+
+    def prefetch_next_page(self):
+        """Queries the page after the last card shown on a background thread."""
+        if not self.has_more_pages:
+            return
+        search_term, selected_categories, use_fts, sort = self.list_filter
+        sql, params = build_notes_query(
+            search_term,
+            selected_categories,
+            self.app_state.page_size,
+            use_fts=use_fts,
+            after=self.page_cursor,
+            sort=sort,
+        )
+        self.query_worker.submit(
+            sql,
+            params,
+            partial(self.on_page_prefetched, self.list_generation, self.page_cursor),
+            transform=with_attachments,
+        )
 
-        # Update item counter
-        self.left_panel.total_items_text.SetLabel(str(total_items))
+    def on_page_prefetched(self, generation, cursor, rows):
+        """Keeps a prefetched page, or shows it if the user is already waiting."""
+        if not self:
+            return
+        # Ignore pages of an older list
+        if generation != self.list_generation or cursor != self.page_cursor:
+            return
+        if rows is None:
+            # The query failed; tried again when the bottom is reached
+            self.prefetch_failed = True
+            self.waiting_for_page = False
+            return
+        self.prefetched_page = rows
+        if self.waiting_for_page:
+            self.on_load_next_page()
+
+    def on_load_next_page(self):
+        """Appends the next page of cards when the list is scrolled to the bottom."""
+        if not self.has_more_pages:
+            return
+        if self.prefetched_page is None:
+            if self.prefetch_failed:
+                self.prefetch_failed = False
+                self.prefetch_next_page()
+            # Shown as soon as the prefetch finishes
+            self.waiting_for_page = True
+            return
+
+        rows = self.prefetched_page
+        self.prefetched_page = None
+        self.waiting_for_page = False
+
+        self.page_cursor = next_page_cursor(rows) or self.page_cursor
+        self.has_more_pages = len(rows) >= int(self.app_state.page_size)
+        self.right_panel.append_rows(rows)
+        self.left_panel.total_items_text.SetLabel(str(len(self.right_panel.rows)))
+        print(f"Appended {len(rows)} notes.")
+
+        self.prefetch_next_page()
 
     def on_add_item(self, evt):
         """Adds a new, empty note to the database and refreshes the list."""
-        self.app_state.cursor.execute("SELECT MAX(codigo_id) FROM notas")
-        last_id = self.app_state.cursor.fetchone()[0] or 0
-        new_id = last_id + 1
-
         title = self.left_panel.search_ctrl.GetValue() or "New Title"
+        category = self.app_state.current_tag
+
+        def insert_note(conn):
+            last_id = conn.execute("SELECT MAX(codigo_id) FROM notas").fetchone()[0]
+            new_id = (last_id or 0) + 1
+            conn.execute(
+                "INSERT INTO notas (codigo_id, categ, titulo, texto, updated_at) "
+                "VALUES (?, ?, ?, ?, DATETIME('now'))",
+                (new_id, category, title, "New text here."),
+            )
+            return new_id
 
-        self.app_state.cursor.execute(
-            "INSERT INTO notas (codigo_id, categ, titulo, texto) VALUES (?, ?, ?, ?)",
-            (new_id, self.app_state.current_tag, title, "New text here."),
-        )
+        # Wait for the commit, the new note must be in the list
+        new_id = self.app_state.storage.transaction(insert_note).result()
         print(f"Added new item with ID {new_id}")
 
         self.on_update(None)
 
+        # Painted mode: the new note opens for editing
+        if self.right_panel.painted:
+            self.right_panel.open_card(new_id)
+
         # Scroll to the new item
         if new_id in self.right_panel.card:
             self.right_panel.ScrollChildIntoView(self.right_panel.card[new_id])
@@ -232,6 +478,115 @@ class MainFrame(wx.Frame):
         self.left_panel.reset_category_buttons()
         self.on_update(None)
 
+    def on_export(self, evt):
+        """Exports all notes on a background thread, showing its progress."""
+        format_labels = [
+            "CSV file",
+            "JSON lines file",
+            "Folder of .txt files",
+            "Folder of .md files",
+        ]
+        with wx.SingleChoiceDialog(
+            self, "Export format:", "Export Notes", format_labels
+        ) as dialog:
+            if dialog.ShowModal() != wx.ID_OK:
+                return
+            export_format = EXPORT_FORMATS[dialog.GetSelection()]
+
+        if export_format in FOLDER_FORMATS:
+            with wx.DirDialog(self, "Export notes to folder") as dialog:
+                if dialog.ShowModal() != wx.ID_OK:
+                    return
+                destination = dialog.GetPath()
+        else:
+            with wx.FileDialog(
+                self,
+                "Export notes to file",
+                defaultFile=f"notes.{export_format}",
+                wildcard=f"*.{export_format}|*.{export_format}",
+                style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT,
+            ) as dialog:
+                if dialog.ShowModal() != wx.ID_OK:
+                    return
+                destination = dialog.GetPath()
+
+        include_attachments = (
+            wx.MessageBox(
+                "Include the attached images?",
+                "Export Notes",
+                wx.YES_NO | wx.ICON_QUESTION,
+                self,
+            )
+            == wx.YES
+        )
+
+        # Export what is on screen, including the card being edited
+        self.save_pending_card()
+
+        # The dialog disables the frame until the export ends, but the
+        # export runs in a thread, so the window keeps repainting and the
+        # dialog can cancel it
+        progress_dialog = wx.ProgressDialog(
+            "Export Notes",
+            "Exporting notes...",
+            maximum=100,
+            parent=self,
+            style=wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_AUTO_HIDE,
+        )
+        cancel_event = threading.Event()
+
+        def report_progress(done, total):
+            wx.CallAfter(
+                self.on_export_progress, progress_dialog, cancel_event, done, total
+            )
+
+        def run_export():
+            conn = self.app_state.storage.connect(read_only=True)
+            count, error = None, None
+            try:
+                count = export_notes(
+                    conn,
+                    destination,
+                    export_format,
+                    include_attachments=include_attachments,
+                    categories=self.app_state.categories,
+                    progress=report_progress,
+                    cancel_event=cancel_event,
+                )
+            except ExportCancelled:
+                error = "Export cancelled."
+            except (OSError, sqlite3.Error) as e:
+                error = f"Export failed: {e}"
+            finally:
+                conn.close()
+            wx.CallAfter(self.on_export_done, progress_dialog, destination, count, error)
+
+        threading.Thread(target=run_export, name="Export", daemon=True).start()
+
+    def on_export_progress(self, progress_dialog, cancel_event, done, total):
+        """Updates the export progress dialog (GUI thread)."""
+        if not progress_dialog:
+            return
+        percent = min(int(done * 100 / max(total, 1)), 99)
+        keep_going, _ = progress_dialog.Update(percent, f"{done} of {total} notes")
+        if not keep_going:
+            cancel_event.set()
+
+    def on_export_done(self, progress_dialog, destination, count, error):
+        """Closes the progress dialog and reports how the export ended."""
+        if progress_dialog:
+            progress_dialog.Destroy()
+        if error:
+            print(error)
+            wx.MessageBox(error, "Export Notes", wx.ICON_WARNING)
+        else:
+            print(f"{count} notes exported to {destination}")
+            wx.MessageBox(
+                f"{count} notes exported to\n{destination}",
+                "Export Notes",
+                wx.ICON_INFORMATION,
+            )
+
     def on_about_app(self, evt):
         """Displays the About dialog."""
         description = """VaVar PyNotes - Aquart Dev
@@ -240,6 +595,8 @@ notes for easy retrieval and use across
 various categories.
 """
         licence = """VaVar PyNotes is MIT licensed."""
+        import wx.adv  # Only needed here; kept out of the startup path
+
         info = wx.adv.AboutDialogInfo()
         info.SetIcon(wx.Icon("assets/PyNotes-Ico.png", wx.BITMAP_TYPE_PNG))
         info.SetName("VaVar PyNotes")
@@ -257,6 +614,11 @@ various categories.
 
     def on_close(self, evt):
         """Handles the window close event, ensuring the DB is closed."""
+        self.search_timer.Stop()
+        self.query_worker.cancel()
+        self.query_worker.stop()
+        image_pipeline.shutdown()
+        highlighter.shutdown()
         self.app_state.close_db()
         self.Destroy()
 
@@ -264,20 +626,25 @@ various categories.
         """Resets the splitter position on double-click."""
         self.splitter.SetSashPosition(LEFT_PANEL_WIDTH)
 
-    def reload_ui(self):
-        """Destroys and recreates the UI panels to reflect new categories."""
-        self.Freeze()
-        sash_pos = self.splitter.GetSashPosition()
-
-        self.left_panel.Destroy()
-        self.right_panel.Destroy()
+    def on_activate(self, evt):
+        """Applies the colours of config.ini again if it was edited meanwhile."""
+        if evt.GetActive() and theme.config_changed():
+            wx.CallAfter(self.reload_theme)
+        evt.Skip()
+
+    def reload_theme(self):
+        """Reloads the theme from config.ini and recolours the panels in place."""
+        config = AppState.read_config(CONFIG_FILE)
+        for section in ("UICOLORS", "CATCOLORS"):
+            if section in config:
+                self.app_state.config[section] = config[section]
+        self.app_state.categories.color_keys = list(self.app_state.config["CATCOLORS"])
+        theme.load(self.app_state.config, CONFIG_FILE)
 
-        self.left_panel = LeftPanel(
-            self.splitter, self.app_state, on_update_callback=self.on_update
-        )
-        self.right_panel = RightPanel(
-            self.splitter, self.app_state, self.save_categories
-        )
-        self.splitter.SplitVertically(self.left_panel, self.right_panel)
-        self.splitter.SetSashPosition(sash_pos)
+        self.Freeze()
+        self.SetBackgroundColour(theme.colour("gr-2"))
+        self.left_panel.apply_theme()
+        self.right_panel.apply_theme()
         self.Thaw()
+        self.Refresh()
+        print("Theme reloaded.")
@@ -1,19 +1,34 @@
 import html
 import os
+from bisect import bisect_left, bisect_right
 from functools import partial
+from itertools import accumulate
 
 import wx
+import wx.html
 import wx.lib.buttons as wxbt
 import wx.lib.scrolledpanel as scrolled
-from PIL import Image, ImageGrab
 from wx.lib.expando import EVT_ETC_LAYOUT_NEEDED, ExpandoTextCtrl
 
+from attachments import add_attachment
+from highlight import MARKDOWN, TOKEN_COLORS, detect_language, shift_spans
 from constants import (
+    CARD_OVERSCAN,
+    CARD_POOL_SIZE,
+    DEFAULT_FONT,
+    ESTIMATED_CARD_HEIGHT,
+    FENCE_CHECK_MS,
+    ICON_SIZE,
     IMAGE_DIR,
     THUMB_DIR,
-    THUMB_SIZE,
 )
-from utils import sanitize_text
+from markdown_render import render_cache
+from tracing import tracer
+from ui.bitmap_cache import bitmap_cache
+from ui.card_preview import CardPreview
+from ui.highlighter import highlighter
+from ui.image_pipeline import image_pipeline
+from ui.theme import theme
 
 
 class RightPanel(scrolled.ScrolledPanel):
@@ -21,21 +36,57 @@ class RightPanel(scrolled.ScrolledPanel):
     The right, scrollable panel that displays the note cards.
     """
 
-    def __init__(self, parent, app_state, save_categories_callback):
+    def __init__(
+        self, parent, app_state, on_category_added_callback, on_scroll_end_callback=None
+    ):
         """Constructor"""
         scrolled.ScrolledPanel.__init__(self, parent, -1, style=wx.VSCROLL)
         self.app_state = app_state
         self.focused_card_id = 0
         self.attached_images = {}
-        self.save_categories_callback = save_categories_callback
+        self.on_category_added_callback = on_category_added_callback
+        self.on_scroll_end_callback = on_scroll_end_callback
 
-        self.SetBackgroundColour(self.app_state.config["UICOLORS"]["gr-0"])
+        self.SetBackgroundColour(theme.colour("gr-0"))
 
         # Main sizer for the right panel
         self.main_sizer = wx.BoxSizer(wx.VERTICAL)
         self.SetSizer(self.main_sizer)
 
         self.card = {}
+        # Note data shown by each card: (categ, titulo, texto, attachments)
+        self.card_data = {}
+
+        # Virtualized mode: only the cards near the viewport exist as widgets
+        self.virtual = (
+            self.app_state.config["GENERAL"].get("virtual_list", "0") == "1"
+        )
+        self.rows = []
+        self.row_heights = {}
+        self.visible_range = (0, 0)
+        self.card_pool = []
+        self.viewport_update_pending = False
+
+        # Painted mode (not with the virtual list): notes are drawn as
+        # previews, and only the clicked one gets the editing widgets
+        self.painted = (
+            not self.virtual
+            and self.app_state.config["GENERAL"].get("painted_cards", "0") == "1"
+        )
+        self.previews = {}
+        self.preview_layout_pending = False
+
+        # Markdown read mode: cards show the rendered text until clicked
+        self.markdown = self.app_state.config["GENERAL"].get("markdown", "0") == "1"
+
+        # Text styles for syntax highlighting
+        self.default_text_attr = wx.TextAttr(theme.colour("gr-0"))
+        self.token_attrs = {
+            kind: wx.TextAttr(color) for kind, color in TOKEN_COLORS.items()
+        }
+
+        self.Bind(wx.EVT_SCROLLWIN, self.on_scroll)
+        self.Bind(wx.EVT_SIZE, self.on_scroll)
 
         self.SetupScrolling()
         self.SetAutoLayout(1)
@@ -47,6 +98,7 @@ class RightPanel(scrolled.ScrolledPanel):
         evt.GetEventObject().GetParent().Layout()
         # Postpone the scrollbar adjustment until after this event is done.
         wx.CallAfter(self.FitInside)
+        self.schedule_viewport_update()
 
     def ScrollChildIntoView(self, child):
         """Override to prevent automatic scrolling on focus."""
@@ -55,14 +107,552 @@ class RightPanel(scrolled.ScrolledPanel):
     def on_mouse_wheel(self, evt):
         """Pass mouse wheel events to the parent for scrolling."""
         self.GetEventHandler().ProcessEvent(evt)
+        self.schedule_viewport_update()
+        evt.Skip()
+
+    def show_rows(self, rows):
+        """
+        Shows the given 'notas' rows. Cards of notes that are already on
+        screen are kept (and updated in place if the note changed); only
+        new notes get new cards and only removed notes lose theirs.
+        """
+        rows = [row for row in rows if row[0]]  # Ensure there's an ID
+        new_ids = {row[0] for row in rows}
+
+        if self.virtual:
+            # Live cards still in range are reused by update_viewport
+            self.rows = rows
+            self.Scroll(0, 0)
+            with tracer.span("viewport"):
+                self.update_viewport(force=True)
+            self.schedule_viewport_update()
+            return
+
+        with tracer.span("cards") as cards_span:
+            # Remove the cards of notes that are no longer listed
+            for item_id in [item_id for item_id in self.card if item_id not in new_ids]:
+                card_panel = self.card.pop(item_id)
+                self.main_sizer.Detach(card_panel)
+                card_panel.Hide()
+                card_panel.DestroyLater()
+                self.card_data.pop(item_id, None)
+                self.attached_images.pop(item_id, None)
+            for item_id in [i for i in self.previews if i not in new_ids]:
+                self.drop_preview(item_id)
+
+            # Create the new cards, refresh the changed ones
+            created = 0
+            for row in rows:
+                card_panel = self.card.get(row[0])
+                if card_panel is None and self.painted:
+                    created += self.show_preview(row)
+                elif card_panel is None:
+                    self.card[row[0]] = self.create_card_item(
+                        row[0], row[1], row[2], row[3], row[4]
+                    )
+                    created += 1
+                else:
+                    self.sync_card(card_panel, row)
+            cards_span.set(created=created)
+
+            # Reorder only if needed
+            shown = [item.GetWindow() for item in self.main_sizer.GetChildren()]
+            wanted = [self.card_widget(row[0]) for row in rows]
+            if shown != wanted:
+                self.main_sizer.Clear()
+                for card_panel in wanted:
+                    self.main_sizer.Add(
+                        card_panel,
+                        flag=wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP,
+                        border=4,
+                    )
+            self.rows = rows
+
+        # Adjust layout and scrolling
+        with tracer.span("layout"):
+            self.main_sizer.Layout()
+            self.FitInside()
+            self.SetupScrolling()
+        self.schedule_viewport_update()
+
+    def sync_card(self, card_panel, row):
+        """Updates an existing card in place if its note changed."""
+        if self.card_data.get(row[0]) != tuple(row[1:5]):
+            self.fill_card_item(card_panel, row[0], row[1], row[2], row[3], row[4])
+
+    def append_rows(self, rows):
+        """Adds cards for the next page of 'notas' rows below the current ones."""
+        shown_ids = {row[0] for row in self.rows}
+        rows = [row for row in rows if row[0] and row[0] not in shown_ids]
+        self.rows.extend(rows)
+
+        if self.virtual:
+            self.update_viewport(force=True)
+        else:
+            self.Freeze()
+            for row in rows:
+                if self.painted:
+                    self.show_preview(row)
+                else:
+                    self.card[row[0]] = self.create_card_item(
+                        row[0], row[1], row[2], row[3], row[4]
+                    )
+                self.main_sizer.Add(
+                    self.card_widget(row[0]),
+                    flag=wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP,
+                    border=4,
+                )
+            # Keep the scroll position (SetupScrolling would scroll to the top)
+            self.main_sizer.Layout()
+            self.FitInside()
+            self.Thaw()
+
+        self.schedule_viewport_update()
+
+    def on_scroll(self, evt):
+        """Updates the view after it scrolls or resizes."""
+        self.schedule_viewport_update()
         evt.Skip()
 
+    def schedule_viewport_update(self):
+        """Coalesces viewport updates into one call after pending events."""
+        if not self.viewport_update_pending:
+            self.viewport_update_pending = True
+            wx.CallAfter(self.on_viewport_changed)
+
+    def on_viewport_changed(self):
+        """Updates the live cards and asks for more notes near the bottom."""
+        self.viewport_update_pending = False
+        if not self:
+            return
+        if self.virtual:
+            self.update_viewport()
+        if self.markdown:
+            self.render_visible_cards()
+        else:
+            self.highlight_visible_cards()
+        self.check_scroll_end()
+
+    def check_scroll_end(self):
+        """Calls the scroll end callback when the view is close to the bottom."""
+        if not self.on_scroll_end_callback or not self.rows:
+            return
+        _, rate_y = self.GetScrollPixelsPerUnit()
+        view_height = self.GetClientSize().height
+        view_bottom = self.GetViewStart()[1] * max(rate_y, 1) + view_height
+        if view_bottom >= self.GetVirtualSize().height - view_height:
+            self.on_scroll_end_callback()
+
+    # --- Virtualized list ---
+
+    def row_height(self, row):
+        """Measured height of a row's card, or an estimate if never shown."""
+        return self.row_heights.get(row[0], ESTIMATED_CARD_HEIGHT)
+
+    def update_viewport(self, force=False):
+        """
+        Makes sure that exactly the cards intersecting the viewport (plus
+        an overscan margin) exist as widgets. Off-screen rows are replaced
+        by spacers sized from the height cache.
+        """
+        if not self.virtual:
+            return
+
+        _, rate_y = self.GetScrollPixelsPerUnit()
+        view_top = self.GetViewStart()[1] * max(rate_y, 1)
+        view_bottom = view_top + self.GetClientSize().height
+
+        # Row top offsets
+        tops = list(accumulate((self.row_height(row) for row in self.rows), initial=0))
+
+        first_visible = max(bisect_right(tops, view_top) - 1, 0)
+        last_visible = bisect_left(tops, view_bottom)
+        first = max(first_visible - CARD_OVERSCAN, 0)
+        last = min(last_visible + CARD_OVERSCAN, len(self.rows))
+
+        if (first, last) == self.visible_range and not force:
+            return
+
+        self.Freeze()
+
+        # Release the cards that left the range
+        wanted_ids = {row[0] for row in self.rows[first:last]}
+        for item_id in list(self.card):
+            if item_id not in wanted_ids:
+                self.release_card(self.card.pop(item_id))
+
+        # Lay out: top spacer, live cards, bottom spacer
+        self.main_sizer.Clear()
+        self.main_sizer.Add(0, tops[first])
+        for row in self.rows[first:last]:
+            card_panel = self.card.get(row[0])
+            if card_panel is None:
+                card_panel = self.acquire_card(row)
+                self.card[row[0]] = card_panel
+            else:
+                self.sync_card(card_panel, row)
+            self.main_sizer.Add(
+                card_panel,
+                flag=wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP,
+                border=4,
+            )
+        self.main_sizer.Add(0, tops[-1] - tops[last])
+        self.main_sizer.Layout()
+
+        # Replace the estimates with the real heights
+        shift_above_view = 0
+        for index in range(first, last):
+            row = self.rows[index]
+            height = self.card[row[0]].GetSize().height + 4
+            if index < first_visible:
+                shift_above_view += height - self.row_height(row)
+            self.row_heights[row[0]] = height
+
+        self.visible_range = (first, last)
+        self.FitInside()
+        if shift_above_view and rate_y:
+            self.Scroll(-1, (view_top + shift_above_view) // rate_y)
+        self.Thaw()
+
+    def acquire_card(self, row):
+        """Returns a card for the row, recycled from the pool when possible."""
+        if self.card_pool:
+            card_panel = self.card_pool.pop()
+            self.fill_card_item(card_panel, row[0], row[1], row[2], row[3], row[4])
+            card_panel.Show()
+            return card_panel
+        return self.create_card_item(row[0], row[1], row[2], row[3], row[4])
+
+    def release_card(self, card_panel):
+        """Hides a card and keeps it in the pool for reuse."""
+        item_id = card_panel.GetId()
+
+        # Save pending edits before the card is reused for another note
+        focused_widget = self.FindFocus()
+        if focused_widget and card_panel.IsDescendant(focused_widget):
+            self.save_card(item_id)
+            self.focused_card_id = 0
+            self.SetFocus()
+
+        self.attached_images.pop(item_id, None)
+        self.card_data.pop(item_id, None)
+        card_panel.Hide()
+        if len(self.card_pool) < CARD_POOL_SIZE:
+            self.card_pool.append(card_panel)
+        else:
+            card_panel.DestroyLater()
+
+    # --- Painted cards ---
+
+    def card_widget(self, item_id):
+        """The card shown for a note: its open card, or else its preview."""
+        card_panel = self.card.get(item_id)
+        return card_panel if card_panel is not None else self.previews[item_id]
+
+    def show_preview(self, row):
+        """Creates or updates the preview of a 'notas' row; True if created."""
+        preview = self.previews.get(row[0])
+        if preview is None:
+            preview = CardPreview(
+                self, self.app_state, self.open_card, self.schedule_preview_layout
+            )
+            preview.Bind(wx.EVT_MOUSEWHEEL, self.on_mouse_wheel)
+            preview.set_note(row[0], row[1], row[2], row[3], row[4])
+            self.previews[row[0]] = preview
+            return True
+        if preview.note != tuple(row[1:5]):
+            preview.set_note(row[0], row[1], row[2], row[3], row[4])
+        return False
+
+    def drop_preview(self, item_id):
+        preview = self.previews.pop(item_id, None)
+        if preview is not None:
+            self.main_sizer.Detach(preview)
+            preview.Hide()
+            preview.DestroyLater()
+
+    def schedule_preview_layout(self):
+        """Lays the list out again after previews changed height (coalesced)."""
+        if not self.preview_layout_pending:
+            self.preview_layout_pending = True
+            wx.CallAfter(self.on_preview_layout)
+
+    def on_preview_layout(self):
+        self.preview_layout_pending = False
+        if not self:
+            return
+        self.main_sizer.Layout()
+        self.FitInside()
+        self.schedule_viewport_update()
+
+    def open_card(self, item_id):
+        """
+        Puts a card with the editing widgets in place of a note's preview.
+        Only one card is open at a time.
+        """
+        preview = self.previews.get(item_id)
+        if preview is None or item_id in self.card:
+            return
+        for open_id in list(self.card):
+            self.close_card(open_id, force=True)
+
+        self.Freeze()
+        card_panel = self.acquire_card((item_id,) + tuple(preview.note))
+        self.card[item_id] = card_panel
+        self.main_sizer.Replace(preview, card_panel)
+        preview.Hide()
+        self.focused_card_id = item_id
+        if card_panel.read_view:
+            self.show_editor(card_panel)
+        else:
+            card_panel.Layout()
+            self.main_sizer.Layout()
+            self.FitInside()
+            card_panel.id_widgets[4][0].SetFocus()
+        self.Thaw()
+
+    def close_card(self, item_id, force=False):
+        """
+        Puts the preview back once an open card lost the focus (or, with
+        force, when another card is opened), showing the saved values.
+        """
+        card_panel = self.card.get(item_id)
+        preview = self.previews.get(item_id)
+        if card_panel is None or preview is None:
+            return
+        focused_widget = self.FindFocus()
+        if focused_widget and card_panel.IsDescendant(focused_widget):
+            if not force:
+                return  # Focus came back, or moved to one of the card's buttons
+            self.save_card(item_id)
+            self.focused_card_id = 0
+            self.SetFocus()
+
+        item_category, item_title, item_text, item_images = self.card_data.get(
+            item_id, preview.note
+        )
+        item_images = list(self.attached_images.get(item_id, item_images) or ())
+
+        self.Freeze()
+        del self.card[item_id]
+        self.main_sizer.Replace(card_panel, preview)
+        self.release_card(card_panel)
+        preview.set_note(item_id, item_category, item_title, item_text, item_images)
+        preview.Show()
+        self.main_sizer.Layout()
+        self.FitInside()
+        self.Thaw()
+        self.schedule_viewport_update()
+
+    # --- Markdown read mode ---
+
+    def is_visible(self, card_panel):
+        """True if any part of the card is inside the viewport."""
+        if not card_panel.IsShown():
+            return False
+        top = card_panel.GetPosition().y
+        return top < self.GetClientSize().height and top + card_panel.GetSize().height > 0
+
+    def render_visible_cards(self):
+        """
+        Renders the read view of the cards on screen. Off-screen cards
+        keep an estimated height until they are scrolled into view.
+        """
+        pending = [
+            card_panel
+            for card_panel in self.card.values()
+            if card_panel.render_pending and self.is_visible(card_panel)
+        ]
+        if not pending:
+            return
+
+        with tracer.span("render_cards", cards=len(pending)):
+            self.Freeze()
+            for card_panel in pending:
+                self.render_card(card_panel)
+            self.main_sizer.Layout()
+            self.FitInside()
+            self.Thaw()
+        # The rendered cards may be taller or shorter than the estimate
+        self.schedule_viewport_update()
+
+    def render_card(self, card_panel):
+        """Shows the rendered note text (from the render cache) in a card."""
+        card_panel.render_pending = False
+        text_block = card_panel.id_widgets[4][0]
+        read_view = card_panel.read_view
+        # Notes whose category is a language are rendered as code
+        language = card_panel.language if card_panel.language != MARKDOWN else None
+        read_view.SetPage(
+            f'<body bgcolor="{theme.html["wh-1"]}" text="{theme.html["gr-0"]}">'
+            f"{render_cache.get(text_block.GetValue(), language)}</body>"
+        )
+        self.fit_read_view(read_view)
+
+    def fit_read_view(self, read_view):
+        """Sets the read view height to the height of its content."""
+        width = read_view.GetParent().GetClientSize().width
+        if width <= 0:
+            return
+        content = read_view.GetInternalRepresentation()
+        if content is None:
+            return
+        content.Layout(width)
+        read_view.rendered_width = width
+        height = max(content.GetHeight(), read_view.GetCharHeight())
+        read_view.SetMinSize((-1, height + 4))
+
+    def on_read_view_size(self, evt):
+        """Lays out the rendered text again when the card width changes."""
+        read_view = evt.GetEventObject()
+        card_panel = read_view.GetGrandParent()
+        if (
+            not card_panel.render_pending
+            and read_view.GetParent().GetClientSize().width != read_view.rendered_width
+        ):
+            self.fit_read_view(read_view)
+            wx.CallAfter(self.FitInside)
+        evt.Skip()
+
+    def show_read_view(self, card_panel):
+        """Switches a card to the rendered text; it renders when visible."""
+        text_block = card_panel.id_widgets[4][0]
+        read_view = card_panel.read_view
+        card_panel.editing = False
+        card_panel.render_pending = True
+
+        # Estimated height until rendered, from the number of lines
+        line_count = text_block.GetValue().count("\n") + 1
+        read_view.SetPage("")
+        read_view.rendered_width = 0
+        read_view.SetMinSize((-1, line_count * read_view.GetCharHeight()))
+
+        text_block.Hide()
+        read_view.Show()
+
+    def on_read_view_click(self, evt):
+        """Links open in the browser; any other click opens the editor."""
+        cell = evt.GetCell()
+        point = evt.GetPoint()
+        if cell is not None and cell.GetLink(point.x, point.y):
+            evt.Skip()  # Handled by on_link_clicked
+            return
+        self.show_editor(evt.GetEventObject().GetGrandParent())
+
+    def on_link_clicked(self, evt):
+        wx.LaunchDefaultBrowser(evt.GetLinkInfo().GetHref())
+
+    def show_editor(self, card_panel):
+        """Replaces a card's rendered text with the text editor."""
+        text_block = card_panel.id_widgets[4][0]
+        card_panel.editing = True
+        card_panel.render_pending = False
+        card_panel.read_view.Hide()
+        text_block.Show()
+        if not card_panel.highlight_on:
+            self.start_highlight(card_panel)
+        card_panel.Layout()
+        self.main_sizer.Layout()
+        self.FitInside()
+        text_block.SetFocus()
+        self.schedule_viewport_update()
+
+    def end_editing(self, item_id):
+        """Back to the read view after the editor lost focus."""
+        card_panel = self.card.get(item_id)
+        if not card_panel or not card_panel.editing:
+            return
+        if card_panel.id_widgets[4][0] == self.FindFocus():
+            return  # Focus came back to the editor
+        self.show_read_view(card_panel)
+        card_panel.Layout()
+        self.main_sizer.Layout()
+        self.FitInside()
+        self.schedule_viewport_update()
+
+    # --- Syntax highlighting ---
+
+    def highlight_visible_cards(self):
+        """Starts highlighting the editors that came into view."""
+        for card_panel in list(self.card.values()):
+            if not card_panel.highlight_on and self.is_visible(card_panel):
+                self.start_highlight(card_panel)
+
+    def start_highlight(self, card_panel):
+        """Highlights a card's editor now and after each edit."""
+        card_panel.highlight_on = True
+        if card_panel.language:
+            text = card_panel.id_widgets[4][0].GetValue()
+            self.request_highlight(card_panel, text, full=True)
+
+    def request_highlight(self, card_panel, text, full=False):
+        # The text the next result is compared against (see on_highlighted)
+        card_panel.highlight_text = text
+        item_id = card_panel.GetId()
+        highlighter.request(
+            item_id,
+            text,
+            card_panel.language,
+            partial(self.on_highlighted, card_panel, item_id),
+            full,
+        )
+
+    def on_text_edited(self, evt):
+        """Re-highlights the edited part of a code note (in the background)."""
+        # The text block is in the card's content_wrapper
+        card_panel = evt.GetEventObject().GetGrandParent()
+        if getattr(card_panel, "highlight_on", False):
+            if card_panel.language:
+                self.request_highlight(card_panel, evt.GetString())
+            elif card_panel.fence_timer and card_panel.fence_timer.IsRunning():
+                card_panel.fence_timer.Restart(FENCE_CHECK_MS)
+            else:
+                # A fenced block may have been typed: checked once the
+                # typing pauses, not on every keystroke
+                card_panel.fence_timer = wx.CallLater(
+                    FENCE_CHECK_MS, self.check_fence, card_panel, card_panel.GetId()
+                )
+        evt.Skip()
+
+    def check_fence(self, card_panel, item_id):
+        """Starts highlighting a plain note in which a fence was typed."""
+        if not card_panel or card_panel.GetId() != item_id:
+            return  # Card recycled or refilled meanwhile
+        card_panel.fence_timer = None
+        if not card_panel.highlight_on or card_panel.language:
+            return
+        text = card_panel.id_widgets[4][0].GetValue()
+        card_panel.language = detect_language(text)
+        if card_panel.language:
+            self.request_highlight(card_panel, text, full=True)
+
+    def on_highlighted(self, card_panel, item_id, text, range_start, range_end, spans):
+        """Applies the token colors of the changed range to an editor."""
+        if not card_panel or card_panel.GetId() != item_id or not card_panel.highlight_on:
+            return  # Card recycled or refilled meanwhile
+        text_block = card_panel.id_widgets[4][0]
+        # Each edit requests a highlight, so the last requested text is
+        # the editor's current text
+        current_text = card_panel.highlight_text
+        if current_text != text:
+            # Edited again since; the newer result covers the edit
+            range_start, range_end, spans = shift_spans(
+                text, current_text, range_start, range_end, spans
+            )
+
+        text_block.Freeze()
+        text_block.SetStyle(range_start, range_end, self.default_text_attr)
+        for start, end, kind in spans:
+            text_block.SetStyle(start, end, self.token_attrs[kind])
+        text_block.Thaw()
+        card_panel.styled = True
+
     def on_copy(self, evt):
         """Copy the card's main text to the clipboard."""
         btn_id = evt.GetId()
         card_id = btn_id - 1000
-        card_children = self.card[card_id].GetChildren()
-        text_to_copy = card_children[1].GetValue()
+        text_ctrl = wx.FindWindowById(card_id + 5000, self.card[card_id])
+        text_to_copy = text_ctrl.GetValue()
 
         data_obj = wx.TextDataObject()
         data_obj.SetText(text_to_copy)
@@ -81,101 +671,125 @@ class RightPanel(scrolled.ScrolledPanel):
         btn_id = evt.GetId()
         card_id = btn_id - 2000
 
-        if self.card[card_id]:
-            self.card[card_id].DestroyLater()
-
-        # Delete from DB
-        self.app_state.cursor.execute(
+        if self.virtual:
+            self.rows = [row for row in self.rows if row[0] != card_id]
+            if card_id in self.card:
+                self.release_card(self.card.pop(card_id))
+            wx.CallAfter(self.update_viewport, True)
+        elif card_id in self.card:
+            card_panel = self.card.pop(card_id)
+            self.main_sizer.Detach(card_panel)
+            card_panel.DestroyLater()
+            self.rows = [row for row in self.rows if row[0] != card_id]
+            self.drop_preview(card_id)
+        self.card_data.pop(card_id, None)
+        highlighter.forget(card_id)
+
+        # Delete from DB (with its attachments) and the unused image files
+        self.app_state.storage.write(
             "DELETE FROM notas WHERE codigo_id = ?", (card_id,)
         )
-        self.app_state.conn.commit()
+        image_pipeline.remove_unreferenced(self.app_state.storage)
         print(f"Removed card {card_id}")
 
         self.main_sizer.Layout()
         wx.CallAfter(self.FitInside)
         evt.Skip()
 
-    def on_paste_image(self, item_title, evt):
+    def on_paste_image(self, evt):
         """Paste an image from the clipboard and attach it to the card."""
         btn_id = evt.GetId()
         item_id = btn_id - 7000
 
-        image_count = len(self.attached_images.get(item_id, [])) + 1
-
-        # Filenames
-        attachment_filename = (
-            str(item_id)
-            + "_"
-            + str(image_count)
-            + "_"
-            + sanitize_text(item_title)
-            + ".jpg"
-        )
-        thumb_path = os.path.join(THUMB_DIR, attachment_filename)
-        image_path = os.path.join(IMAGE_DIR, attachment_filename)
-
-        # Grab image from clipboard
-        clipboard_image = ImageGrab.grabclipboard()
-
-        if isinstance(clipboard_image, Image.Image):
-            # Convert image to RGB if it has an alpha channel (e.g., RGBA)
-            # as JPEG format does not support transparency.
-            if clipboard_image.mode in ("RGBA", "P"):
-                clipboard_image = clipboard_image.convert("RGB")
-
-            # Save full image
-            clipboard_image.save(image_path, "JPEG")
-            print("Image saved successfully!")
+        # PIL is only loaded once an image is pasted, not at startup
+        from PIL import Image, ImageGrab
+
+        with tracer.span("paste_image", note=item_id):
+            # Grab image from clipboard
+            with tracer.span("grab"):
+                clipboard_image = ImageGrab.grabclipboard()
+
+            if isinstance(clipboard_image, Image.Image):
+                # Show a placeholder right away; hashing and encoding run in
+                # the background and name the file
+                placeholder = None
+                # From the card itself: ids derived from note ids can clash
+                # between cards (e.g. note 3500's text and note 500's attachments)
+                card_panel = self.card.get(item_id)
+                attachments_panel = card_panel.id_widgets[6][0] if card_panel else None
+                if attachments_panel and attachments_panel.GetSizer():
+                    placeholder = wx.StaticBitmap(
+                        attachments_panel, wx.ID_ANY, image_pipeline.get_placeholder()
+                    )
+                    attachments_panel.GetSizer().Add(placeholder, flag=wx.LEFT, border=8)
+                    attachments_panel.Layout()
 
-            # Save thumbnail
-            thumb_image = clipboard_image.copy()
-            thumb_image.thumbnail(THUMB_SIZE)
-            thumb_image.save(thumb_path, "JPEG")
+                image_pipeline.save_image(
+                    clipboard_image,
+                    partial(
+                        self.on_image_saved, item_id, clipboard_image.size, placeholder
+                    ),
+                )
 
-            # Update internal list
-            self.attached_images.setdefault(item_id, []).append(attachment_filename)
-            print(self.attached_images[item_id])
+            else:
+                print("No image found on clipboard.")
 
-            # Update DB
-            image_list_str = ",".join(self.attached_images[item_id])
-            sql = "UPDATE notas SET imagens = ? WHERE codigo_id = ?"
-            self.app_state.cursor.execute(sql, (image_list_str, item_id))
+            self.main_sizer.Layout()
+        wx.CallAfter(self.FitInside)
+        evt.Skip()
 
-            # Add thumbnail to UI
-            attachments_panel = self.FindWindowById(item_id + 8000)
+    def on_image_saved(
+        self, item_id, dimensions, placeholder, attachment_filename, thumb_bitmap
+    ):
+        """Called on the GUI thread when a pasted image has been stored."""
+        attachments_panel = None
+        if placeholder:
+            attachments_panel = placeholder.GetParent()
+            attachments_panel.GetSizer().Detach(placeholder)
+            placeholder.Destroy()
+
+        if thumb_bitmap is None:
             if attachments_panel:
-                attachments_sizer = attachments_panel.GetSizer()
-                if attachments_sizer:
-                    image_bitmap = wx.Bitmap(thumb_path, wx.BITMAP_TYPE_JPEG)
-                    image_control = wx.StaticBitmap(
-                        attachments_panel, wx.ID_ANY, image_bitmap
-                    )
+                attachments_panel.Layout()
+            wx.MessageBox("Error saving the pasted image.", "Error", wx.ICON_ERROR)
+            return
 
-                    # Bind click to open full image
-                    image_control.Bind(
-                        wx.EVT_LEFT_DOWN,
-                        lambda event, path=image_path: self.on_image_click(event, path),
-                    )
-                    # Bind right-click to delete
-                    image_control.Bind(
-                        wx.EVT_CONTEXT_MENU,
-                        lambda event, img_ctrl=image_control, panel=attachments_panel, filename=attachment_filename: self.on_image_right_click(
-                            event, img_ctrl, panel, filename
-                        ),
-                    )
+        print("Image saved successfully!")
 
-                    attachments_sizer.Add(
-                        image_control, flag=wx.EXPAND | wx.ALL, border=6
-                    )
+        # The same image is attached to a note only once
+        attached = self.attached_images.setdefault(item_id, [])
+        if attachment_filename in attached:
+            if attachments_panel:
+                attachments_panel.Layout()
+            return
+        attached.append(attachment_filename)
 
-                    attachments_panel.Layout()
+        # The card may have been recycled for another note meanwhile
+        if attachments_panel and attachments_panel.GetId() == item_id + 8000:
+            self.add_thumbnail(attachments_panel, attachment_filename)
+            attachments_panel.Layout()
 
-        else:
-            print("No image found on clipboard.")
+        # Update DB
+        image_path = os.path.join(IMAGE_DIR, attachment_filename)
+        self.app_state.storage.transaction(
+            lambda conn: add_attachment(
+                conn, item_id, attachment_filename, image_path, dimensions
+            )
+        )
 
         self.main_sizer.Layout()
         wx.CallAfter(self.FitInside)
-        evt.Skip()
+        self.schedule_viewport_update()
+
+    def on_thumbnail_loaded(self, image_control, bitmap):
+        """Swaps a placeholder for the decoded thumbnail."""
+        if not image_control or bitmap is None:
+            return
+        image_control.SetBitmap(bitmap)
+        image_control.GetParent().Layout()
+        self.main_sizer.Layout()
+        wx.CallAfter(self.FitInside)
+        self.schedule_viewport_update()
 
     def on_image_click(self, event, image_path):
         """Handler to open the original image in the default system viewer."""
@@ -216,12 +830,12 @@ class RightPanel(scrolled.ScrolledPanel):
         ):
             self.attached_images[item_id].remove(filename)
 
-        # Update DB
-        image_list_str = ",".join(self.attached_images.get(item_id, []))
-        sql = "UPDATE notas SET imagens = ? WHERE codigo_id = ?"
-        self.app_state.cursor.execute(sql, (image_list_str, item_id))
-
-        # TODO: Delete files from filesystem
+        # Update DB, then delete the files if no other note uses them
+        self.app_state.storage.write(
+            "DELETE FROM attachments WHERE codigo_id = ? AND filename = ?",
+            (item_id, filename),
+        )
+        image_pipeline.remove_unreferenced(self.app_state.storage)
 
         self.main_sizer.Layout()
         wx.CallAfter(self.FitInside)
@@ -242,6 +856,8 @@ class RightPanel(scrolled.ScrolledPanel):
         """Handler for when the main text control loses focus."""
         item_id = evt.GetId() - 5000
         self.handle_focus_change(item_id)
+        if self.markdown and not self.painted:
+            wx.CallAfter(self.end_editing, item_id)
         evt.Skip()
 
     def handle_focus_change(self, previous_item_id):
@@ -263,13 +879,19 @@ class RightPanel(scrolled.ScrolledPanel):
 
         if previous_item_id and self.focused_card_id != previous_item_id:
             self.save_card(previous_item_id)
+            if self.painted:
+                wx.CallAfter(self.close_card, previous_item_id)
 
     def save_card(self, item_id):
         """Saves the contents of a specific card to the database."""
-        # Returns True if a new category was added, indicating a UI reload is needed.
+        # Returns True if a new category was added
         if item_id < 1:
             return False
+        with tracer.span("save_card", note=item_id):
+            return self.write_card(item_id)
 
+    def write_card(self, item_id):
+        """Reads a card's widgets and queues its UPDATE (see save_card)."""
         new_category_added = False
         category_key, title, text = "", "", ""
 
@@ -284,36 +906,14 @@ class RightPanel(scrolled.ScrolledPanel):
                 category_label = category_combo.GetValue()
 
                 # Find the key corresponding to the label
-                category_key = ""
-                found = False
-                for key, data in self.app_state.categories.items():
-                    if data["label"] == category_label:
-                        category_key = key
-                        found = True
-                        break
+                category_key = self.app_state.find_category(category_label) or ""
 
                 # If not found, it's a new category
-                if not found and category_label:
-                    category_key = sanitize_text(category_label.lower())
-
-                    # Assign a color
-                    used_colors = list(self.app_state.categories.values())
-                    all_colors = list(self.app_state.config["CATCOLORS"].keys())
-
-                    # Find the next available color, or cycle through them
-                    next_color_index = len(used_colors) % len(all_colors)
-                    new_color_key = all_colors[next_color_index]
-
-                    # Update state and save
-                    self.app_state.categories[category_key] = {
-                        "label": category_label,
-                        "color": new_color_key,
-                    }
-                    self.save_categories_callback()
+                if not category_key and category_label:
+                    category_key = self.app_state.add_category(category_label)
+                    self.add_category_label(category_label)
+                    self.on_category_added_callback(category_key)
                     new_category_added = True
-                    print(
-                        f"New category '{category_label}' added with color '{new_color_key}'"
-                    )
 
             title_ctrl = wx.FindWindowById(item_id + 4000, card_panel)
             if title_ctrl:
@@ -331,54 +931,52 @@ class RightPanel(scrolled.ScrolledPanel):
             sql = (
                 "UPDATE notas SET categ = ?, titulo = ?, texto = ? WHERE codigo_id = ?"
             )
-            self.app_state.cursor.execute(sql, (category_key, title, text, item_id))
+            params = (category_key, title, text, item_id)
         elif title and text:
             sql = "UPDATE notas SET titulo = ?, texto = ? WHERE codigo_id = ?"
-            self.app_state.cursor.execute(sql, (title, text, item_id))
+            params = (title, text, item_id)
         else:
             print(f"Card {item_id} not saved (empty).")
             return new_category_added
 
-        self.app_state.conn.commit()
+        # Queued to the writer thread, the UI doesn't wait for the commit
+        self.app_state.storage.write(sql, params)
         print(f"Saved card {item_id}")
+
+        # The card already shows what was saved, no refresh needed
+        shown = self.card_data.get(item_id)
+        if shown:
+            self.card_data[item_id] = (category_key or shown[0], title, text, shown[3])
         return new_category_added
 
+    def add_category_label(self, label):
+        """Offers a new category in the combo boxes of the existing cards."""
+        version = self.app_state.categories.version
+        for card_panel in list(self.card.values()) + self.card_pool:
+            category_combo = card_panel.id_widgets[2][0]
+            if category_combo.FindString(label) == wx.NOT_FOUND:
+                # Sorted by the combo (CB_SORT); the typed value is kept
+                category_combo.Append(label)
+            if getattr(category_combo, "labels_version", None) == version - 1:
+                category_combo.labels_version = version
+
     def create_card_item(
         self, item_id, item_category, item_title, item_text, item_images
     ):
         """Factory method to create a single note card widget."""
-        # Fallback for category
-        try:
-            color_key = self.app_state.categories[item_category]["color"]
-        except KeyError:
-            item_category = "none"
-            color_key = self.app_state.categories.get("none", {}).get(
-                "color", "cor_001"
-            )
-
-        # Colors - [0] = base, [1] = light, [2] = dark
-        card_colors = self.app_state.config["CATCOLORS"][color_key]
-
         card_panel = wx.Panel(self, id=item_id)
-        card_panel.SetBackgroundColour(self.app_state.config["UICOLORS"]["wh-1"])
+        card_panel.SetBackgroundColour(theme.colour("wh-1"))
 
         header_panel = wx.Panel(card_panel)
         header_panel.SetMinSize((-1, 40))  # Aumenta a altura para acomodar padding
-        header_color = card_colors[1]
-        header_panel.SetBackgroundColour(header_color)
 
         # Color indicator square
         color_indicator = wx.Panel(header_panel, size=(20, 20))
-        color_indicator.SetBackgroundColour(card_colors[0])
-        color_indicator.SetToolTip(self.app_state.categories[item_category]["label"])
 
         # BT Copy
-        img = wx.Image(
-            "assets/" + self.app_state.config["UIICONS"]["copy-note"],
-            wx.BITMAP_TYPE_PNG,
+        bitmap = bitmap_cache.get_icon(
+            "assets/" + self.app_state.config["UIICONS"]["copy-note"], ICON_SIZE
         )
-        img = img.Scale(32, 32, wx.IMAGE_QUALITY_HIGH)
-        bitmap = wx.Bitmap(img)
         copy_btn = wxbt.GenBitmapButton(
             header_panel,
             item_id + 1000,
@@ -388,15 +986,12 @@ class RightPanel(scrolled.ScrolledPanel):
             wx.BORDER_NONE,
         )
         copy_btn.SetToolTip("Copy note text to clipboard")
-        card_panel.Bind(wx.EVT_BUTTON, self.on_copy, id=item_id + 1000)
+        copy_btn.Bind(wx.EVT_BUTTON, self.on_copy)
 
         # BT Delete
-        img_del = wx.Image(
-            "assets/" + self.app_state.config["UIICONS"]["delete-note"],
-            wx.BITMAP_TYPE_PNG,
+        bitmap_del = bitmap_cache.get_icon(
+            "assets/" + self.app_state.config["UIICONS"]["delete-note"], ICON_SIZE
         )
-        img_del = img_del.Scale(32, 32, wx.IMAGE_QUALITY_HIGH)
-        bitmap_del = wx.Bitmap(img_del)
         delete_btn = wxbt.GenBitmapButton(
             header_panel,
             item_id + 2000,
@@ -405,17 +1000,13 @@ class RightPanel(scrolled.ScrolledPanel):
             wx.DefaultSize,
             wx.BORDER_NONE,
         )
-        delete_btn.SetBackgroundColour(header_color)
         delete_btn.SetToolTip("Delete this note")
-        card_panel.Bind(wx.EVT_BUTTON, self.on_delete, id=item_id + 2000)
+        delete_btn.Bind(wx.EVT_BUTTON, self.on_delete)
 
         # BT Paste
-        img_paste = wx.Image(
-            "assets/" + self.app_state.config["UIICONS"]["add-image"],
-            wx.BITMAP_TYPE_PNG,
+        bitmap_paste = bitmap_cache.get_icon(
+            "assets/" + self.app_state.config["UIICONS"]["add-image"], ICON_SIZE
         )
-        img_paste = img_paste.Scale(32, 32, wx.IMAGE_QUALITY_HIGH)
-        bitmap_paste = wx.Bitmap(img_paste)
         paste_btn = wxbt.GenBitmapButton(
             header_panel,
             item_id + 7000,
@@ -424,11 +1015,8 @@ class RightPanel(scrolled.ScrolledPanel):
             wx.DefaultSize,
             wx.BORDER_NONE,
         )
-        paste_btn.SetBackgroundColour(header_color)
         paste_btn.SetToolTip("Paste image from clipboard and attach")
-        card_panel.Bind(
-            wx.EVT_BUTTON, partial(self.on_paste_image, item_title), id=item_id + 7000
-        )
+        paste_btn.Bind(wx.EVT_BUTTON, self.on_paste_image)
 
         category_combo = wx.ComboBox(
             header_panel,
@@ -437,22 +1025,14 @@ class RightPanel(scrolled.ScrolledPanel):
             choices=[],
             style=wx.CB_SORT | wx.CB_DROPDOWN,
         )
-        category_combo.SetBackgroundColour(self.app_state.config["UICOLORS"]["wh-2"])
-
-        # Populate with labels from the categories dictionary
-        category_labels = [data["label"] for data in self.app_state.categories.values()]
-        category_combo.SetItems(sorted(category_labels))
-
-        # Set the current value
-        category_combo.SetValue(self.app_state.categories[item_category]["label"])
+        category_combo.SetBackgroundColour(theme.colour("wh-2"))
         category_combo.SetToolTip("Select or type a category")
 
         title_ctrl = wx.TextCtrl(
-            header_panel, id=item_id + 4000, value=item_title, style=wx.BORDER_NONE
+            header_panel, id=item_id + 4000, value="", style=wx.BORDER_NONE
         )
-        title_ctrl.SetFont(wx.Font(14, 73, 90, 90, False, wx.EmptyString))
-        title_ctrl.SetForegroundColour(self.app_state.config["UICOLORS"]["gr-0"])
-        title_ctrl.SetBackgroundColour(header_color)
+        title_ctrl.SetFont(theme.font("card_title"))
+        title_ctrl.SetForegroundColour(theme.colour("gr-0"))
 
         card_sizer = wx.BoxSizer(wx.VERTICAL)
         card_panel.SetSizer(card_sizer)
@@ -486,52 +1066,47 @@ class RightPanel(scrolled.ScrolledPanel):
         content_wrapper.SetSizer(content_sizer)
 
         # Main text block (added to the content_sizer)
-        item_text = html.unescape(item_text)
-        text_block = ExpandoTextCtrl(content_wrapper, id=item_id + 5000, style=wx.BORDER_NONE)
-        text_block.SetFont(
-            wx.Font(14, wx.MODERN, wx.NORMAL, wx.NORMAL, False, "Consolas")
+        # Rich text, so code notes can be highlighted
+        text_block = ExpandoTextCtrl(
+            content_wrapper, id=item_id + 5000, style=wx.BORDER_NONE | wx.TE_RICH2
         )
-        text_block.SetForegroundColour(self.app_state.config["UICOLORS"]["gr-0"])
+        text_block.SetFont(theme.font("card_text"))
+        text_block.SetForegroundColour(theme.colour("gr-0"))
         # text_block.SetBackgroundColour(self.app_state.config["UICOLORS"]["wh-1"])
 
-        # Set the value AFTER unbinding the event to prevent recursion on initial layout
-        text_block.Unbind(EVT_ETC_LAYOUT_NEEDED)
-        text_block.SetValue(item_text)
-        text_block.Bind(EVT_ETC_LAYOUT_NEEDED, self.text_change)
-
         # Use proportion=0 and wx.EXPAND to avoid recursion error
         content_sizer.Add(text_block, 1, wx.EXPAND)
 
+        # Rendered text, shown instead of the editor in markdown mode
+        card_panel.read_view = None
+        card_panel.editing = False
+        card_panel.render_pending = False
+        card_panel.language = None
+        card_panel.highlight_on = False
+        card_panel.highlight_text = ""
+        card_panel.fence_timer = None
+        card_panel.styled = False
+        if self.markdown:
+            read_view = wx.html.HtmlWindow(
+                content_wrapper,
+                style=wx.html.HW_SCROLLBAR_NEVER | wx.BORDER_NONE,
+            )
+            read_view.SetStandardFonts(11, DEFAULT_FONT, "Consolas")
+            read_view.SetBackgroundColour(theme.colour("wh-1"))
+            read_view.rendered_width = 0
+            read_view.Bind(wx.html.EVT_HTML_CELL_CLICKED, self.on_read_view_click)
+            read_view.Bind(wx.html.EVT_HTML_LINK_CLICKED, self.on_link_clicked)
+            read_view.Bind(wx.EVT_MOUSEWHEEL, self.on_mouse_wheel)
+            read_view.Bind(wx.EVT_SIZE, self.on_read_view_size)
+            content_sizer.Insert(0, read_view, 0, wx.EXPAND)
+            card_panel.read_view = read_view
+
         # Attached images
-        self.attached_images[item_id] = []
         attachments_sizer = wx.BoxSizer(wx.HORIZONTAL)
         attachments_panel = wx.Panel(content_wrapper, id=item_id + 8000)
         # attachments_panel.SetBackgroundColour(self.app_state.config["UICOLORS"]["wh-1"])
         attachments_panel.SetSizer(attachments_sizer)
 
-        if item_images:
-            attachments = [x.strip() for x in item_images.split(",")]
-            self.attached_images[item_id] = attachments
-            for i, attachment_filename in enumerate(attachments):
-                thumb_path = os.path.join(THUMB_DIR, attachment_filename)
-                image_path = os.path.join(IMAGE_DIR, attachment_filename)
-                image_bitmap = wx.Bitmap(thumb_path, wx.BITMAP_TYPE_JPEG)
-                image_control = wx.StaticBitmap(
-                    attachments_panel, wx.ID_ANY, image_bitmap
-                )
-
-                image_control.Bind(
-                    wx.EVT_LEFT_DOWN,
-                    lambda event, path=image_path: self.on_image_click(event, path),
-                )
-                image_control.Bind(
-                    wx.EVT_CONTEXT_MENU,
-                    lambda event, ctrl=image_control, panel=attachments_panel, filename=attachment_filename: self.on_image_right_click(
-                        event, ctrl, panel, filename
-                    ),
-                )
-                attachments_sizer.Add(image_control, flag=wx.LEFT, border=8)
-
         # Add attachments panel to the content sizer
         content_sizer.Add(attachments_panel, 0, wx.EXPAND | wx.TOP, 6)
 
@@ -543,5 +1118,180 @@ class RightPanel(scrolled.ScrolledPanel):
         category_combo.Bind(wx.EVT_KILL_FOCUS, self.on_blur_lang)
         title_ctrl.Bind(wx.EVT_KILL_FOCUS, self.on_blur_tit)
         text_block.Bind(wx.EVT_KILL_FOCUS, self.on_blur_texto)
+        text_block.Bind(wx.EVT_TEXT, self.on_text_edited)
+
+        # Widgets whose ids are derived from the note id, and the widgets
+        # that must be refreshed when the card is filled with another note.
+        card_panel.id_widgets = [
+            (copy_btn, 1000),
+            (delete_btn, 2000),
+            (category_combo, 3000),
+            (title_ctrl, 4000),
+            (text_block, 5000),
+            (paste_btn, 7000),
+            (attachments_panel, 8000),
+        ]
+        card_panel.header_panel = header_panel
+        card_panel.color_indicator = color_indicator
+        card_panel.header_buttons = [delete_btn, paste_btn]
+
+        self.fill_card_item(
+            card_panel, item_id, item_category, item_title, item_text, item_images
+        )
 
         return card_panel
+
+    def fill_card_item(
+        self, card_panel, item_id, item_category, item_title, item_text, item_images
+    ):
+        """
+        Puts a note's data into a card built by create_card_item.
+        Used for new cards, for cards recycled from the pool and for
+        cards whose note changed.
+        """
+        self.card_data[item_id] = (item_category, item_title, item_text, item_images)
+
+        # Fallback for category
+        if item_category not in self.app_state.categories:
+            item_category = "none"
+
+        # Ids are derived from the note id
+        card_panel.SetId(item_id)
+        for widget, offset in card_panel.id_widgets:
+            widget.SetId(item_id + offset)
+
+        self.paint_card_header(card_panel, item_category)
+        card_panel.color_indicator.SetToolTip(
+            self.app_state.categories.get(item_category, {}).get("label", "")
+        )
+
+        category_combo = card_panel.id_widgets[2][0]
+        # Populate with the (cached) sorted labels, unless it already has them
+        categories = self.app_state.categories
+        if getattr(category_combo, "labels_version", None) != categories.version:
+            category_combo.SetItems(categories.sorted_labels())
+            category_combo.labels_version = categories.version
+
+        # Set the current value
+        category_combo.SetValue(
+            self.app_state.categories.get(item_category, {}).get("label", "")
+        )
+
+        title_ctrl = card_panel.id_widgets[3][0]
+        title_ctrl.SetValue(item_title or "")
+
+        # Highlighted again when the card is on screen or edited
+        item_text = html.unescape(item_text or "")
+        card_panel.language = detect_language(
+            item_text,
+            item_category,
+            self.app_state.categories.get(item_category, {}).get("label"),
+        )
+        card_panel.highlight_on = False
+
+        # Set the value AFTER unbinding the event to prevent recursion on initial layout
+        text_block = card_panel.id_widgets[4][0]
+        text_block.Unbind(EVT_ETC_LAYOUT_NEEDED)
+        text_block.SetValue(item_text)
+        if card_panel.styled:
+            # Colors of the note previously shown in this card
+            text_block.SetStyle(0, text_block.GetLastPosition(), self.default_text_attr)
+            card_panel.styled = False
+        text_block.Bind(EVT_ETC_LAYOUT_NEEDED, self.text_change)
+
+        # Rendered when the card is on screen (see render_visible_cards),
+        # unless the note is being edited
+        if card_panel.read_view and self.FindFocus() is not text_block:
+            self.show_read_view(card_panel)
+        elif card_panel.editing:
+            self.start_highlight(card_panel)
+
+        # Attached images
+        attachments = list(item_images or ())
+        self.attached_images[item_id] = list(attachments)
+
+        attachments_panel = card_panel.id_widgets[6][0]
+        if getattr(card_panel, "attachments_shown", None) != attachments:
+            attachments_panel.DestroyChildren()
+            attachments_panel.GetSizer().Clear()
+            for attachment_filename in attachments:
+                self.add_thumbnail(attachments_panel, attachment_filename)
+            card_panel.attachments_shown = attachments
+
+        card_panel.Layout()
+
+    def paint_card_header(self, card_panel, item_category):
+        """Colours a card's header after its category."""
+        color_key = self.app_state.categories.get(item_category, {}).get(
+            "color", "cor_001"
+        )
+        # Colors - [0] = base, [1] = light, [2] = dark
+        card_colors = theme.category(color_key)
+        header_color = card_colors[1]
+
+        card_panel.header_panel.SetBackgroundColour(header_color)
+        card_panel.color_indicator.SetBackgroundColour(card_colors[0])
+        for button in card_panel.header_buttons:
+            button.SetBackgroundColour(header_color)
+        card_panel.id_widgets[3][0].SetBackgroundColour(header_color)
+
+    def apply_theme(self):
+        """
+        Colours the existing cards again after the theme was reloaded;
+        the rendered notes are rendered again when on screen.
+        """
+        self.SetBackgroundColour(theme.colour("gr-0"))
+        self.default_text_attr = wx.TextAttr(theme.colour("gr-0"))
+
+        for card_panel in list(self.card.values()) + self.card_pool:
+            card_panel.SetBackgroundColour(theme.colour("wh-1"))
+            card_panel.id_widgets[2][0].SetBackgroundColour(theme.colour("wh-2"))
+            card_panel.id_widgets[3][0].SetForegroundColour(theme.colour("gr-0"))
+            card_panel.id_widgets[4][0].SetForegroundColour(theme.colour("gr-0"))
+            item_data = self.card_data.get(card_panel.GetId())
+            if item_data:
+                self.paint_card_header(card_panel, item_data[0])
+            if card_panel.read_view:
+                card_panel.read_view.SetBackgroundColour(theme.colour("wh-1"))
+                if not card_panel.editing:
+                    card_panel.render_pending = True
+        for preview in self.previews.values():
+            preview.Refresh()
+
+        self.Refresh()
+        self.schedule_viewport_update()
+
+    def add_thumbnail(self, attachments_panel, attachment_filename):
+        """
+        Adds the thumbnail of an attached image to a card.
+        Thumbnails that are not cached yet show a placeholder and are
+        decoded in the background.
+        """
+        thumb_path = os.path.join(THUMB_DIR, attachment_filename)
+        image_path = os.path.join(IMAGE_DIR, attachment_filename)
+
+        image_bitmap = bitmap_cache.get_cached_thumbnail(thumb_path)
+        image_control = wx.StaticBitmap(
+            attachments_panel, wx.ID_ANY, image_bitmap or image_pipeline.get_placeholder()
+        )
+        if image_bitmap is None:
+            cached_bitmap = image_pipeline.load_thumbnail(
+                thumb_path, partial(self.on_thumbnail_loaded, image_control)
+            )
+            if cached_bitmap is not None:
+                image_control.SetBitmap(cached_bitmap)
+
+        # Bind click to open full image
+        image_control.Bind(
+            wx.EVT_LEFT_DOWN,
+            lambda event, path=image_path: self.on_image_click(event, path),
+        )
+        # Bind right-click to delete
+        image_control.Bind(
+            wx.EVT_CONTEXT_MENU,
+            lambda event, ctrl=image_control, panel=attachments_panel, filename=attachment_filename: self.on_image_right_click(
+                event, ctrl, panel, filename
+            ),
+        )
+        attachments_panel.GetSizer().Add(image_control, flag=wx.LEFT, border=8)
+        return image_control
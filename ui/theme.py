@@ -0,0 +1,102 @@
+import os
+
+import wx
+
+from constants import DEFAULT_FONT
+
+# Fonts of the interface: name -> wx.Font arguments
+FONTS = {
+    "add_button": (11, wx.SWISS, wx.NORMAL, wx.BOLD, False, DEFAULT_FONT),
+    "search": (12, wx.SWISS, wx.NORMAL, wx.NORMAL, False, DEFAULT_FONT),
+    "button": (12, wx.SWISS, wx.NORMAL, wx.NORMAL, False, DEFAULT_FONT),
+    "small": (10, wx.SWISS, wx.NORMAL, wx.NORMAL, False, DEFAULT_FONT),
+    "total": (18, wx.SWISS, wx.NORMAL, wx.BOLD, False, DEFAULT_FONT),
+    "card_title": (14, 73, 90, 90, False, wx.EmptyString),
+    "card_text": (14, wx.MODERN, wx.NORMAL, wx.NORMAL, False, "Consolas"),
+}
+
+
+class Theme:
+    """
+    The colours, brushes and fonts of the interface, built once from the
+    UICOLORS and CATCOLORS sections of config.ini and shared by all panels
+    (instead of parsing hex strings and creating fonts per widget).
+    load() rebuilds them in place; the panels re-apply them with their
+    apply_theme() methods.
+    """
+
+    def __init__(self):
+        self.colours = {}
+        # The same colours as "#rrggbb", for the rendered HTML
+        self.html = {}
+        self.brushes = {}
+        # CATCOLORS key -> (base, light, dark)
+        self.category_colours = {}
+        self.fonts = {}
+        self.config_path = None
+        self.config_mtime = None
+
+    def load(self, config, config_path=None):
+        """Builds the colours from a config loaded by AppState.read_config."""
+        self.html = {
+            name: wx.Colour(value).GetAsString(wx.C2S_HTML_SYNTAX)
+            for name, value in config.get("UICOLORS", {}).items()
+        }
+        self.colours = {name: wx.Colour(value) for name, value in self.html.items()}
+        self.brushes = {}
+        self.category_colours = {
+            key: tuple(wx.Colour(value) for value in values)
+            for key, values in config.get("CATCOLORS", {}).items()
+        }
+        # Fonts don't depend on the configuration
+        if not self.fonts:
+            self.fonts = {name: wx.Font(*args) for name, args in FONTS.items()}
+
+        if config_path:
+            self.config_path = config_path
+            self.config_mtime = self.get_mtime(config_path)
+
+    @staticmethod
+    def get_mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def config_changed(self):
+        """True if config.ini was saved since the theme was loaded."""
+        return bool(self.config_path) and (
+            self.get_mtime(self.config_path) != self.config_mtime
+        )
+
+    def colour(self, name):
+        return self.colours[name]
+
+    def brush(self, name):
+        brush = self.brushes.get(name)
+        if brush is None:
+            brush = self.brushes[name] = wx.Brush(self.colours[name])
+        return brush
+
+    def font(self, name):
+        return self.fonts[name]
+
+    def category(self, color_key):
+        """(base, light, dark) colours of a CATCOLORS key."""
+        colours = self.category_colours.get(color_key)
+        if colours is None:
+            colours = self.category_colours.get("cor_001") or next(
+                iter(self.category_colours.values())
+            )
+        return colours
+
+    def category_brush(self, color_key, shade):
+        """Brush of a category colour; shade is 0 (base), 1 (light) or 2 (dark)."""
+        key = (color_key, shade)
+        brush = self.brushes.get(key)
+        if brush is None:
+            brush = self.brushes[key] = wx.Brush(self.category(color_key)[shade])
+        return brush
+
+
+theme = Theme()
@@ -0,0 +1,89 @@
+import wx
+
+from tracing import tracer
+
+# Top-level spans whose breakdown is shown
+OVERLAY_SPANS = (
+    "on_update", "search", "save_card", "paste_image", "paste_image.store", "startup"
+)
+
+
+class TraceOverlay(wx.PopupWindow):
+    """
+    Debug overlay in the top right corner of the frame, showing the
+    phases of the last refresh (or save, paste...) with the latency
+    percentiles of its top-level span. F12 shows or hides it.
+    """
+
+    def __init__(self, frame):
+        super().__init__(frame)
+        self.frame = frame
+        self.visible = False
+        self.SetBackgroundColour(wx.Colour(33, 37, 41))
+
+        self.text = wx.StaticText(self, label="")
+        self.text.SetForegroundColour(wx.Colour(230, 230, 230))
+        self.text.SetFont(
+            wx.Font(9, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
+        )
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(self.text, 0, wx.ALL, 8)
+        self.SetSizer(sizer)
+
+        tracer.add_listener(self.on_trace)
+        frame.Bind(wx.EVT_CHAR_HOOK, self.on_char_hook)
+        frame.Bind(wx.EVT_MOVE, self.on_frame_moved)
+        frame.Bind(wx.EVT_SIZE, self.on_frame_moved)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+
+    def on_destroy(self, evt):
+        if evt.GetEventObject() is self:
+            tracer.remove_listener(self.on_trace)
+        evt.Skip()
+
+    def on_trace(self, root_name, breakdown):
+        """Tracer listener; may be called from any thread."""
+        if root_name in OVERLAY_SPANS:
+            wx.CallAfter(self.show_breakdown, root_name, breakdown)
+
+    def show_breakdown(self, root_name, breakdown):
+        if not self:
+            return
+        stats = tracer.percentiles(root_name)
+        lines = [
+            f"{root_name}  p50 {stats['p50']:.1f}  p90 {stats['p90']:.1f}  "
+            f"max {stats['max']:.1f} ms ({stats['count']})"
+        ]
+        for name, elapsed_ms in breakdown:
+            depth = name.count(".")
+            label = "  " * depth + name.rsplit(".", 1)[-1]
+            lines.append(f"{label:<28}{elapsed_ms:9.2f} ms")
+        self.text.SetLabel("\n".join(lines))
+        self.Fit()
+        if self.visible:
+            self.place()
+            self.Show()
+
+    def place(self):
+        """Keeps the overlay in the top right corner of the frame."""
+        client_width = self.frame.GetClientSize().width
+        self.Position(
+            self.frame.ClientToScreen((client_width - self.GetSize().width - 16, 16)),
+            (0, 0),
+        )
+
+    def on_frame_moved(self, evt):
+        if self.IsShown():
+            self.place()
+        evt.Skip()
+
+    def on_char_hook(self, evt):
+        if evt.GetKeyCode() != wx.WXK_F12:
+            evt.Skip()
+            return
+        self.visible = not self.visible
+        if self.visible and self.text.GetLabel():
+            self.place()
+            self.Show()
+        else:
+            self.Hide()
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+VaVar PyNotes - command line interface
+Search, add, export and import notes without starting the GUI.
+Never imports wx or PIL.
+
+usage:
+    python -m vapynotes search [TERM] [-c CATEGORY] [-n LIMIT] [-s SORT] [--json]
+    python -m vapynotes add --title TITLE [--category CATEGORY] [--text TEXT]
+    python -m vapynotes export [-f FORMAT] [-o FILE] [--attachments]
+    python -m vapynotes import [FILE | FOLDER]
+    python -m vapynotes stats
+    python -m vapynotes gc [--dry-run]
+    python -m vapynotes trace [--log FILE]
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from app_state import AppState
+from attachments import with_attachments
+from constants import DB_FILE, TRACE_LOG_FILE
+from exporter import EXPORT_FORMATS, FOLDER_FORMATS, export_notes
+from image_store import collect_garbage, pop_unreferenced
+from importer import import_folder
+from search import SORT_DEFAULT, SORT_MODES, build_notes_query, next_page_cursor
+from tracing import summarize_log
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# JSON field names for 'notas' rows; 'imagens' is replaced by the
+# attachment filenames
+NOTE_FIELDS = (
+    "codigo_id", "categ", "titulo", "texto", "attachments", "data", "updated_at"
+)
+BATCH_SIZE = 500
+INSERT_NOTE_SQL = (
+    "INSERT INTO notas (categ, titulo, texto, updated_at) "
+    "VALUES (?, ?, ?, DATETIME('now'))"
+)
+
+
+def open_app_state(db_path):
+    """Opens the database and loads config and categories."""
+    # AppState reports progress with print(); keep stdout for results
+    with contextlib.redirect_stdout(sys.stderr):
+        AppState.initialize_database(db_path)
+        app_state = AppState(db_path)
+        app_state.load_config(os.path.join(APP_DIR, "data", "config.ini"))
+        app_state.load_categories()
+    return app_state
+
+
+def note_to_dict(row):
+    note = dict(zip(NOTE_FIELDS, row))
+    note["attachments"] = list(note["attachments"])
+    return note
+
+
+def resolve_category(app_state, value):
+    # AppState.add_category prints; keep stdout for results
+    with contextlib.redirect_stdout(sys.stderr):
+        return app_state.resolve_category(value)
+
+
+def cmd_search(app_state, args):
+    """Prints matching notes, one per line, most relevant/recent first."""
+    remaining = args.limit or None
+    cursor = None
+    while True:
+        page_size = min(remaining, BATCH_SIZE) if remaining else BATCH_SIZE
+        sql, params = build_notes_query(
+            args.term,
+            args.category,
+            page_size,
+            use_fts=app_state.fts_enabled,
+            after=cursor,
+            sort=args.sort,
+        )
+        rows = app_state.conn.execute(sql, params).fetchall()
+        if args.json:
+            rows = with_attachments(app_state.conn, rows)
+        for row in rows:
+            if args.json:
+                print(json.dumps(note_to_dict(row), ensure_ascii=False))
+            else:
+                print(f"{row[0]}\t{row[1]}\t{row[2]}")
+
+        if remaining:
+            remaining -= len(rows)
+        if len(rows) < page_size or remaining == 0:
+            break
+        cursor = next_page_cursor(rows)
+
+
+def cmd_add(app_state, args):
+    """Adds one note. The text is read from stdin when --text is omitted."""
+    text = args.text if args.text is not None else sys.stdin.read()
+    category_key, created = resolve_category(app_state, args.category)
+    if created:
+        with contextlib.redirect_stdout(sys.stderr):
+            app_state.save_categories()
+
+    new_id = app_state.storage.write(
+        INSERT_NOTE_SQL,
+        (category_key, args.title, text),
+    ).result()
+    print(new_id)
+
+
+def cmd_export(app_state, args):
+    """Streams every note as CSV, JSON lines or one .txt/.md file per note."""
+    if args.format in FOLDER_FORMATS and not args.output:
+        sys.exit(f"export: --output FOLDER is required for {args.format}")
+
+    def report(done, total):
+        print(f"Exported {done}/{total} notes", file=sys.stderr)
+
+    count = export_notes(
+        app_state.conn,
+        args.output or sys.stdout,
+        args.format,
+        include_attachments=args.attachments,
+        categories=app_state.categories,
+        image_dir=args.images,
+        progress=report if args.output else None,
+    )
+    if args.output:
+        print(f"{count} notes exported to {args.output}", file=sys.stderr)
+
+
+def cmd_import_folder(app_state, args):
+    """
+    Imports the .txt/.md files of a folder (as written by export -f md).
+    Unchanged files already imported are skipped on later runs.
+    """
+    def report(done, total):
+        print(f"{done}/{total}", file=sys.stderr)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        result = import_folder(app_state, args.file, progress=report)
+        if result["categories_created"]:
+            app_state.save_categories()
+    print(
+        f"Imported {result['inserted']} notes, updated {result['updated']}, "
+        f"skipped {result['skipped']} unchanged or duplicate, "
+        f"{result['failed']} failed ({result['files']} files)."
+    )
+
+
+def cmd_import(app_state, args):
+    """
+    Adds notes from JSON lines (as written by export), or from a folder
+    of .txt/.md files. Each line needs 'titulo' and 'texto'; 'categ' may
+    be a category key or label.
+    """
+    if args.file and os.path.isdir(args.file):
+        cmd_import_folder(app_state, args)
+        return
+
+    source = open(args.file, "r", encoding="utf-8") if args.file else sys.stdin
+    categories_changed = False
+    total = 0
+    batch = []
+    try:
+        for line_number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                note = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Line {line_number} skipped: {e}", file=sys.stderr)
+                continue
+
+            category_key, created = resolve_category(app_state, note.get("categ"))
+            categories_changed = categories_changed or created
+            batch.append(
+                (category_key, note.get("titulo", ""), note.get("texto", ""))
+            )
+            if len(batch) >= BATCH_SIZE:
+                total += len(batch)
+                app_state.storage.write_many(
+                    INSERT_NOTE_SQL, batch
+                )
+                batch = []
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    if batch:
+        total += len(batch)
+        app_state.storage.write_many(
+            INSERT_NOTE_SQL, batch
+        )
+    app_state.storage.flush()
+
+    if categories_changed:
+        with contextlib.redirect_stdout(sys.stderr):
+            app_state.save_categories()
+    print(f"Imported {total} notes.")
+
+
+def cmd_stats(app_state, args):
+    """Prints note counts per category and database information."""
+    total = app_state.conn.execute("SELECT COUNT(*) FROM notas").fetchone()[0]
+    print(f"Notes: {total}")
+    print(f"Database: {app_state.db_path} ({os.path.getsize(app_state.db_path)} bytes)")
+    print(f"Full-text search: {'on' if app_state.fts_enabled else 'off'}")
+    print("Categories:")
+    counts = app_state.load_category_counts()
+    for category_key, count in sorted(counts.items(), key=lambda item: -item[1]):
+        label = app_state.categories.get(category_key, {}).get("label", category_key)
+        print(f"  {label}\t{count}")
+
+
+def cmd_gc(app_state, args):
+    """Removes image files that no note references."""
+    image_dir = args.images
+    thumb_dir = os.path.join(image_dir, "thumbs")
+    if not args.dry_run:
+        app_state.storage.transaction(pop_unreferenced).result()
+    report = collect_garbage(app_state.conn, image_dir, thumb_dir, args.dry_run)
+    for path in report["removed"]:
+        print(path)
+    action = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"{action} {report['files']} files, {report['bytes']} bytes "
+        f"({report['seconds']} s)."
+    )
+
+
+def cmd_trace(app_state, args):
+    """Prints latency percentiles per span from the trace log."""
+    summary = summarize_log(args.log)
+    if not summary:
+        print(f"No spans in {args.log} (set trace = 1 in config.ini).", file=sys.stderr)
+        return
+    print(f"{'span':<44}{'count':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for name, stats in summary.items():
+        print(
+            f"{name:<44}{stats['count']:>7}{stats['p50']:>10.2f}"
+            f"{stats['p90']:>10.2f}{stats['p99']:>10.2f}{stats['max']:>10.2f}"
+        )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="vapynotes", description="VaVar PyNotes command line."
+    )
+    parser.add_argument(
+        "--db",
+        default=os.path.join(APP_DIR, DB_FILE),
+        help="database file (default: %(default)s)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="search notes")
+    search.add_argument("term", nargs="?", default="")
+    search.add_argument(
+        "-c", "--category", action="append", default=[], help="category key"
+    )
+    search.add_argument(
+        "-n", "--limit", type=int, default=20, help="max results, 0 for all"
+    )
+    search.add_argument(
+        "-s", "--sort", choices=list(SORT_MODES), default=SORT_DEFAULT,
+        help="list order (default: best match, or newest)",
+    )
+    search.add_argument("--json", action="store_true", help="print JSON lines")
+    search.set_defaults(func=cmd_search)
+
+    add = commands.add_parser("add", help="add a note")
+    add.add_argument("--title", required=True)
+    add.add_argument("--category", default="none", help="category key or label")
+    add.add_argument("--text", help="note text (default: read from stdin)")
+    add.set_defaults(func=cmd_add)
+
+    export = commands.add_parser("export", help="export notes")
+    export.add_argument(
+        "-f", "--format", choices=EXPORT_FORMATS, default="jsonl",
+        help="csv, jsonl, or a folder of .txt/.md files (default: %(default)s)",
+    )
+    export.add_argument(
+        "-o", "--output", help="output file or folder (default: stdout)"
+    )
+    export.add_argument(
+        "--attachments", action="store_true", help="copy the attached images too"
+    )
+    export.add_argument(
+        "--images",
+        default=os.path.join(APP_DIR, "images"),
+        help="image folder (default: %(default)s)",
+    )
+    export.set_defaults(func=cmd_export)
+
+    import_ = commands.add_parser(
+        "import", help="import notes from JSON lines or a .txt/.md folder"
+    )
+    import_.add_argument(
+        "file", nargs="?", help="input file or folder (default: stdin)"
+    )
+    import_.set_defaults(func=cmd_import)
+
+    stats = commands.add_parser("stats", help="show database statistics")
+    stats.set_defaults(func=cmd_stats)
+
+    gc = commands.add_parser("gc", help="remove unreferenced image files")
+    gc.add_argument(
+        "--dry-run", action="store_true", help="only report what would be removed"
+    )
+    gc.add_argument(
+        "--images",
+        default=os.path.join(APP_DIR, "images"),
+        help="image folder (default: %(default)s)",
+    )
+    gc.set_defaults(func=cmd_gc)
+
+    trace = commands.add_parser("trace", help="show timings from the trace log")
+    trace.add_argument(
+        "--log",
+        default=os.path.join(APP_DIR, TRACE_LOG_FILE),
+        help="trace log file (default: %(default)s)",
+    )
+    trace.set_defaults(func=cmd_trace)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    app_state = open_app_state(args.db)
+    try:
+        args.func(app_state, args)
+    except BrokenPipeError:
+        # Output closed early (e.g. piped to 'head')
+        sys.stderr.close()
+    finally:
+        app_state.close_db()
+
+
+if __name__ == "__main__":
+    main()